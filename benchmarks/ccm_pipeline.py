@@ -0,0 +1,122 @@
+"""
+Benchmark of the COREMetamodel pipeline on synthetic logs of several sizes.
+
+Every scale is timed and memory-profiled per phase (generation, the append_batch phases, the OCEL build,
+get_extended_table and save_ocel). The results are written to a JSON file to compare commits. Run from the
+repository root::
+
+    python -m benchmarks.ccm_pipeline --scales 10000 100000 1000000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import List, Dict, Any, Optional
+
+from benchmarks.synthetic_log import SyntheticLogConfig, build_model
+from src.utils.instrumentation import Instrumentation, Span
+
+
+def current_commit() -> Optional[str]:
+    """Return the git commit of the working tree, if available."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(spans: List[Span]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate the spans of a run by phase name.
+
+    :param spans: Finished spans of the run.
+    :return: Total wall time, total rows, maximal peak memory and number of spans per phase.
+    """
+    phases: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        phase = phases.setdefault(span.name, {"wall_time": 0.0, "rows": 0, "peak_memory": None, "calls": 0})
+        phase["wall_time"] += span.wall_time
+        phase["rows"] += span.rows
+        phase["calls"] += 1
+        if span.peak_memory is not None:
+            phase["peak_memory"] = max(phase["peak_memory"] or 0, span.peak_memory)
+    return phases
+
+
+def run_scale(config: SyntheticLogConfig, track_memory: bool, export_format: Optional[str]) -> Dict[str, Any]:
+    """
+    Run the pipeline once on a synthetic log.
+
+    :param config: Size and shape of the log.
+    :param track_memory: Whether to measure peak memory per phase. Slows down all phases.
+    :param export_format: File extension used for ``save_ocel``, None to skip the export.
+    :return: The results of the run.
+    """
+    instrumentation = Instrumentation(track_memory=track_memory, log=None)
+    start = time.perf_counter()
+
+    model = build_model(config, instrumentation)
+    ocel = model.get_ocel()
+    with instrumentation.span("get_extended_table") as span:
+        span.add_rows(len(model.get_extended_table()))
+    if export_format is not None:
+        with tempfile.TemporaryDirectory() as directory:
+            with instrumentation.span("save_ocel", rows=len(ocel.events)):
+                model.save_ocel(os.path.join(directory, f"log.{export_format}"))
+
+    return {
+        "events": config.events,
+        "config": config.model_dump(mode="json"),
+        "total_wall_time": time.perf_counter() - start,
+        "tables": {
+            "events": len(ocel.events),
+            "objects": len(ocel.objects),
+            "relations": len(ocel.relations),
+            "o2o": len(ocel.o2o),
+            "e2e": len(ocel.e2e)
+        },
+        "phases": summarize(instrumentation.spans)
+    }
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argument_parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000],
+                                 help="Number of events of every synthetic log.")
+    argument_parser.add_argument("--chunk-size", type=int, default=250_000, help="Events per appended batch.")
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--track-memory", action="store_true",
+                                 help="Measure peak memory per phase with tracemalloc.")
+    argument_parser.add_argument("--export-format", default="jsonocel",
+                                 help="Format of the save_ocel phase, e.g. jsonocel, xmlocel or sqlite.")
+    argument_parser.add_argument("--skip-export", action="store_true", help="Skip the save_ocel phase.")
+    argument_parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results.")
+    args = argument_parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": []
+    }
+    for events in args.scales:
+        config = SyntheticLogConfig(events=events, chunk_size=args.chunk_size, seed=args.seed)
+        run = run_scale(config, args.track_memory, None if args.skip_export else args.export_format)
+        results["runs"].append(run)
+
+        print(f"{events} events: {run['total_wall_time']:.2f} s")
+        for name, phase in run["phases"].items():
+            memory = "" if phase["peak_memory"] is None else f"{phase['peak_memory'] / 2 ** 20:>10.1f} MiB"
+            print(f"  {name:<20}{phase['wall_time']:>10.3f} s{phase['rows']:>12}{memory}")
+
+        # Write after every scale so that a run aborted at a large scale keeps the smaller results
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark of CCM entity construction as validated pydantic models and as columnar batches.
+
+Every kind of entity is built from the same columns twice: once as one validated model per entity, as the readers
+did before the batch containers existed, and once as an EventBatch, ObjectBatch or RelationshipBatch. Both are
+then appended to an empty COREMetamodel and its tables are built. Run from the repository root::
+
+    python -m benchmarks.model_construction --count 200000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.types_defintion.batch_definition import EventBatch, ObjectBatch, RelationshipBatch
+from src.types_defintion.event_definition import IotEvent, ProcessEvent, Observation
+from src.types_defintion.object_definition import Object, ObjectClassEnum
+from src.types_defintion.relationship_definitions import EventObjectRelationship, EventEventRelationship, \
+    ObjectObjectRelationship
+from src.wrapper.ocel_wrapper import COREMetamodel
+
+START: datetime = datetime(2024, 1, 1)
+
+Columns = Dict[str, List[Any]]
+# Builds the entities of the columns, and appends what it built to a model
+Builder = Callable[[Columns], Any]
+Appender = Callable[[COREMetamodel, Any], None]
+
+
+def _columns(count: int) -> Columns:
+    """Field values shared by all entity kinds, one list per field."""
+    return {
+        "ids": [f"entity_{i}" for i in range(count)],
+        "targets": [f"object_{i % 1000}" for i in range(count)],
+        "timestamps": [START + timedelta(seconds=i) for i in range(count)],
+        "labels": [f"label_{i % 10}" for i in range(count)],
+        "values": [i * 0.5 for i in range(count)]
+    }
+
+
+def _events(event_class: str, model: type) -> Tuple[Builder, Builder]:
+    def validated(columns: Columns) -> List[Any]:
+        extra = {"activity": "step"} if event_class == "process_event" else {}
+        return [model(event_id=event_id, event_type="reading", timestamp=timestamp, attributes={"value": value},
+                      **extra)
+                for event_id, timestamp, value in zip(columns["ids"], columns["timestamps"], columns["values"])]
+
+    def batch(columns: Columns) -> EventBatch:
+        count = len(columns["ids"])
+        activities = ["step"] * count if event_class == "process_event" else None
+        return EventBatch.from_columns(columns["ids"], [event_class] * count, ["reading"] * count,
+                                       columns["timestamps"], activities, {"value": columns["values"]})
+
+    return validated, batch
+
+
+def _objects() -> Tuple[Builder, Builder]:
+    def validated(columns: Columns) -> List[Object]:
+        return [Object(object_id=object_id, object_type="machine", object_class=ObjectClassEnum.MACHINE,
+                       attributes={"location": label})
+                for object_id, label in zip(columns["ids"], columns["labels"])]
+
+    def batch(columns: Columns) -> ObjectBatch:
+        count = len(columns["ids"])
+        return ObjectBatch.from_columns(columns["ids"], ["machine"] * count, [ObjectClassEnum.MACHINE] * count,
+                                        {"location": columns["labels"]})
+
+    return validated, batch
+
+
+def _relationships(relationship_class: str, model: type, fields: Tuple[str, str]) -> Tuple[Builder, Builder]:
+    def validated(columns: Columns) -> List[Any]:
+        return [model(**{fields[0]: source, fields[1]: target})
+                for source, target in zip(columns["ids"], columns["targets"])]
+
+    def batch(columns: Columns) -> RelationshipBatch:
+        count = len(columns["ids"])
+        qualifier = model.model_fields["qualifier"].default
+        return RelationshipBatch.from_columns([relationship_class] * count, columns["ids"], columns["targets"],
+                                              [qualifier] * count)
+
+    return validated, batch
+
+
+KINDS: Dict[str, Tuple[Builder, Builder, str]] = {
+    "IotEvent": (*_events("iot_event", IotEvent), "events"),
+    "ProcessEvent": (*_events("process_event", ProcessEvent), "events"),
+    "Observation": (*_events("observation", Observation), "events"),
+    "Object": (*_objects(), "objects"),
+    "EventObjectRelationship": (*_relationships("event_object", EventObjectRelationship,
+                                                ("event_id", "object_id")), "relationships"),
+    "EventEventRelationship": (*_relationships("event_event", EventEventRelationship,
+                                               ("event_id", "derived_from_event_id")), "relationships"),
+    "ObjectObjectRelationship": (*_relationships("object_object", ObjectObjectRelationship,
+                                                 ("object_id", "related_object_id")), "relationships"),
+}
+
+
+def time_path(build: Builder, argument: str, columns: Columns) -> Tuple[float, float]:
+    """
+    Time building the entities of the columns, and building them plus appending them to a model.
+
+    :param build: Builds the models or the batch of the columns.
+    :param argument: Argument of ``append_batch`` taking the entities.
+    :param columns: Field values of the entities.
+    :return: Elapsed wall time of the construction and of construction, append and table build, in seconds.
+    """
+    start = time.perf_counter()
+    entities = build(columns)
+    constructed = time.perf_counter() - start
+    model = COREMetamodel()
+    model.append_batch(**{argument: entities})
+    model.get_tables()
+    return constructed, time.perf_counter() - start
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argument_parser.add_argument("--count", type=int, default=100_000, help="Entities constructed per kind.")
+    args = argument_parser.parse_args()
+
+    columns = _columns(args.count)
+    scale = 1_000_000 / args.count
+    print(f"{'s/1M entities':<26}{'validated':>12}{'batch':>12}{'speedup':>10}"
+          f"{'+append validated':>20}{'+append batch':>16}{'speedup':>10}")
+    for name, (validated, batch, argument) in KINDS.items():
+        validated_build, validated_total = time_path(validated, argument, columns)
+        batch_build, batch_total = time_path(batch, argument, columns)
+        print(f"{name:<26}{validated_build * scale:>12.2f}{batch_build * scale:>12.2f}"
+              f"{validated_build / batch_build:>9.1f}x{validated_total * scale:>20.2f}{batch_total * scale:>16.2f}"
+              f"{validated_total / batch_total:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
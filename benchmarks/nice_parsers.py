@@ -0,0 +1,116 @@
+"""
+Benchmark of the Smart Spaces (NICE) parsers on synthetic logs.
+
+Compares the sequential ``parser.py`` with the sharded ``parser_optimized.py`` running its shards in one process,
+in a thread pool and in a process pool. The logs are generated in the dictionary shape ``xmltodict`` produces for
+the NICE XML. Run from the repository root::
+
+    python -m benchmarks.nice_parsers --events 200000 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Callable
+
+NICE_DIRECTORY: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "tests", "datasets", "Smart Spaces (NICE)")
+# The worker processes import the parser module by name, so its folder has to be on the path
+sys.path.insert(0, NICE_DIRECTORY)
+
+import parser as nice_parser  # noqa: E402
+import parser_optimized as nice_parser_optimized  # noqa: E402
+
+from src.wrapper.ocel_wrapper import COREMetamodel  # noqa: E402
+
+
+def generate_log(events: int, objects: int = 200, sensors: int = 50, seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate a NICE log as parsed by xmltodict.
+
+    :param events: Total number of IoT, process and context events. IoT events make up half of them.
+    :param objects: Number of FeatureOfInterest objects.
+    :param sensors: Number of sensors.
+    :param seed: Seed of the random generator.
+    :return: The log dictionary.
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    object_types = ["location", "date", "user"]
+
+    def timestamp(index: int) -> str:
+        return (start + timedelta(seconds=index)).isoformat()
+
+    def relations() -> List[Dict[str, str]]:
+        return [{"@objectID": f"object_{rng.randrange(objects)}"} for _ in range(2)]
+
+    iot_count, process_count = events // 2, events // 4
+    return {"EventLog": {
+        "ObjectsList": {"FeatureOfInterest": [
+            {"@ID": f"object_{i}", "@objectType": object_types[i % 3], "DigitalProperty": {"@name": f"p{i}"}}
+            for i in range(objects)
+        ]},
+        "DataSourcesList": {"Sensor": [
+            {"@ID": f"sensor_{i}", "@location": f"object_{i % objects}", "metadata": {"@unit": "C"}}
+            for i in range(sensors)
+        ]},
+        "EventsList": {
+            "IoTEvent": [
+                {"@ID": f"iot_{i}", "@timestamp": timestamp(i), "FeatureOfInterest": f"object_{i % objects}",
+                 "EventObjectRelationship": relations(),
+                 "Observation": {"@value": str(rng.random()), "@sensor": f"sensor_{i % sensors}"}}
+                for i in range(iot_count)
+            ],
+            "ProcessEvent": [
+                {"@ID": f"process_{i}", "@timestamp": timestamp(i), "@label": f"activity_{i % 8}",
+                 "EventObjectRelationship": relations(),
+                 "Analytics": {"AnalysesEvent": [f"iot_{i}", f"iot_{i + 1}"]}}
+                for i in range(process_count)
+            ],
+            "ContextEvent": [
+                {"@ID": f"context_{i}", "@timestamp": timestamp(i), "@value": str(rng.random()),
+                 "EventObjectRelationship": relations()}
+                for i in range(events - iot_count - process_count)
+            ],
+        },
+    }}
+
+
+def time_parser(parse: Callable[[], COREMetamodel]) -> Dict[str, float]:
+    """Time parsing a log and building its OCEL."""
+    start = time.perf_counter()
+    model = parse()
+    parsed = time.perf_counter()
+    model.get_ocel()
+    return {"parse": parsed - start, "total": time.perf_counter() - start}
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argument_parser.add_argument("--events", type=int, default=50_000, help="Events of the synthetic log.")
+    argument_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Workers of the pools.")
+    argument_parser.add_argument("--shard-size", type=int, default=5_000, help="Elements per worker task.")
+    args = argument_parser.parse_args()
+
+    log = generate_log(args.events)
+    parsers: Dict[str, Callable[[], COREMetamodel]] = {
+        "parser.py": lambda: nice_parser.SensorStreamParser().parse_sensor_stream_log(log),
+        "optimized, 1 worker": lambda: nice_parser_optimized.SensorStreamParser(
+            workers=1, shard_size=args.shard_size).parse_sensor_stream_log(log),
+        "optimized, threads": lambda: nice_parser_optimized.SensorStreamParser(
+            workers=args.workers, shard_size=args.shard_size, executor="thread").parse_sensor_stream_log(log),
+        "optimized, processes": lambda: nice_parser_optimized.SensorStreamParser(
+            workers=args.workers, shard_size=args.shard_size, executor="process").parse_sensor_stream_log(log),
+    }
+
+    print(f"{args.events} events, {args.workers} workers")
+    print(f"{'parser':<24}{'parse s':>10}{'total s':>10}")
+    for name, parse in parsers.items():
+        timings = time_parser(parse)
+        print(f"{name:<24}{timings['parse']:>10.2f}{timings['total']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
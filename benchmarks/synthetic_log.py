@@ -0,0 +1,197 @@
+"""
+Generator of synthetic CCM logs of configurable size.
+
+The log models a plant with machines and their sensors (O2O hierarchy), orders handled by process events on the
+machines, and IoT events that are each derived (E2E) from a fan-out of sensor observations. Events are generated
+in chunks of columnar batches so that logs of tens of millions of events can be streamed into
+:meth:`COREMetamodel.append_batch` without holding them all in memory.
+"""
+from datetime import datetime
+from typing import List, Iterator, Tuple, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.types_defintion.batch_definition import EventBatch, ObjectBatch, RelationshipBatch
+from src.types_defintion.object_definition import ObjectClassEnum
+from src.utils.instrumentation import Instrumentation
+from src.wrapper.ocel_wrapper import COREMetamodel
+
+ACTIVITIES: List[str] = ["receive order", "cut", "weld", "paint", "inspect", "ship"]
+SENSOR_TYPES: List[Tuple[str, str]] = [("temperature", "C"), ("vibration", "mm/s"), ("power", "kW")]
+
+Chunk = Tuple[ObjectBatch, EventBatch, RelationshipBatch]
+
+
+class SyntheticLogConfig(BaseModel):
+    events: int = 10_000
+    chunk_size: int = 250_000
+    machines: int = 20
+    sensors_per_machine: int = 3
+    # Share of the events that are process events, the rest are IoT events and observations
+    process_share: float = 0.1
+    # Process events per order, i.e. length of a case
+    events_per_order: int = len(ACTIVITIES)
+    # Observations every IoT event is derived from
+    observations_per_iot_event: int = 4
+    # Mean seconds between two consecutive events
+    interval_seconds: float = 1.0
+    start: datetime = datetime(2024, 1, 1)
+    seed: int = 0
+
+
+def _ids(prefix: str, numbers: np.ndarray) -> np.ndarray:
+    """Build string ids from a prefix and running numbers."""
+    return np.char.add(prefix, numbers.astype(str)).astype(object)
+
+
+def _static_objects(config: SyntheticLogConfig) -> Tuple[ObjectBatch, RelationshipBatch]:
+    """Create the plant, its machines and their sensors together with the O2O hierarchy."""
+    objects = ObjectBatch()
+    relationships = RelationshipBatch()
+
+    objects.append("plant_0", "plant", ObjectClassEnum.BUSINESS_OBJECT, {"location": "hall_1"})
+    for machine in range(config.machines):
+        machine_id = f"machine_{machine}"
+        objects.append(machine_id, "machine", ObjectClassEnum.MACHINE, {"model": f"model_{machine % 4}"})
+        relationships.append("object_object", machine_id, "plant_0", "part_of")
+        for sensor in range(config.sensors_per_machine):
+            sensor_type, unit = SENSOR_TYPES[sensor % len(SENSOR_TYPES)]
+            sensor_id = f"sensor_{machine}_{sensor}"
+            objects.append(sensor_id, sensor_type, ObjectClassEnum.SENSOR, {"unit": unit})
+            relationships.append("object_object", sensor_id, machine_id, "mounted_on")
+    return objects, relationships
+
+
+def generate_chunks(config: SyntheticLogConfig) -> Iterator[Chunk]:
+    """
+    Generate the log chunk by chunk.
+
+    :param config: Size and shape of the log.
+    :return: Iterator over (objects, events, relationships) of every chunk, ready for ``append_batch``.
+    """
+    rng = np.random.default_rng(config.seed)
+    sensor_ids = np.array([f"sensor_{machine}_{sensor}" for machine in range(config.machines)
+                           for sensor in range(config.sensors_per_machine)], dtype=object)
+    sensor_types = np.array([SENSOR_TYPES[sensor % len(SENSOR_TYPES)][0] for _ in range(config.machines)
+                             for sensor in range(config.sensors_per_machine)], dtype=object)
+    machine_ids = np.array([f"machine_{machine}" for machine in range(config.machines)], dtype=object)
+    start = np.datetime64(config.start, "ns")
+
+    process_done = iot_done = observations_done = 0
+    for first in range(0, config.events, config.chunk_size):
+        size = min(config.chunk_size, config.events - first)
+        objects, relationships = _static_objects(config) if first == 0 else (ObjectBatch(), RelationshipBatch())
+
+        process_count = int(round(size * config.process_share))
+        iot_count = (size - process_count) // (config.observations_per_iot_event + 1)
+        observation_count = size - process_count - iot_count
+
+        # Timestamps increase with a jitter, process events, observations and IoT events are interleaved in time
+        offsets = np.cumsum(rng.exponential(config.interval_seconds * 1e9, size)).astype("int64")
+        timestamps = start + (first * int(config.interval_seconds * 1e9) + offsets).astype("timedelta64[ns]")
+        order = rng.permutation(size)
+        process_times = timestamps[np.sort(order[:process_count])]
+        observation_times = timestamps[np.sort(order[process_count:process_count + observation_count])]
+
+        # Process events walk the orders through the activities on random machines
+        process_numbers = np.arange(process_done, process_done + process_count)
+        process_ids = _ids("process_", process_numbers)
+        order_numbers = process_numbers // config.events_per_order
+        activities = np.array(ACTIVITIES, dtype=object)[
+            (process_numbers % config.events_per_order) % len(ACTIVITIES)]
+        order_ids = _ids("order_", order_numbers)
+        process_machines = machine_ids[rng.integers(0, len(machine_ids), process_count)]
+
+        new_orders = np.unique(order_numbers[process_numbers % config.events_per_order == 0])
+        objects.extend(
+            _ids("order_", new_orders),
+            ["order"] * len(new_orders),
+            [ObjectClassEnum.CASE_OBJECT] * len(new_orders),
+            {"priority": rng.integers(1, 4, len(new_orders))}
+        )
+        relationships.extend(
+            ["object_object"] * len(new_orders),
+            _ids("order_", new_orders),
+            ["plant_0"] * len(new_orders),
+            ["produced_in"] * len(new_orders)
+        )
+
+        # Observations of random sensors, every IoT event is derived from a run of consecutive observations
+        observation_ids = _ids("observation_", np.arange(observations_done, observations_done + observation_count))
+        observation_sensors = rng.integers(0, len(sensor_ids), observation_count)
+        iot_ids = _ids("iot_", np.arange(iot_done, iot_done + iot_count))
+        derived_from = np.minimum(np.arange(observation_count) // config.observations_per_iot_event,
+                                  iot_count - 1)
+        iot_sources = np.searchsorted(derived_from, np.arange(iot_count))
+        iot_sensors = observation_sensors[iot_sources] if observation_count else np.zeros(0, dtype=int)
+        # An IoT event happens right after the last observation it is derived from
+        iot_last = np.minimum(np.searchsorted(derived_from, np.arange(iot_count), side="right") - 1,
+                              observation_count - 1)
+        iot_times = observation_times[iot_last] + np.timedelta64(1, "ms") if observation_count \
+            else np.zeros(0, dtype="datetime64[ns]")
+
+        events = EventBatch.from_columns(
+            np.concatenate([process_ids, observation_ids, iot_ids]),
+            ["process_event"] * process_count + ["observation"] * observation_count + ["iot_event"] * iot_count,
+            np.concatenate([
+                activities,
+                np.full(observation_count, "observation", dtype=object),
+                np.char.add(sensor_types[iot_sensors].astype(str), "_reading").astype(object)
+            ]),
+            np.concatenate([process_times, observation_times, iot_times]),
+            activities=np.concatenate([activities, np.full(observation_count + iot_count, None, dtype=object)]),
+            attributes={
+                "value": np.concatenate([
+                    np.full(process_count, np.nan),
+                    rng.normal(50.0, 10.0, observation_count),
+                    rng.normal(50.0, 10.0, iot_count)
+                ])
+            }
+        )
+
+        # Orders and machines of the process events, then the sensors of the observations and IoT events
+        event_object_count = 2 * process_count + observation_count + iot_count
+        relationships.extend(
+            ["event_object"] * event_object_count,
+            np.concatenate([process_ids, process_ids, observation_ids, iot_ids]),
+            np.concatenate([order_ids, process_machines, sensor_ids[observation_sensors], sensor_ids[iot_sensors]]),
+            ["case"] * process_count + ["executed_on"] * process_count
+            + ["observed_by"] * (observation_count + iot_count)
+        )
+        if iot_count:
+            relationships.extend(
+                ["event_event"] * observation_count,
+                iot_ids[derived_from],
+                observation_ids,
+                ["derived_from"] * observation_count
+            )
+
+        process_done += process_count
+        iot_done += iot_count
+        observations_done += observation_count
+        yield objects, events, relationships
+
+
+def build_model(
+        config: SyntheticLogConfig,
+        instrumentation: Optional[Instrumentation] = None
+) -> COREMetamodel:
+    """
+    Generate a synthetic log and stream it into a COREMetamodel.
+
+    :param config: Size and shape of the log.
+    :param instrumentation: Recorder passed on to the model. Generation is recorded as "generate" spans.
+    :return: The model.
+    """
+    model = COREMetamodel(instrumentation=instrumentation)
+    chunks = generate_chunks(config)
+    while True:
+        with model.instrumentation.span("generate") as span:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                span.add_rows(len(chunk[1]))
+        if chunk is None:
+            return model
+        objects, events, relationships = chunk
+        model.append_batch(objects=objects, events=events, relationships=relationships)
@@ -13,6 +13,9 @@ def _print_progress(current_step: int, total_steps: int) -> None:
     :param current_step: Current step of the mapping process.
     :param total_steps: Total steps in the mapping process.
     """
+    # Only redraw when the bar advances by a full percent, not for every row
+    if current_step != total_steps and current_step * 100 // total_steps == (current_step - 1) * 100 // total_steps:
+        return
     percentage = (current_step / total_steps) * 100
     progress_bar_length = 40
     filled_length = int(progress_bar_length * current_step // total_steps)
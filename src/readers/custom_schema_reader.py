@@ -0,0 +1,185 @@
+from itertools import islice
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator
+
+import pandas as pd
+
+from src.readers.json_stream import JsonSource, JsonStreamReader, open_json
+from src.readers.ocel_json_reader import object_classes_by_type
+from src.types_defintion.batch_definition import EventBatch, ObjectBatch, RelationshipBatch, RelationshipClass
+from src.types_defintion.object_definition import ObjectClassEnum
+from src.wrapper.ocel_wrapper import COREMetamodel
+
+# Sections of data sources, with the object type and class of their objects
+DATA_SOURCE_SECTIONS: Dict[str, Tuple[str, ObjectClassEnum]] = {
+    "iot_devices": ("iot_device", ObjectClassEnum.SENSOR),
+    "information_systems": ("information_system", ObjectClassEnum.INFORMATION_SYSTEM)
+}
+EVENT_SECTIONS: Dict[str, str] = {
+    "process_events": "process_event",
+    "iot_events": "iot_event",
+    "observations": "observation"
+}
+# Sections of relationships, with the relationship class, the keys of source and target and the default qualifier
+RELATIONSHIP_SECTIONS: Dict[str, Tuple[RelationshipClass, str, str, str]] = {
+    "object_object_relationships": ("object_object", "object_id", "related_object_id", "associated_with"),
+    "event_object_relationships": ("event_object", "event_id", "object_id", "related"),
+    "event_event_relationships": ("event_event", "event_id", "derived_from_event_id", "derived_from"),
+    "event_data_source_relationships": ("event_object", "event_id", "data_source_id", "related")
+}
+# Qualifier of the relationship of an observation to the IoT device it was made by
+OBSERVED_BY_QUALIFIER: str = "observed_by"
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _attribute_columns(attributes: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Attribute columns of a chunk of records, with None where a record lacks an attribute."""
+    names = dict.fromkeys(name for row in attributes for name in row)
+    return {name: [row.get(name) for row in attributes] for name in names}
+
+
+class CustomSchemaImporter:
+    """
+    Imports a file of the custom CCM schema (``schemas/json_schema.json``) into a model.
+
+    Every section is streamed record by record and appended to the model one chunk at a time, so memory is
+    bounded by the chunk size and the model instead of the file. Events and relationships are appended
+    column-wise as batches, objects included, so records are not validated against the CCM types apart from
+    their object classes; validate the file first where its origin is not trusted.
+    """
+
+    def __init__(
+            self,
+            model: Optional[COREMetamodel] = None,
+            chunk_size: int = 10_000,
+            object_classes: Optional[Dict[str, ObjectClassEnum]] = None,
+            default_object_class: ObjectClassEnum = ObjectClassEnum.BUSINESS_OBJECT
+    ) -> None:
+        """
+        :param model: Model the file is appended to. A new model by default.
+        :param chunk_size: Number of records appended to the model at a time.
+        :param object_classes: Object class by object type, for objects without an ``object_class``.
+        :param default_object_class: Class of objects whose class is neither recorded nor known for their type.
+        """
+        self.model: COREMetamodel = model if model is not None else COREMetamodel()
+        self.chunk_size: int = chunk_size
+        self.object_classes: Dict[str, ObjectClassEnum] = object_classes_by_type(object_classes)
+        self.default_object_class: ObjectClassEnum = default_object_class
+
+    def _object_class(self, record: Dict[str, Any]) -> ObjectClassEnum:
+        if record.get("object_class"):
+            return ObjectClassEnum(record["object_class"])
+        return self.object_classes.get(record["object_type"].lower(), self.default_object_class)
+
+    def _read_objects(self, records: Iterable[Dict[str, Any]]) -> None:
+        for chunk in _chunks(records, self.chunk_size):
+            self.model.append_batch(objects=ObjectBatch.from_columns(
+                [record["object_id"] for record in chunk],
+                [record["object_type"] for record in chunk],
+                [self._object_class(record) for record in chunk],
+                _attribute_columns([record.get("attributes") or {} for record in chunk])
+            ))
+
+    def _read_data_sources(self, records: Iterable[Dict[str, Any]], section: str) -> None:
+        object_type, object_class = DATA_SOURCE_SECTIONS[section]
+        for chunk in _chunks(records, self.chunk_size):
+            self.model.append_batch(objects=ObjectBatch.from_columns(
+                [record["data_source_id"] for record in chunk],
+                [object_type] * len(chunk),
+                [object_class] * len(chunk),
+                _attribute_columns([
+                    {**({"name": record["name"]} if "name" in record else {}), **(record.get("attributes") or {})}
+                    for record in chunk
+                ])
+            ))
+
+    def _read_events(self, records: Iterable[Dict[str, Any]], section: str) -> None:
+        event_class = EVENT_SECTIONS[section]
+        for chunk in _chunks(records, self.chunk_size):
+            if event_class == "observation":
+                event_ids = [record["observation_id"] for record in chunk]
+                event_types = activities = ["observation"] * len(chunk)
+                attributes = [{"iot_device_id": record["iot_device_id"], **(record.get("attributes") or {})}
+                              for record in chunk]
+            else:
+                event_ids = [record["event_id"] for record in chunk]
+                event_types = activities = [record["activity"]["activity_type"] for record in chunk]
+                attributes = [record.get("attributes") or {} for record in chunk]
+
+            batch = EventBatch()
+            batch.extend(
+                event_ids,
+                [event_class] * len(chunk),
+                event_types,
+                pd.DatetimeIndex(pd.to_datetime([record.get("timestamp") for record in chunk], utc=True,
+                                                format="ISO8601")),
+                activities=activities,
+                attributes=_attribute_columns(attributes)
+            )
+            relationships = None
+            if event_class == "observation":
+                relationships = RelationshipBatch.from_columns(
+                    ["event_object"] * len(chunk), event_ids, [row["iot_device_id"] for row in attributes],
+                    [OBSERVED_BY_QUALIFIER] * len(chunk))
+            self.model.append_batch(events=batch, relationships=relationships)
+
+    def _read_relationships(self, records: Iterable[Dict[str, Any]], section: str) -> None:
+        relationship_class, source_key, target_key, qualifier = RELATIONSHIP_SECTIONS[section]
+        for chunk in _chunks(records, self.chunk_size):
+            self.model.append_batch(relationships=RelationshipBatch.from_columns(
+                [relationship_class] * len(chunk),
+                [record[source_key] for record in chunk],
+                [record[target_key] for record in chunk],
+                [record.get("qualifier") or qualifier for record in chunk]
+            ))
+
+    def read(self, source: JsonSource) -> COREMetamodel:
+        """
+        Import a file.
+
+        :param source: Path of the file, optionally ``.gz`` or ``.zst`` compressed, or a text file object.
+        :return: The model.
+        """
+        if isinstance(source, str):
+            with open_json(source) as file:
+                return self.read(file)
+
+        reader = JsonStreamReader(source)
+        for section in reader.iter_keys():
+            records = reader.iter_items()
+            if section == "objects":
+                self._read_objects(records)
+            elif section in DATA_SOURCE_SECTIONS:
+                self._read_data_sources(records, section)
+            elif section in EVENT_SECTIONS:
+                self._read_events(records, section)
+            elif section in RELATIONSHIP_SECTIONS:
+                self._read_relationships(records, section)
+            else:
+                raise ValueError(f"Unknown section {section!r} in the custom schema file.")
+        return self.model
+
+
+def load_custom_schema(
+        source: JsonSource,
+        model: Optional[COREMetamodel] = None,
+        chunk_size: int = 10_000,
+        object_classes: Optional[Dict[str, ObjectClassEnum]] = None,
+        default_object_class: ObjectClassEnum = ObjectClassEnum.BUSINESS_OBJECT
+) -> COREMetamodel:
+    """
+    Import a file of the custom CCM schema into a model, streaming it chunk by chunk. See
+    :class:`CustomSchemaImporter`.
+
+    :param source: Path of the file, optionally ``.gz`` or ``.zst`` compressed, or a text file object.
+    :param model: Model the file is appended to. A new model by default.
+    :param chunk_size: Number of records appended to the model at a time.
+    :param object_classes: Object class by object type, for objects without an ``object_class``.
+    :param default_object_class: Class of objects whose class is neither recorded nor known for their type.
+    :return: The model.
+    """
+    return CustomSchemaImporter(model, chunk_size, object_classes, default_object_class).read(source)
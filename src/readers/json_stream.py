@@ -0,0 +1,128 @@
+import gzip
+import json
+import re
+from typing import Any, Iterator, Union, IO
+
+JsonSource = Union[str, IO[str]]
+
+_WHITESPACE: str = " \t\n\r"
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+
+
+def open_json(path: str) -> IO[str]:
+    """Open a JSON file for reading, decompressing ``.gz`` and ``.zst`` files on the fly."""
+    lowered = path.lower()
+    if lowered.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if lowered.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Please install zstandard using 'pip install zstandard' to read zstd compressed logs")
+        return zstandard.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+class JsonStreamReader:
+    """
+    Incremental reader of a JSON document that never holds more of it in memory than the value being read.
+
+    Containers are entered with :meth:`iter_keys` and :meth:`iter_items`, which stop at every member, and values
+    are decoded whole with :meth:`decode_value`. A large document, e.g. a log with an object of a million events,
+    can so be consumed record by record. Values are decoded by the C scanner of the :mod:`json` module.
+    """
+
+    def __init__(self, file: IO[str], buffer_size: int = 1 << 20) -> None:
+        """
+        :param file: Text file object positioned at the start of the document.
+        :param buffer_size: Number of characters read at a time.
+        """
+        self.file: IO[str] = file
+        self.buffer_size: int = buffer_size
+        self._buffer: str = ""
+        self._position: int = 0
+        self._eof: bool = False
+        self._decoder: json.JSONDecoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """
+        Read more of the document into the buffer, dropping what has been consumed.
+
+        :return: Whether anything was read.
+        """
+        if self._eof:
+            return False
+        # Read at least as much as is buffered, so that decoding a large value retries a bounded number of times
+        data = self.file.read(max(self.buffer_size, len(self._buffer) - self._position))
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position:] + data
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character without consuming it, or an empty string at the end."""
+        while True:
+            buffer, position = self._buffer, self._position
+            if position < len(buffer) and buffer[position] not in _WHITESPACE:
+                return buffer[position]
+            match = _NON_WHITESPACE.search(buffer, position)
+            if match is not None:
+                self._position = match.start()
+                return buffer[self._position]
+            self._position = len(buffer)
+            if not self._fill():
+                return ""
+
+    def _expect(self, characters: str) -> str:
+        """Consume the next character, which must be one of ``characters``."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} but found {character or 'the end'!r} in the JSON "
+                             f"document.")
+        self._position += 1
+        return character
+
+    def decode_value(self) -> Any:
+        """Decode the next value whole."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the part not read yet
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._position = end
+            return value
+
+    def iter_keys(self) -> Iterator[str]:
+        """
+        Enter the object at the current position and yield its keys. The reader stops at the value of each key,
+        which the caller must consume, with :meth:`decode_value` or by entering it, before advancing.
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self._position += 1
+            return
+        while True:
+            key = self.decode_value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def iter_items(self) -> Iterator[Any]:
+        """Enter the array at the current position and yield its items decoded whole."""
+        self._expect("[")
+        if self.peek() == "]":
+            self._position += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self._expect(",]") == "]":
+                return
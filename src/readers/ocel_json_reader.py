@@ -0,0 +1,354 @@
+from typing import Dict, List, Any, Optional, Tuple, Set
+
+import pandas as pd
+
+from src.readers.json_stream import JsonSource, JsonStreamReader, open_json
+from src.types_defintion.batch_definition import EventBatch, ObjectBatch, RelationshipBatch
+from src.types_defintion.object_definition import ObjectClassEnum
+from src.wrapper.ocel_wrapper import COREMetamodel, ATTRIBUTE_KEY_PREFIX
+
+EVENT_CLASSES: Tuple[str, ...] = ("iot_event", "process_event", "observation")
+# Prefix of the ids of the linking objects standing for event-event relationships, see COREMetamodel.save_ocel
+LINK_PREFIX: str = "e20_"
+LINK_TYPE: str = "link"
+
+# Object classes of object types written by the parsers and common vocabularies. Types named like a class, e.g.
+# "resource" or "Machine", get that class.
+OBJECT_TYPE_CLASSES: Dict[str, ObjectClassEnum] = {
+    "iot_device": ObjectClassEnum.SENSOR,
+    "sosa:sensor": ObjectClassEnum.SENSOR,
+    "sosa:actuator": ObjectClassEnum.ACTUATOR,
+    "case": ObjectClassEnum.CASE_OBJECT
+}
+
+# Keys of the OCEL 1.0 event and object records that are not attributes
+_EVENT_KEYS: Set[str] = {"ocel:activity", "ocel:timestamp", "ocel:event_type", "ocel:event_class",
+                         "ocel:event_subtype", "ocel:vmap", "ocel:omap", "ocel:typedOmap"}
+_OBJECT_KEYS: Set[str] = {"ocel:type", "ocel:object_class", "ocel:ovmap", "ocel:o2o"}
+# Attributes written by Ocel2Writer for the columns of the model
+_OCEL2_EVENT_KEYS: Set[str] = {"event_type", "event_class", "activity"}
+
+_EVENT_OBJECT_QUALIFIER: str = "related"
+_OBJECT_OBJECT_QUALIFIER: str = "associated_with"
+_EVENT_EVENT_QUALIFIER: str = "derived_from"
+
+# Id, activity, timestamp, event type, event class, attributes and related object ids with qualifiers
+_EventRecord = Tuple[str, Optional[str], str, Optional[str], str, Dict[str, Any], List[Tuple[str, str]]]
+# Id, object type, object class, attributes and related object ids with qualifiers
+_ObjectRecord = Tuple[str, str, Optional[str], Dict[str, Any], List[Tuple[str, str]]]
+
+
+def object_classes_by_type(object_classes: Optional[Dict[str, ObjectClassEnum]] = None) -> Dict[str, ObjectClassEnum]:
+    """
+    Object class by lower-cased object type, from the class names, :data:`OBJECT_TYPE_CLASSES` and
+    ``object_classes``, in increasing precedence.
+    """
+    return {
+        **{object_class.value: object_class for object_class in ObjectClassEnum},
+        **OBJECT_TYPE_CLASSES,
+        **{object_type.lower(): ObjectClassEnum(object_class)
+           for object_type, object_class in (object_classes or {}).items()}
+    }
+
+
+def _attributes(record: Dict[str, Any], values_key: str, structural: Set[str]) -> Dict[str, Any]:
+    """Collect the attributes of an OCEL 1.0 record, from its value map and its ``ocel:attr:`` keys."""
+    attributes = dict(record.get(values_key) or {})
+    for key, value in record.items():
+        if key not in structural:
+            attributes[key[len(ATTRIBUTE_KEY_PREFIX):] if key.startswith(ATTRIBUTE_KEY_PREFIX) else key] = value
+    return attributes
+
+
+def _qualifier(value: Any, default: str) -> str:
+    """The qualifier of a relation, or ``default`` for missing ones, which pm4py writes as NaN."""
+    return value if isinstance(value, str) and value else default
+
+
+def _event_class(*candidates: Any) -> str:
+    """The first candidate naming an event class, e.g. ``ocel:event_class`` or the older ``ocel:event_subtype``."""
+    for candidate in candidates:
+        if candidate in EVENT_CLASSES:
+            return candidate
+    return "process_event"
+
+
+def _ocel1_event(event_id: str, record: Dict[str, Any]) -> _EventRecord:
+    if "ocel:typedOmap" in record:
+        objects = [(entry["ocel:oid"], _qualifier(entry.get("ocel:qualifier"), _EVENT_OBJECT_QUALIFIER))
+                   for entry in record["ocel:typedOmap"]]
+    else:
+        objects = [(object_id, _EVENT_OBJECT_QUALIFIER) for object_id in record.get("ocel:omap", [])]
+    return (
+        event_id,
+        record.get("ocel:activity"),
+        record["ocel:timestamp"],
+        record.get("ocel:event_type"),
+        _event_class(record.get("ocel:event_class"), record.get("ocel:event_subtype"), record.get("ocel:event_type")),
+        _attributes(record, "ocel:vmap", _EVENT_KEYS),
+        objects
+    )
+
+
+def _ocel1_object(object_id: str, record: Dict[str, Any]) -> _ObjectRecord:
+    return (
+        object_id,
+        record["ocel:type"],
+        record.get("ocel:object_class"),
+        _attributes(record, "ocel:ovmap", _OBJECT_KEYS),
+        [(entry["ocel:oid"], _qualifier(entry.get("ocel:qualifier"), _OBJECT_OBJECT_QUALIFIER))
+         for entry in record.get("ocel:o2o", [])]
+    )
+
+
+def _ocel2_event(record: Dict[str, Any]) -> _EventRecord:
+    attributes = {entry["name"]: entry["value"] for entry in record.get("attributes", [])}
+    return (
+        record["id"],
+        attributes.get("activity", record["type"]),
+        record["time"],
+        attributes.get("event_type", record["type"]),
+        _event_class(attributes.get("event_class")),
+        {name: value for name, value in attributes.items() if name not in _OCEL2_EVENT_KEYS},
+        [(entry["objectId"], _qualifier(entry.get("qualifier"), _EVENT_OBJECT_QUALIFIER))
+         for entry in record.get("relationships", [])]
+    )
+
+
+def _ocel2_object(record: Dict[str, Any]) -> _ObjectRecord:
+    # Attribute changes are not modelled, the latest value of every attribute is kept
+    attributes = {entry["name"]: entry["value"]
+                  for entry in sorted(record.get("attributes", []), key=lambda entry: entry.get("time", ""))}
+    return (
+        record["id"],
+        record["type"],
+        attributes.pop("object_class", None),
+        attributes,
+        [(entry["objectId"], _qualifier(entry.get("qualifier"), _OBJECT_OBJECT_QUALIFIER))
+         for entry in record.get("relationships", [])]
+    )
+
+
+class OcelJsonImporter:
+    """
+    Imports an OCEL JSON log into a model, streaming its events and objects chunk by chunk.
+
+    Both the OCEL 1.0 layout of ``.jsonocel`` files, with events and objects keyed by id, and the OCEL 2.0 JSON
+    layout written by :mod:`src.writers.ocel2_writer` are read. Only the records of one chunk are held as Python
+    objects; every chunk is appended to the model column-wise as an EventBatch and RelationshipBatch.
+
+    Event classes are recovered from ``ocel:event_class`` or the older ``ocel:event_subtype``. Object classes are
+    recovered from ``ocel:object_class`` when present, and otherwise from the object type. Linking objects
+    written for event-event relationships are turned back into E2E relationships.
+    """
+
+    def __init__(
+            self,
+            model: Optional[COREMetamodel] = None,
+            chunk_size: int = 10_000,
+            object_classes: Optional[Dict[str, ObjectClassEnum]] = None,
+            default_object_class: ObjectClassEnum = ObjectClassEnum.BUSINESS_OBJECT,
+            restore_links: bool = True
+    ) -> None:
+        """
+        :param model: Model the log is appended to. A new model by default.
+        :param chunk_size: Number of events or objects appended to the model at a time.
+        :param object_classes: Object class by object type, taking precedence over the built-in mapping.
+        :param default_object_class: Class of objects whose class is neither recorded nor known for their type.
+        :param restore_links: Whether to turn linking objects back into event-event relationships.
+        """
+        self.model: COREMetamodel = model if model is not None else COREMetamodel()
+        self.chunk_size: int = chunk_size
+        self.object_classes: Dict[str, ObjectClassEnum] = object_classes_by_type(object_classes)
+        self.default_object_class: ObjectClassEnum = default_object_class
+        self.restore_links: bool = restore_links
+
+        self._events: List[_EventRecord] = []
+        self._objects: List[_ObjectRecord] = []
+        # Relations to possible linking objects and the linking objects, kept until the whole log is read
+        self._link_relations: List[Tuple[str, str, str]] = []
+        self._link_objects: Dict[str, _ObjectRecord] = {}
+
+    def _object_class(self, object_type: str, object_class: Optional[str]) -> ObjectClassEnum:
+        if object_class:
+            try:
+                # Classes may be written with their category, e.g. "data_source:sensor"
+                return ObjectClassEnum(str(object_class).rsplit(":", 1)[-1])
+            except ValueError:
+                pass
+        return self.object_classes.get(str(object_type).lower(), self.default_object_class)
+
+    def _add_event(self, record: _EventRecord) -> None:
+        self._events.append(record)
+        if len(self._events) >= self.chunk_size:
+            self._flush_events()
+
+    def _add_object(self, record: _ObjectRecord) -> None:
+        if self.restore_links and record[1] == LINK_TYPE:
+            self._link_objects[record[0]] = record
+            return
+        self._objects.append(record)
+        if len(self._objects) >= self.chunk_size:
+            self._flush_objects()
+
+    def _flush_events(self) -> None:
+        if not self._events:
+            return
+        event_ids, activities, timestamps, event_types, event_classes, attributes, objects = zip(*self._events)
+        self._events = []
+
+        names = list(dict.fromkeys(name for row in attributes for name in row))
+        batch = EventBatch()
+        batch.extend(
+            event_ids,
+            event_classes,
+            [event_type if event_type is not None else activity
+             for event_type, activity in zip(event_types, activities)],
+            pd.DatetimeIndex(pd.to_datetime(list(timestamps), utc=True, format="ISO8601")),
+            activities=activities,
+            attributes={name: [row.get(name) for row in attributes] for name in names}
+        )
+
+        sources: List[str] = []
+        targets: List[str] = []
+        qualifiers: List[str] = []
+        for event_id, related in zip(event_ids, objects):
+            for object_id, qualifier in related:
+                if self.restore_links and str(object_id).startswith(LINK_PREFIX):
+                    self._link_relations.append((event_id, object_id, qualifier))
+                    continue
+                sources.append(event_id)
+                targets.append(object_id)
+                qualifiers.append(qualifier)
+        self.model.append_batch(events=batch, relationships=RelationshipBatch.from_columns(
+            ["event_object"] * len(sources), sources, targets, qualifiers))
+
+    def _flush_objects(self) -> None:
+        if not self._objects:
+            return
+        records, self._objects = self._objects, []
+        object_ids, object_types, object_classes, attributes, _ = zip(*records)
+
+        names = list(dict.fromkeys(name for row in attributes for name in row))
+        objects = ObjectBatch.from_columns(
+            object_ids,
+            object_types,
+            [self._object_class(object_type, object_class)
+             for object_type, object_class in zip(object_types, object_classes)],
+            {name: [row.get(name) for row in attributes] for name in names}
+        )
+        relationships = [(object_id, related_id, qualifier)
+                         for object_id, _, _, _, related in records for related_id, qualifier in related]
+        self.model.append_batch(objects=objects, relationships=RelationshipBatch.from_columns(
+            ["object_object"] * len(relationships),
+            [row[0] for row in relationships], [row[1] for row in relationships], [row[2] for row in relationships]
+        ))
+
+    def _restore_links(self) -> None:
+        """
+        Turn linking objects back into event-event relationships. A linking object is related to the source event
+        with "derived_from" and to the target event with "derived_to". Logs without qualifiers fall back to the
+        id of the linking object, ``e20_<source>_<target>``. Linking objects that cannot be resolved, and relations
+        to other objects with the prefix, are kept as they are.
+        """
+        relations, self._link_relations = self._link_relations, []
+        links: Dict[str, Dict[str, List[str]]] = {}
+        kept: List[Tuple[str, str, str]] = []
+        for event_id, object_id, qualifier in relations:
+            if object_id in self._link_objects:
+                links.setdefault(object_id, {}).setdefault(qualifier, []).append(event_id)
+            else:
+                kept.append((event_id, object_id, qualifier))
+
+        pairs: Dict[Tuple[str, str], None] = {}
+        for link_id, by_qualifier in links.items():
+            sources, targets = by_qualifier.get("derived_from", []), by_qualifier.get("derived_to", [])
+            if len(sources) == 1 and len(targets) == 1:
+                pairs[(sources[0], targets[0])] = None
+                continue
+            events = [event_id for related in by_qualifier.values() for event_id in related]
+            if len(events) == 2 and link_id in (f"{LINK_PREFIX}{events[0]}_{events[1]}",
+                                                f"{LINK_PREFIX}{events[1]}_{events[0]}"):
+                source, target = events if link_id == f"{LINK_PREFIX}{events[0]}_{events[1]}" else events[::-1]
+                pairs[(source, target)] = None
+                continue
+            self._objects.append(self._link_objects[link_id])
+            kept.extend((event_id, link_id, qualifier)
+                        for qualifier, related in by_qualifier.items() for event_id in related)
+        # Linking objects no event refers to are kept as well
+        self._objects.extend(record for link_id, record in self._link_objects.items() if link_id not in links)
+        self._link_objects = {}
+        self._flush_objects()
+
+        rows = [("event_object", *row) for row in kept] + [
+            ("event_event", source, target, _EVENT_EVENT_QUALIFIER) for source, target in pairs]
+        if rows:
+            self.model.append_batch(relationships=RelationshipBatch.from_columns(*(list(column)
+                                                                                     for column in zip(*rows))))
+
+    def _read_ocel1(self, reader: JsonStreamReader, key: str) -> bool:
+        if key == "ocel:events":
+            for event_id in reader.iter_keys():
+                self._add_event(_ocel1_event(event_id, reader.decode_value()))
+        elif key == "ocel:objects":
+            for object_id in reader.iter_keys():
+                self._add_object(_ocel1_object(object_id, reader.decode_value()))
+        else:
+            return False
+        return True
+
+    def _read_ocel2(self, reader: JsonStreamReader, key: str) -> bool:
+        if key == "events":
+            for record in reader.iter_items():
+                self._add_event(_ocel2_event(record))
+        elif key == "objects":
+            for record in reader.iter_items():
+                self._add_object(_ocel2_object(record))
+        else:
+            return False
+        return True
+
+    def read(self, source: JsonSource) -> COREMetamodel:
+        """
+        Import a log.
+
+        :param source: Path of the log, optionally ``.gz`` or ``.zst`` compressed, or a text file object.
+        :return: The model.
+        """
+        if isinstance(source, str):
+            with open_json(source) as file:
+                return self.read(file)
+
+        reader = JsonStreamReader(source)
+        for key in reader.iter_keys():
+            if not self._read_ocel1(reader, key) and not self._read_ocel2(reader, key):
+                # Global sections and type declarations carry nothing the model keeps
+                reader.decode_value()
+        self._flush_events()
+        self._flush_objects()
+        if self.restore_links:
+            self._restore_links()
+        return self.model
+
+
+def load_ocel_json(
+        source: JsonSource,
+        model: Optional[COREMetamodel] = None,
+        chunk_size: int = 10_000,
+        object_classes: Optional[Dict[str, ObjectClassEnum]] = None,
+        default_object_class: ObjectClassEnum = ObjectClassEnum.BUSINESS_OBJECT,
+        restore_links: bool = True
+) -> COREMetamodel:
+    """
+    Import an OCEL 1.0 ``.jsonocel`` or OCEL 2.0 JSON log into a model, streaming it chunk by chunk. See
+    :class:`OcelJsonImporter`.
+
+    :param source: Path of the log, optionally ``.gz`` or ``.zst`` compressed, or a text file object.
+    :param model: Model the log is appended to. A new model by default.
+    :param chunk_size: Number of events or objects appended to the model at a time.
+    :param object_classes: Object class by object type, e.g. ``{"Order": ObjectClassEnum.BUSINESS_OBJECT}``.
+    :param default_object_class: Class of objects whose class is neither recorded nor known for their type.
+    :param restore_links: Whether to turn linking objects back into event-event relationships.
+    :return: The model.
+    """
+    return OcelJsonImporter(model, chunk_size, object_classes, default_object_class, restore_links).read(source)
@@ -0,0 +1,71 @@
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, Iterator, Optional, Union, IO
+
+XesSource = Union[str, IO[bytes]]
+
+
+def _qualified_name(name: str, prefixes: Dict[str, str]) -> str:
+    """Turn an ElementTree ``{uri}local`` name back into the ``prefix:local`` name used in the document."""
+    if not name.startswith("{"):
+        return name
+    uri, local = name[1:].split("}", 1)
+    prefix = prefixes.get(uri, "")
+    return f"{prefix}:{local}" if prefix else local
+
+
+def _element_to_dict(element: ET.Element, prefixes: Dict[str, str]) -> Optional[Union[Dict[str, Any], str]]:
+    """
+    Convert an element to the structure ``xmltodict.parse`` produces: attributes are prefixed with "@", children
+    are keyed by tag and repeated tags become lists.
+    """
+    node: Dict[str, Any] = {"@" + _qualified_name(name, prefixes): value for name, value in element.attrib.items()}
+
+    for child in element:
+        key = _qualified_name(child.tag, prefixes)
+        value = _element_to_dict(child, prefixes)
+        if key not in node:
+            node[key] = value
+        elif isinstance(node[key], list):
+            node[key].append(value)
+        else:
+            node[key] = [node[key], value]
+
+    text = element.text.strip() if element.text else ""
+    if text:
+        if not node:
+            return text
+        node["#text"] = text
+    return node or None
+
+
+def iter_xes_events(source: XesSource) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the events of an XES log one at a time.
+
+    The log is parsed incrementally and every ``<event>`` element is dropped once it is converted, so memory is
+    bounded by a single event instead of the whole document. Events are converted to the same dictionaries
+    ``xmltodict.parse`` produces for them, e.g. ``event["string"]`` holds the list of ``@key``/``@value``
+    attributes, so code written for xmltodict documents can consume the stream unchanged.
+
+    :param source: Path or binary file object of the XES log.
+    :return: Iterator over the events in document order.
+    :raises xml.etree.ElementTree.ParseError: If the document is malformed. Events before the error have been
+        yielded already.
+    """
+    prefixes: Dict[str, str] = {}
+    # Open elements from the root down, used to detach finished events from their trace
+    path = []
+
+    for kind, item in ET.iterparse(source, events=("start-ns", "start", "end")):
+        if kind == "start-ns":
+            prefix, uri = item
+            prefixes.setdefault(uri, prefix)
+        elif kind == "start":
+            path.append(item)
+        else:
+            path.pop()
+            if _qualified_name(item.tag, prefixes) == "event":
+                yield _element_to_dict(item, prefixes) or {}
+                item.clear()
+                if path:
+                    path[-1].remove(item)
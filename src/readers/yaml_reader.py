@@ -0,0 +1,69 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Iterator, Optional, Callable, Sequence, Union, IO
+
+import yaml
+
+# The libyaml based loader is an order of magnitude faster than the pure Python one
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+YamlSource = Union[str, IO[str]]
+DocumentTransform = Callable[[Any], Any]
+
+
+def iter_yaml_documents(source: YamlSource) -> Iterator[Any]:
+    """
+    Stream the documents of a multi-document YAML file one at a time.
+
+    :param source: Path or text file object of the YAML file.
+    :return: Iterator over the loaded documents.
+    """
+    if isinstance(source, str):
+        with open(source, "r") as file:
+            yield from yaml.load_all(file, Loader=SafeLoader)
+    else:
+        yield from yaml.load_all(source, Loader=SafeLoader)
+
+
+def _load_file(path: str, transform: Optional[DocumentTransform]) -> List[Any]:
+    """Load all documents of one file, optionally transformed. Runs in a worker process."""
+    documents = iter_yaml_documents(path)
+    if transform is None:
+        return list(documents)
+    return [transform(document) for document in documents]
+
+
+def iter_yaml_files(
+        paths: Sequence[str],
+        workers: Optional[int] = None,
+        transform: Optional[DocumentTransform] = None
+) -> Iterator[Any]:
+    """
+    Stream the documents of several YAML files, in file order.
+
+    With more than one worker the files are loaded in worker processes. Each worker returns the documents of one
+    file and at most two files per worker are in flight, so memory is bounded by those files instead of the whole
+    batch, even if the consumer is slower than the workers.
+
+    :param paths: Paths of the YAML files.
+    :param workers: Number of worker processes. Defaults to the number of CPUs; 1 loads in this process.
+    :param transform: Picklable function applied to every document in the worker, e.g. to reduce a document to
+        the fields the consumer needs before it is sent back.
+    :return: Iterator over the (transformed) documents.
+    """
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            for document in iter_yaml_documents(path):
+                yield document if transform is None else transform(document)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque = deque()
+        for path in paths:
+            pending.append(executor.submit(_load_file, path, transform))
+            while len(pending) > 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
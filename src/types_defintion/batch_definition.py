@@ -0,0 +1,411 @@
+from datetime import datetime
+from typing import Dict, Any, Literal, Optional, List, Iterator, Sequence, Union
+
+from src.types_defintion.event_definition import Event, IotEvent, ProcessEvent, Observation
+from src.types_defintion.object_definition import Object, ObjectClassEnum
+from src.types_defintion.relationship_definitions import ObjectObjectRelationship, EventObjectRelationship, \
+    EventEventRelationship
+from src.utils.table_buffer import TableBuffer
+
+EventClass = Literal["iot_event", "process_event", "observation"]
+RelationshipClass = Literal["event_object", "object_object", "event_event"]
+
+EVENT_MODELS = {
+    "iot_event": IotEvent,
+    "process_event": ProcessEvent,
+    "observation": Observation
+}
+
+# Columns holding the entity fields. Attributes are stored next to them with ATTRIBUTE_PREFIX
+EVENT_FIELDS: List[str] = ["event_id", "event_class", "event_type", "timestamp", "activity"]
+OBJECT_FIELDS: List[str] = ["object_id", "object_type", "object_class"]
+# Source and target are (event, object), (object, related object) or (event, derived from event) by class
+RELATIONSHIP_FIELDS: List[str] = ["relationship_class", "source_id", "target_id", "qualifier"]
+ATTRIBUTE_PREFIX: str = "attr:"
+
+
+def _check_event_classes(event_classes: Sequence[Any]) -> None:
+    """Raise a ValueError if a class has no event model, before the batch is changed."""
+    unknown = set(event_classes).difference(EVENT_MODELS)
+    if unknown:
+        raise ValueError(f"Unknown event classes {sorted(map(str, unknown))}, expected one of {list(EVENT_MODELS)}.")
+
+
+class EventView:
+    """Read-only view of one row of an :class:`EventBatch`, exposing the fields of an :class:`Event`."""
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "EventBatch", index: int) -> None:
+        self._batch = batch
+        self._index = index
+
+    @property
+    def event_id(self) -> str:
+        return self._batch.table.value(self._index, "event_id")
+
+    @property
+    def event_class(self) -> EventClass:
+        return self._batch.table.value(self._index, "event_class")
+
+    @property
+    def event_type(self) -> str:
+        return self._batch.table.value(self._index, "event_type")
+
+    @property
+    def timestamp(self) -> datetime:
+        return self._batch.table.value(self._index, "timestamp")
+
+    @property
+    def activity(self) -> Optional[str]:
+        return self._batch.table.value(self._index, "activity")
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        """Return the attributes of the event. Attributes that are missing in this row are left out."""
+        attributes = {}
+        for name in self._batch.attribute_names:
+            value = self._batch.table.value(self._index, ATTRIBUTE_PREFIX + name)
+            if value is not None:
+                attributes[name] = value
+        return attributes
+
+    def to_model(self) -> Event:
+        """Materialize the row as a pydantic event of the matching class."""
+        fields = {
+            "event_id": self.event_id,
+            "event_type": self.event_type,
+            "timestamp": self.timestamp,
+            "attributes": self.attributes
+        }
+        if self.event_class == "process_event":
+            fields["activity"] = self.activity
+        return EVENT_MODELS[self.event_class](**fields)
+
+    def __str__(self):
+        return f"{self.event_class}:{self.event_id}"
+
+
+class ObjectView:
+    """Read-only view of one row of an :class:`ObjectBatch`, exposing the fields of an :class:`Object`."""
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "ObjectBatch", index: int) -> None:
+        self._batch = batch
+        self._index = index
+
+    @property
+    def object_id(self) -> str:
+        return self._batch.table.value(self._index, "object_id")
+
+    @property
+    def object_type(self) -> str:
+        return self._batch.table.value(self._index, "object_type")
+
+    @property
+    def object_class(self) -> ObjectClassEnum:
+        return ObjectClassEnum(self._batch.table.value(self._index, "object_class"))
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        """Return the attributes of the object. Attributes that are missing in this row are left out."""
+        attributes = {}
+        for name in self._batch.attribute_names:
+            value = self._batch.table.value(self._index, ATTRIBUTE_PREFIX + name)
+            if value is not None:
+                attributes[name] = value
+        return attributes
+
+    def to_model(self) -> Object:
+        """Materialize the row as a pydantic object."""
+        return Object(
+            object_id=self.object_id,
+            object_type=self.object_type,
+            object_class=self.object_class,
+            attributes=self.attributes
+        )
+
+
+class _Batch:
+    """Struct-of-arrays storage shared by event and object batches."""
+
+    def __init__(self, fields: List[str], kinds: Dict[str, Any]) -> None:
+        self.table: TableBuffer = TableBuffer(fields, kinds=kinds, attribute_prefix=ATTRIBUTE_PREFIX)
+        self._fields: List[str] = fields
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @property
+    def attribute_names(self) -> List[str]:
+        """Return the names of all attributes used by any row, i.e. the shared attribute schema."""
+        return [name[len(ATTRIBUTE_PREFIX):] for name in self.table.columns if name.startswith(ATTRIBUTE_PREFIX)]
+
+    def field(self, name: str) -> Any:
+        """
+        Return the column buffer of an entity field or attribute, to be consumed in bulk.
+
+        :param name: Name of an entity field, or of an attribute prefixed with ``ATTRIBUTE_PREFIX``.
+        :return: The column buffer.
+        """
+        return self.table.column(name)
+
+    def _extend(self, columns: Dict[str, Sequence[Any]], attributes: Optional[Dict[str, Sequence[Any]]]) -> None:
+        length = len(next(iter(columns.values())))
+        all_columns = dict(columns)
+        for name, values in (attributes or {}).items():
+            all_columns[ATTRIBUTE_PREFIX + name] = values
+        self.table.extend_columns(all_columns, length)
+
+
+class EventBatch(_Batch):
+    """
+    Compact container for many events, stored as parallel arrays instead of one pydantic model per event.
+
+    Ids, classes, types, timestamps and activities are kept in one typed buffer each and all events share
+    one attribute schema: every attribute is a column, missing values are padded. Iterating the batch
+    yields lightweight :class:`EventView` rows. :class:`COREMetamodel` consumes batches column-wise.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(EVENT_FIELDS, kinds={"event_class": "category", "timestamp": "timestamp"})
+
+    @classmethod
+    def from_columns(
+            cls,
+            event_ids: Sequence[str],
+            event_classes: Sequence[EventClass],
+            event_types: Sequence[str],
+            timestamps: Sequence[Any],
+            activities: Optional[Sequence[Optional[str]]] = None,
+            attributes: Optional[Dict[str, Sequence[Any]]] = None
+    ) -> "EventBatch":
+        """
+        Create a batch from whole columns, e.g. NumPy arrays produced by vectorized parsing.
+
+        :param event_ids: Ids of the events.
+        :param event_classes: Class of every event ("iot_event", "process_event" or "observation").
+        :param event_types: Type of every event.
+        :param timestamps: Timestamps as datetimes, ISO strings or a ``datetime64`` array. Naive values are UTC.
+        :param activities: Activity of every process event. None for other classes.
+        :param attributes: Attribute columns by attribute name.
+        :return: The new batch.
+        :raises ValueError: If an event class is not one of :data:`EVENT_MODELS`.
+        """
+        batch = cls()
+        batch.extend(event_ids, event_classes, event_types, timestamps, activities, attributes)
+        return batch
+
+    def extend(
+            self,
+            event_ids: Sequence[str],
+            event_classes: Sequence[EventClass],
+            event_types: Sequence[str],
+            timestamps: Sequence[Any],
+            activities: Optional[Sequence[Optional[str]]] = None,
+            attributes: Optional[Dict[str, Sequence[Any]]] = None
+    ) -> None:
+        """Append whole columns of events. See :meth:`from_columns` for the parameters."""
+        _check_event_classes(event_classes)
+        columns = {
+            "event_id": event_ids,
+            "event_class": event_classes,
+            "event_type": event_types,
+            "timestamp": timestamps
+        }
+        if activities is not None:
+            columns["activity"] = activities
+        self._extend(columns, attributes)
+
+    def append(
+            self,
+            event_id: str,
+            event_class: EventClass,
+            event_type: str,
+            timestamp: Any,
+            attributes: Optional[Dict[str, Any]] = None,
+            activity: Optional[str] = None
+    ) -> None:
+        """
+        Append a single event.
+
+        :param event_id: Id of the event.
+        :param event_class: Class of the event.
+        :param event_type: Type of the event.
+        :param timestamp: Timestamp of the event.
+        :param attributes: Attributes of the event.
+        :param activity: Activity of a process event.
+        :raises ValueError: If the event class is not one of :data:`EVENT_MODELS`.
+        """
+        if event_class not in EVENT_MODELS:
+            _check_event_classes((event_class,))
+        self.table.append_record((event_id, event_class, event_type, timestamp, activity), attributes)
+
+    def append_event(self, event: Event) -> None:
+        """Append a pydantic event."""
+        self.append(
+            event.event_id, event.event_class, event.event_type, event.timestamp, event.attributes,
+            getattr(event, "activity", None)
+        )
+
+    def __getitem__(self, index: int) -> EventView:
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Event {index} out of range for a batch of {len(self)} events.")
+        return EventView(self, index % len(self))
+
+    def __iter__(self) -> Iterator[EventView]:
+        return (EventView(self, index) for index in range(len(self)))
+
+
+class ObjectBatch(_Batch):
+    """
+    Compact container for many objects, stored as parallel arrays instead of one pydantic model per object.
+
+    Iterating the batch yields lightweight :class:`ObjectView` rows.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(OBJECT_FIELDS, kinds={"object_type": "category", "object_class": "category"})
+
+    @classmethod
+    def from_columns(
+            cls,
+            object_ids: Sequence[str],
+            object_types: Sequence[str],
+            object_classes: Sequence[ObjectClassEnum],
+            attributes: Optional[Dict[str, Sequence[Any]]] = None
+    ) -> "ObjectBatch":
+        """
+        Create a batch from whole columns.
+
+        :param object_ids: Ids of the objects.
+        :param object_types: Type of every object.
+        :param object_classes: Class of every object.
+        :param attributes: Attribute columns by attribute name.
+        :return: The new batch.
+        """
+        batch = cls()
+        batch.extend(object_ids, object_types, object_classes, attributes)
+        return batch
+
+    def extend(
+            self,
+            object_ids: Sequence[str],
+            object_types: Sequence[str],
+            object_classes: Sequence[ObjectClassEnum],
+            attributes: Optional[Dict[str, Sequence[Any]]] = None
+    ) -> None:
+        """Append whole columns of objects. See :meth:`from_columns` for the parameters."""
+        self._extend({"object_id": object_ids, "object_type": object_types, "object_class": object_classes},
+                     attributes)
+
+    def append(
+            self,
+            object_id: str,
+            object_type: str,
+            object_class: ObjectClassEnum,
+            attributes: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Append a single object.
+
+        :param object_id: Id of the object.
+        :param object_type: Type of the object.
+        :param object_class: Class of the object.
+        :param attributes: Attributes of the object.
+        """
+        self.table.append_record((object_id, object_type, object_class), attributes)
+
+    def __getitem__(self, index: int) -> ObjectView:
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Object {index} out of range for a batch of {len(self)} objects.")
+        return ObjectView(self, index % len(self))
+
+    def __iter__(self) -> Iterator[ObjectView]:
+        return (ObjectView(self, index) for index in range(len(self)))
+
+
+class RelationshipBatch(_Batch):
+    """
+    Compact container for many relationships of any class, stored as parallel arrays.
+
+    Every row holds the class of the relationship, its source and target id and its qualifier. For event-object
+    relationships the source is the event and the target the object, for object-object relationships the source
+    is the object and the target the related object, and for event-event relationships the source is the event
+    and the target the event it is derived from. Iterating the batch yields pydantic relationships.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(RELATIONSHIP_FIELDS, kinds={"relationship_class": "category", "qualifier": "category"})
+
+    @classmethod
+    def from_columns(
+            cls,
+            relationship_classes: Sequence[RelationshipClass],
+            source_ids: Sequence[str],
+            target_ids: Sequence[str],
+            qualifiers: Sequence[str]
+    ) -> "RelationshipBatch":
+        """
+        Create a batch from whole columns.
+
+        :param relationship_classes: Class of every relationship.
+        :param source_ids: Event id, or object id for object-object relationships.
+        :param target_ids: Object id, related object id or derived from event id, depending on the class.
+        :param qualifiers: Qualifier of every relationship.
+        :return: The new batch.
+        """
+        batch = cls()
+        batch.extend(relationship_classes, source_ids, target_ids, qualifiers)
+        return batch
+
+    def extend(
+            self,
+            relationship_classes: Sequence[RelationshipClass],
+            source_ids: Sequence[str],
+            target_ids: Sequence[str],
+            qualifiers: Sequence[str]
+    ) -> None:
+        """Append whole columns of relationships. See :meth:`from_columns` for the parameters."""
+        self._extend({
+            "relationship_class": relationship_classes,
+            "source_id": source_ids,
+            "target_id": target_ids,
+            "qualifier": qualifiers
+        }, None)
+
+    def append(self, relationship_class: RelationshipClass, source_id: str, target_id: str, qualifier: str) -> None:
+        """
+        Append a single relationship.
+
+        :param relationship_class: Class of the relationship.
+        :param source_id: Event id, or object id for object-object relationships.
+        :param target_id: Object id, related object id or derived from event id, depending on the class.
+        :param qualifier: Qualifier of the relationship.
+        """
+        self.table.append_record((relationship_class, source_id, target_id, qualifier))
+
+    def append_relationship(
+            self,
+            relationship: Union[ObjectObjectRelationship, EventObjectRelationship, EventEventRelationship]
+    ) -> None:
+        """Append a pydantic relationship."""
+        if isinstance(relationship, EventEventRelationship):
+            self.append("event_event", relationship.event_id, relationship.derived_from_event_id,
+                        relationship.qualifier)
+        elif isinstance(relationship, EventObjectRelationship):
+            self.append("event_object", relationship.event_id, relationship.object_id, relationship.qualifier)
+        elif isinstance(relationship, ObjectObjectRelationship):
+            self.append("object_object", relationship.object_id, relationship.related_object_id,
+                        relationship.qualifier)
+        else:
+            raise TypeError(f"Unsupported relationship type: {type(relationship).__name__}")
+
+    def __iter__(self) -> Iterator[Union[ObjectObjectRelationship, EventObjectRelationship, EventEventRelationship]]:
+        for relationship_class, source_id, target_id, qualifier in zip(
+                *(self.field(name).to_list() for name in RELATIONSHIP_FIELDS)):
+            if relationship_class == "event_event":
+                yield EventEventRelationship(event_id=source_id, derived_from_event_id=target_id, qualifier=qualifier)
+            elif relationship_class == "event_object":
+                yield EventObjectRelationship(event_id=source_id, object_id=target_id, qualifier=qualifier)
+            else:
+                yield ObjectObjectRelationship(object_id=source_id, related_object_id=target_id, qualifier=qualifier)
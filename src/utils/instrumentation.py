@@ -0,0 +1,208 @@
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """Measurement of one phase: wall time, rows processed and peak traced memory."""
+    __slots__ = ("name", "parent", "rows", "wall_time", "peak_memory", "_start", "_memory_start", "_peak")
+
+    def __init__(self, name: str, parent: Optional[str] = None, rows: int = 0) -> None:
+        """
+        Initializes a span.
+
+        :param name: Name of the phase.
+        :param parent: Name of the enclosing span, if any.
+        :param rows: Rows already known to be processed by the phase.
+        """
+        self.name: str = name
+        self.parent: Optional[str] = parent
+        self.rows: int = rows
+        self.wall_time: float = 0.0
+        # Bytes allocated on top of the memory in use at the start of the span, None if memory is not tracked
+        self.peak_memory: Optional[int] = None
+        self._start: float = 0.0
+        self._memory_start: int = 0
+        self._peak: int = 0
+
+    def add_rows(self, rows: int) -> None:
+        """Count rows processed by the phase."""
+        self.rows += rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the span as a JSON-serializable dictionary."""
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "rows": self.rows,
+            "wall_time": self.wall_time,
+            "peak_memory": self.peak_memory
+        }
+
+
+class _NullSpan(Span):
+    """Span that records nothing."""
+    __slots__ = ()
+
+    def add_rows(self, rows: int) -> None:
+        pass
+
+
+class Instrumentation:
+    """
+    Records spans of the phases of a computation.
+
+    Phases are wrapped in ``with instrumentation.span("objects", rows=len(objects)):``. Spans can be nested;
+    every finished span is kept in ``spans`` and, if a logger is set, logged at INFO level. Spans opened in
+    different threads nest per thread. Peak memory is measured with ``tracemalloc``, which slows down
+    allocations, so it is only tracked on request. It is process-wide, so spans running concurrently in
+    several threads share their peaks. Tracing is started by the first span and stopped when the last open span
+    ends, unless it was already running before.
+    """
+
+    def __init__(self, track_memory: bool = False, log: Optional[logging.Logger] = logger) -> None:
+        """
+        Initializes an empty recorder.
+
+        :param track_memory: Whether to measure the peak memory of every span with ``tracemalloc``.
+        :param log: Logger that receives every finished span. None to only record the spans.
+        """
+        self.track_memory: bool = track_memory
+        self.log: Optional[logging.Logger] = log
+        self.spans: List[Span] = []
+        self._local = threading.local()
+        # Spans open in any thread while memory is tracked, and whether this recorder started tracemalloc
+        self._memory_spans: int = 0
+        self._started_tracing: bool = False
+        self._memory_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are recorded."""
+        return True
+
+    @property
+    def _open(self) -> List[Span]:
+        """Spans currently open in the calling thread, innermost last."""
+        if not hasattr(self._local, "spans"):
+            self._local.spans = []
+        return self._local.spans
+
+    @contextmanager
+    def span(self, name: str, rows: int = 0) -> Iterator[Span]:
+        """
+        Measure a phase.
+
+        :param name: Name of the phase.
+        :param rows: Rows processed by the phase. More can be counted with ``Span.add_rows``.
+        :return: Context manager yielding the span.
+        """
+        span = Span(name, self._open[-1].name if self._open else None, rows)
+        self._enter(span)
+        try:
+            yield span
+        finally:
+            self._exit(span)
+
+    def _enter(self, span: Span) -> None:
+        if self.track_memory:
+            with self._memory_lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started_tracing = True
+                self._memory_spans += 1
+            current, peak = tracemalloc.get_traced_memory()
+            # Resetting the peak would lose it for the enclosing spans, so hand it over first
+            for open_span in self._open:
+                open_span._peak = max(open_span._peak, peak)
+            tracemalloc.reset_peak()
+            span._memory_start = current
+            span._peak = current
+        self._open.append(span)
+        span._start = time.perf_counter()
+
+    def _exit(self, span: Span) -> None:
+        span.wall_time = time.perf_counter() - span._start
+        self._open.pop()
+        if self.track_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            span.peak_memory = max(span._peak, peak) - span._memory_start
+            for open_span in self._open:
+                open_span._peak = max(open_span._peak, peak)
+        if self.track_memory:
+            self._stop_tracing()
+        self.spans.append(span)
+
+        if self.log is not None:
+            self.log.info(
+                "%s: %.3f s, %d rows%s", span.name, span.wall_time, span.rows,
+                "" if span.peak_memory is None else f", peak {span.peak_memory / 2 ** 20:.1f} MiB"
+            )
+
+    def _stop_tracing(self) -> None:
+        """Stop tracemalloc after the last open span if this recorder started it."""
+        with self._memory_lock:
+            self._memory_spans = max(self._memory_spans - 1, 0)
+            if not self._memory_spans and self._started_tracing:
+                self._started_tracing = False
+                if tracemalloc.is_tracing():
+                    tracemalloc.stop()
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Return the finished spans as dictionaries, in the order they finished."""
+        return [span.to_dict() for span in self.spans]
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """
+        Export the finished spans as JSON.
+
+        :param path: File to write the JSON to, if any.
+        :return: The JSON string.
+        """
+        document = json.dumps(self.to_dicts(), indent=2)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(document)
+        return document
+
+    def reset(self) -> None:
+        """Forget all finished spans."""
+        self.spans = []
+
+
+class NullInstrumentation(Instrumentation):
+    """Instrumentation that records nothing. Used when instrumentation is disabled."""
+
+    _NULL_SPAN = _NullSpan("")
+
+    def __init__(self) -> None:
+        super().__init__(track_memory=False, log=None)
+
+    @property
+    def enabled(self) -> bool:
+        return False
+
+    def span(self, name: str, rows: int = 0) -> "_NullContext":
+        return _NULL_CONTEXT
+
+
+class _NullContext:
+    """Reusable context manager yielding the shared null span."""
+    __slots__ = ()
+
+    def __enter__(self) -> Span:
+        return NullInstrumentation._NULL_SPAN
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_CONTEXT = _NullContext()
+
+NULL_INSTRUMENTATION: Instrumentation = NullInstrumentation()
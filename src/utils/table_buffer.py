@@ -0,0 +1,728 @@
+import math
+import numbers
+from array import array
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Iterable, Sequence, Literal, Tuple
+
+import numpy as np
+import pandas as pd
+
+ColumnKind = Literal["auto", "object", "numeric", "timestamp", "category"]
+
+_NAT: int = np.iinfo(np.int64).min
+_MIN_INT64: int = np.iinfo(np.int64).min
+_MAX_INT64: int = np.iinfo(np.int64).max
+# Largest magnitude up to which every int is exactly representable as a float64
+_MAX_EXACT_INT: int = 2 ** 53
+_EPOCH: datetime = datetime(1970, 1, 1)
+# Units of formatted timestamps, from the coarsest, with their length in nanoseconds
+_TIME_UNITS: Tuple[Tuple[str, int], ...] = (("s", 10 ** 9), ("ms", 10 ** 6), ("us", 10 ** 3))
+
+
+def to_epoch_ns(value: Any) -> Optional[int]:
+    """
+    Convert a timestamp-like value to nanoseconds since the epoch in UTC. Naive values are taken as UTC.
+
+    :param value: A datetime, pandas Timestamp, numpy datetime64 or ISO 8601 string.
+    :return: Nanoseconds since the epoch, or None if the value is not a timestamp.
+    """
+    if isinstance(value, pd.Timestamp):
+        return value.value if value.tzinfo is not None else value.tz_localize("UTC").value
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    elif isinstance(value, np.datetime64):
+        return int(value.astype("datetime64[ns]").astype(np.int64))
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1_000
+
+
+def format_times(timestamps: Any) -> np.ndarray:
+    """
+    Format timestamps as ISO 8601 strings in UTC, e.g. ``2024-01-01T12:00:00.500Z``. All values get the coarsest
+    unit that keeps every one of them exact, but at least seconds as RFC 3339 requires them.
+
+    :param timestamps: Timestamps as a Series, an index or an array pandas accepts. Naive values are taken as UTC.
+    :return: The strings as an object array. Missing timestamps give ``NaTZ``, so mask them out beforehand.
+    """
+    timestamps = pd.DatetimeIndex(timestamps)
+    timestamps = timestamps.tz_localize("UTC") if timestamps.tz is None else timestamps.tz_convert("UTC")
+    values = timestamps.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    nanoseconds = values.view(np.int64)[~np.isnat(values)]
+    unit = next((unit for unit, step in _TIME_UNITS if not (nanoseconds % step).any()), "ns")
+    formatted = np.datetime_as_string(values, unit=unit)
+    return np.char.add(formatted.astype(str), "Z").astype(object)
+
+
+class _ObjectColumn:
+    """Column of arbitrary Python values."""
+    kind: ColumnKind = "object"
+
+    def __init__(self, values: Optional[List[Any]] = None) -> None:
+        self.values: List[Any] = values if values is not None else []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value: Any) -> bool:
+        self.values.append(value)
+        return True
+
+    def pad(self, count: int) -> None:
+        self.values.extend([None] * count)
+
+    def set(self, index: int, value: Any) -> bool:
+        self.values[index] = value
+        return True
+
+    def extend(self, values: Any) -> bool:
+        self.values.extend(_as_list(values))
+        return True
+
+    def get(self, index: int) -> Any:
+        return self.values[index]
+
+    def take(self, indices: np.ndarray) -> "_ObjectColumn":
+        values = self.values
+        return _ObjectColumn([values[index] for index in indices.tolist()])
+
+    def to_list(self) -> List[Any]:
+        return self.values
+
+    def to_array(self) -> Any:
+        values = self.values
+        # pandas would store ints next to floats or None as float64, which rounds large ints
+        if pd.api.types.infer_dtype(values, skipna=True) in ("integer", "mixed-integer-float") and any(
+                isinstance(value, numbers.Integral) and abs(value) > _MAX_EXACT_INT for value in values):
+            exact = np.empty(len(values), dtype=object)
+            exact[:] = values
+            return exact
+        return values
+
+
+class _NumericColumn:
+    """
+    Column of numbers. Python ints are kept in an int64 buffer and emitted as int64, or as float64 if values
+    are missing and every int is exactly representable. The first float moves the column to a float64 buffer,
+    so floats stay floats even if they are integral. Ints outside int64, or ints too large for a float64
+    next to floats, are rejected so that the column falls back to Python objects instead of rounding them.
+    """
+    kind: ColumnKind = "numeric"
+
+    def __init__(self) -> None:
+        self.values: array = array("q")
+        self.integral: bool = True
+        # Flags of the missing values of an integral column, created on the first missing value
+        self.missing: Optional[bytearray] = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _to_floats(self) -> bool:
+        """Move an integral column to the float64 buffer, unless that would round one of its values."""
+        if not self.integral:
+            return True
+        ints = np.frombuffer(self.values, dtype=np.int64)
+        if len(ints) and np.abs(ints).max() > _MAX_EXACT_INT:
+            return False
+        floats = ints.astype(np.float64)
+        if self.missing is not None:
+            floats[np.frombuffer(self.missing, dtype=np.bool_)] = np.nan
+        self.values = array("d", floats.tobytes())
+        self.integral = False
+        self.missing = None
+        return True
+
+    def _mark_missing(self, index: int) -> None:
+        if self.missing is None:
+            self.missing = bytearray(len(self.values))
+        self.missing[index] = 1
+
+    def _number(self, value: Any) -> Optional[Any]:
+        """Convert a value for the current buffer, moving to floats if needed. None if it does not fit."""
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            return None
+        if isinstance(value, numbers.Integral):
+            value = int(value)
+            if not _MIN_INT64 <= value <= _MAX_INT64:
+                return None
+            if self.integral:
+                return value
+            return float(value) if abs(value) <= _MAX_EXACT_INT else None
+        try:
+            number = float(value)
+        except OverflowError:
+            return None
+        if self.integral and not self._to_floats():
+            return None
+        return number
+
+    def append(self, value: Any) -> bool:
+        if value is None:
+            self.pad(1)
+            return True
+        number = self._number(value)
+        if number is None:
+            return False
+        self.values.append(number)
+        if self.missing is not None:
+            self.missing.append(0)
+        return True
+
+    def pad(self, count: int) -> None:
+        if not count:
+            return
+        if self.integral:
+            if self.missing is None:
+                self.missing = bytearray(len(self.values))
+            self.values.extend(array("q", bytes(8 * count)))
+            self.missing.extend(b"\x01" * count)
+        else:
+            self.values.extend([math.nan] * count)
+
+    def set(self, index: int, value: Any) -> bool:
+        if value is None:
+            if self.integral:
+                self.values[index] = 0
+                self._mark_missing(index)
+            else:
+                self.values[index] = math.nan
+            return True
+        number = self._number(value)
+        if number is None:
+            return False
+        self.values[index] = number
+        if self.missing is not None:
+            self.missing[index] = 0
+        return True
+
+    def _extend_ints(self, ints: np.ndarray, missing: Optional[np.ndarray]) -> bool:
+        if not self.integral:
+            if len(ints) and np.abs(ints).max() > _MAX_EXACT_INT:
+                return False
+            floats = ints.astype(np.float64)
+            if missing is not None:
+                floats[missing] = np.nan
+            self.values.frombytes(floats.tobytes())
+            return True
+        if missing is not None and missing.any() and self.missing is None:
+            self.missing = bytearray(len(self.values))
+        self.values.frombytes(ints.tobytes())
+        if self.missing is not None:
+            self.missing.extend(missing.tobytes() if missing is not None else bytes(len(ints)))
+        return True
+
+    def _extend_floats(self, floats: np.ndarray) -> bool:
+        if self.integral and not self._to_floats():
+            return False
+        self.values.frombytes(floats.tobytes())
+        return True
+
+    def extend(self, values: Any) -> bool:
+        if isinstance(values, _NumericColumn):
+            if values.integral:
+                missing = None if values.missing is None else np.frombuffer(values.missing, dtype=np.bool_)
+                return self._extend_ints(np.frombuffer(values.values, dtype=np.int64), missing)
+            return self._extend_floats(np.frombuffer(values.values, dtype=np.float64))
+        if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+            if values.dtype.kind == "u" and len(values) and values.max() > _MAX_INT64:
+                return False
+            return self._extend_ints(values.astype(np.int64), None)
+        if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+            return self._extend_floats(values.astype(np.float64))
+        if isinstance(values, (_ObjectColumn, list, tuple)):
+            start, integral = len(self.values), self.integral
+            for value in _as_list(values):
+                if not self.append(value):
+                    self._truncate(start, integral)
+                    return False
+            return True
+        return False
+
+    def _truncate(self, length: int, integral: bool) -> None:
+        """Drop the values appended by a bulk extension that failed part-way and restore the int buffer."""
+        del self.values[length:]
+        if self.missing is not None:
+            del self.missing[length:]
+        if integral and not self.integral:
+            floats = np.frombuffer(self.values, dtype=np.float64)
+            missing = np.isnan(floats)
+            self.values = array("q", np.where(missing, 0, floats).astype(np.int64).tobytes())
+            self.missing = bytearray(missing.tobytes()) if missing.any() else None
+            self.integral = True
+
+    def get(self, index: int) -> Any:
+        value = self.values[index]
+        if self.integral:
+            return None if self.missing is not None and self.missing[index] else value
+        return None if math.isnan(value) else value
+
+    def take(self, indices: np.ndarray) -> "_NumericColumn":
+        column = _NumericColumn()
+        column.integral = self.integral
+        dtype = np.int64 if self.integral else np.float64
+        column.values = array("q" if self.integral else "d",
+                              np.frombuffer(self.values, dtype=dtype)[indices].tobytes())
+        if self.missing is not None:
+            column.missing = bytearray(np.frombuffer(self.missing, dtype=np.bool_)[indices].tobytes())
+        return column
+
+    def to_list(self) -> List[Any]:
+        return [self.get(index) for index in range(len(self.values))]
+
+    def to_array(self) -> Any:
+        if not self.integral:
+            return np.frombuffer(self.values, dtype=np.float64).copy()
+        ints = np.frombuffer(self.values, dtype=np.int64).copy()
+        if self.missing is None or not any(self.missing):
+            return ints
+        missing = np.frombuffer(self.missing, dtype=np.bool_)
+        if not len(ints) or np.abs(ints[~missing]).max(initial=0) <= _MAX_EXACT_INT:
+            floats = ints.astype(np.float64)
+            floats[missing] = np.nan
+            return floats
+        values = ints.astype(object)
+        values[missing] = None
+        return values
+
+
+class _TimestampColumn:
+    """Column of timestamps backed by an int64 buffer of UTC nanoseconds."""
+    kind: ColumnKind = "timestamp"
+
+    def __init__(self) -> None:
+        self.values: array = array("q")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value: Any) -> bool:
+        if value is None:
+            self.values.append(_NAT)
+            return True
+        nanoseconds = to_epoch_ns(value)
+        if nanoseconds is None:
+            return False
+        self.values.append(nanoseconds)
+        return True
+
+    def pad(self, count: int) -> None:
+        self.values.extend([_NAT] * count)
+
+    def set(self, index: int, value: Any) -> bool:
+        nanoseconds = _NAT if value is None else to_epoch_ns(value)
+        if nanoseconds is None:
+            return False
+        self.values[index] = nanoseconds
+        return True
+
+    def extend(self, values: Any) -> bool:
+        if isinstance(values, _TimestampColumn):
+            self.values.extend(values.values)
+            return True
+        if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+            self.values.frombytes(values.astype("datetime64[ns]").view(np.int64).tobytes())
+            return True
+        if isinstance(values, (pd.DatetimeIndex, pd.Series)) or isinstance(values, pd.api.extensions.ExtensionArray):
+            try:
+                index = pd.DatetimeIndex(values)
+            except (TypeError, ValueError):
+                return False
+            index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+            self.values.frombytes(index.as_unit("ns").asi8.tobytes())
+            return True
+        if isinstance(values, (_ObjectColumn, list, tuple)):
+            converted = [_NAT if value is None else to_epoch_ns(value) for value in _as_list(values)]
+            if any(nanoseconds is None for nanoseconds in converted):
+                return False
+            self.values.extend(converted)
+            return True
+        return False
+
+    def get(self, index: int) -> Any:
+        value = self.values[index]
+        return None if value == _NAT else pd.Timestamp(value, tz="UTC")
+
+    def take(self, indices: np.ndarray) -> "_TimestampColumn":
+        column = _TimestampColumn()
+        column.values.frombytes(np.frombuffer(self.values, dtype=np.int64)[indices].tobytes())
+        return column
+
+    def to_list(self) -> List[Any]:
+        return [None if value == _NAT else pd.Timestamp(value, tz="UTC") for value in self.values]
+
+    def to_array(self) -> Any:
+        values = np.frombuffer(self.values, dtype=np.int64).copy().view("datetime64[ns]")
+        return pd.DatetimeIndex(values).tz_localize("UTC").array
+
+
+class _CategoryColumn:
+    """Dictionary-encoded column of hashable values, emitted as a pandas Categorical."""
+    kind: ColumnKind = "category"
+
+    def __init__(self) -> None:
+        self.codes: array = array("q")
+        self.categories: List[Any] = []
+        self._lookup: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _encode(self, value: Any) -> Optional[int]:
+        if value is None:
+            return -1
+        try:
+            code = self._lookup.get(value)
+        except TypeError:
+            return None
+        if code is None:
+            code = self._lookup[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def append(self, value: Any) -> bool:
+        code = self._encode(value)
+        if code is None:
+            return False
+        self.codes.append(code)
+        return True
+
+    def pad(self, count: int) -> None:
+        self.codes.extend([-1] * count)
+
+    def set(self, index: int, value: Any) -> bool:
+        code = self._encode(value)
+        if code is None:
+            return False
+        self.codes[index] = code
+        return True
+
+    def _extend_codes(self, categories: Sequence[Any], codes: np.ndarray) -> bool:
+        mapping = [self._encode(category) for category in categories]
+        if any(code is None for code in mapping):
+            return False
+        # The trailing -1 maps missing values (code -1) onto themselves
+        remapped = np.asarray(mapping + [-1], dtype=np.int64)[codes]
+        self.codes.frombytes(remapped.tobytes())
+        return True
+
+    def extend(self, values: Any) -> bool:
+        if isinstance(values, _CategoryColumn):
+            return self._extend_codes(values.categories, np.frombuffer(values.codes, dtype=np.int64))
+        if isinstance(values, pd.Categorical):
+            return self._extend_codes(list(values.categories), np.asarray(values.codes, dtype=np.int64))
+        converted = [self._encode(value) for value in _as_list(values)]
+        if any(code is None for code in converted):
+            return False
+        self.codes.extend(converted)
+        return True
+
+    def get(self, index: int) -> Any:
+        code = self.codes[index]
+        return self.categories[code] if code >= 0 else None
+
+    def take(self, indices: np.ndarray) -> "_CategoryColumn":
+        column = _CategoryColumn()
+        column.codes.frombytes(np.frombuffer(self.codes, dtype=np.int64)[indices].tobytes())
+        column.categories = list(self.categories)
+        column._lookup = dict(self._lookup)
+        return column
+
+    def to_list(self) -> List[Any]:
+        return [self.categories[code] if code >= 0 else None for code in self.codes]
+
+    def to_array(self) -> Any:
+        codes = np.frombuffer(self.codes, dtype=np.int64).copy()
+        return pd.Categorical.from_codes(codes, categories=pd.Index(self.categories, dtype=object))
+
+
+_COLUMN_TYPES = {
+    "object": _ObjectColumn,
+    "numeric": _NumericColumn,
+    "timestamp": _TimestampColumn,
+    "category": _CategoryColumn
+}
+
+
+def _infer_kind(value: Any) -> ColumnKind:
+    """Pick the column kind for a column whose first value is ``value``."""
+    if isinstance(value, (datetime, np.datetime64)):
+        return "timestamp"
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return "numeric"
+    return "object"
+
+
+def _infer_values_kind(values: Any) -> ColumnKind:
+    """Pick the column kind for a new column filled with ``values``."""
+    if isinstance(values, tuple(_COLUMN_TYPES.values())):
+        return values.kind
+    if isinstance(values, pd.Categorical):
+        return "category"
+    dtype = getattr(values, "dtype", None)
+    if dtype is not None and dtype != object:
+        if isinstance(dtype, pd.DatetimeTZDtype) or dtype.kind == "M":
+            return "timestamp"
+        if dtype.kind in "fiu":
+            return "numeric"
+        return "object"
+    return next((_infer_kind(value) for value in values if value is not None), "object")
+
+
+def _as_list(values: Any) -> List[Any]:
+    """Convert column values of any supported container to a list of Python values."""
+    if isinstance(values, tuple(_COLUMN_TYPES.values())):
+        return values.to_list()
+    if isinstance(values, list):
+        return values
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return list(pd.to_datetime(values, utc=True))
+    return list(values)
+
+
+class TableBuffer:
+    """
+    Columnar, append-only buffer backing one OCEL table.
+
+    Values are appended straight into one buffer per column, so appending is amortized O(1) per value
+    and a whole batch costs a single DataFrame construction instead of a ``pd.concat`` per call.
+    Numbers and timestamps live in typed buffers and declared categorical columns are dictionary-encoded,
+    which keeps the buffer close to the size of the final frame. A typed column that receives a value of
+    another type falls back to plain Python objects. Missing values are padded.
+    """
+
+    def __init__(
+            self,
+            columns: Sequence[str] = (),
+            kinds: Optional[Dict[str, ColumnKind]] = None,
+            attribute_prefix: str = ""
+    ) -> None:
+        """
+        Initializes an empty buffer.
+
+        :param columns: Columns the table always has, even when it is empty, in the order expected by
+            :meth:`append_record`.
+        :param kinds: Column kinds of declared or attribute columns. Columns without a kind are typed
+            after their first value.
+        :param attribute_prefix: Prefix added to attribute keys passed to :meth:`append_record`.
+        """
+        self._kinds: Dict[str, ColumnKind] = kinds or {}
+        self._columns: Dict[str, Any] = {}
+        self._record_columns: List[str] = list(columns)
+        self._attribute_prefix: str = attribute_prefix
+        self._prefixed: Dict[str, str] = {}
+        self._length: int = 0
+        self._frame: Optional[pd.DataFrame] = None
+
+        for column in columns:
+            self._create_column(column, self._kinds.get(column, "object"))
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def columns(self) -> List[str]:
+        """Return the column names in insertion order."""
+        return list(self._columns.keys())
+
+    def _create_column(self, name: str, kind: ColumnKind) -> Any:
+        column = self._columns[name] = _COLUMN_TYPES[kind]()
+        return column
+
+    def column(self, name: str) -> Any:
+        """
+        Return the buffer of a column, e.g. to pass it to :meth:`extend_columns` of another table.
+
+        :param name: Name of the column.
+        :return: The column buffer, padded to the length of the table.
+        """
+        column = self._columns[name]
+        missing = self._length - len(column)
+        if missing:
+            column.pad(missing)
+        return column
+
+    def value(self, index: int, name: str) -> Any:
+        """
+        Return a single cell as a Python value. Missing cells are returned as None.
+
+        :param index: Index of the row.
+        :param name: Name of the column.
+        :return: The value of the cell.
+        """
+        column = self._columns.get(name)
+        if column is None or index >= len(column):
+            return None
+        return column.get(index)
+
+    def _degrade(self, name: str) -> _ObjectColumn:
+        column = self._columns[name] = _ObjectColumn(self._columns[name].to_list())
+        return column
+
+    def _append_value(self, index: int, name: str, value: Any) -> None:
+        column = self._columns.get(name)
+        if column is None:
+            if value is None:
+                return
+            kind = self._kinds.get(name, "auto")
+            column = self._create_column(name, _infer_kind(value) if kind == "auto" else kind)
+        missing = index - len(column)
+        if missing:
+            column.pad(missing)
+        if not column.append(value):
+            self._degrade(name).append(value)
+
+    def append_record(self, values: Sequence[Any], attributes: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Appends a row given as values of the declared columns plus unprefixed attributes.
+
+        :param values: Values aligned with the ``columns`` passed to the constructor.
+        :param attributes: Attribute values, stored in columns named ``attribute_prefix + key``.
+        :return: Index of the appended row.
+        """
+        index = self._length
+        for name, value in zip(self._record_columns, values):
+            self._append_value(index, name, value)
+        if attributes:
+            prefixed = self._prefixed
+            for key, value in attributes.items():
+                name = prefixed.get(key)
+                if name is None:
+                    name = prefixed[key] = self._attribute_prefix + key
+                self._append_value(index, name, value)
+        self._length += 1
+        self._frame = None
+        return index
+
+    def append_row(self, row: Dict[str, Any]) -> int:
+        """
+        Appends a single row to the buffer.
+
+        :param row: Mapping from column name to value.
+        :return: Index of the appended row.
+        """
+        index = self._length
+        for key, value in row.items():
+            self._append_value(index, key, value)
+        self._length += 1
+        self._frame = None
+        return index
+
+    def append_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Appends several rows to the buffer.
+
+        :param rows: Iterable of mappings from column name to value.
+        :return: Number of appended rows.
+        """
+        start = self._length
+        for row in rows:
+            self.append_row(row)
+        return self._length - start
+
+    def extend_columns(self, columns: Dict[str, Any], length: int) -> None:
+        """
+        Appends rows given column-wise. Typed inputs are copied in bulk without going through Python values.
+
+        :param columns: Mapping from column name to the values of the new rows, given as a list, a NumPy
+            array, a pandas array or a column buffer of another table (see :meth:`column`). Columns that
+            are not given are padded.
+        :param length: Number of new rows.
+        """
+        start = self._length
+        for name, values in columns.items():
+            if len(values) != length:
+                raise ValueError(f"Column {name} has {len(values)} values, expected {length}.")
+            column = self._columns.get(name)
+            if column is None:
+                kind = self._kinds.get(name, "auto")
+                column = self._create_column(name, _infer_values_kind(values) if kind == "auto" else kind)
+            missing = start - len(column)
+            if missing:
+                column.pad(missing)
+            if not column.extend(values):
+                self._degrade(name).extend(values)
+        self._length += length
+        self._frame = None
+
+    def extend_table(self, table: "TableBuffer") -> None:
+        """
+        Appends all rows of another buffer column-wise.
+
+        :param table: The buffer whose rows are appended.
+        """
+        self.extend_columns({name: table.column(name) for name in table.columns}, len(table))
+
+    def set_column(self, name: str, values: Any) -> None:
+        """
+        Replaces all values of a column.
+
+        :param name: Name of the column. Unknown columns are created.
+        :param values: New values, one per row, in any container supported by :meth:`extend_columns`.
+        """
+        if len(values) != self._length:
+            raise ValueError(f"Column {name} has {len(values)} values, expected {self._length}.")
+        existing = self._columns.get(name)
+        kind = existing.kind if existing is not None else self._kinds.get(name, "auto")
+        column = _COLUMN_TYPES[_infer_values_kind(values) if kind == "auto" else kind]()
+        if not column.extend(values):
+            column = _ObjectColumn()
+            column.extend(values)
+        self._columns[name] = column
+        self._frame = None
+
+    def take(self, indices: Sequence[int]) -> "TableBuffer":
+        """
+        Return a new buffer holding the given rows, e.g. to reorder or filter the table.
+
+        :param indices: Indices of the rows to keep, in their new order. Indices may repeat.
+        :return: The new buffer with the same columns, kinds and attribute prefix.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        table = TableBuffer(kinds=self._kinds, attribute_prefix=self._attribute_prefix)
+        table._record_columns = list(self._record_columns)
+        for name in self._columns:
+            table._columns[name] = self.column(name).take(indices)
+        table._length = len(indices)
+        return table
+
+    def set_value(self, index: int, column_name: str, value: Any) -> None:
+        """
+        Overwrites a single cell of an already appended row.
+
+        :param index: Index of the row as returned by :meth:`append_row`.
+        :param column_name: Column to update. Unknown columns are created.
+        :param value: New value of the cell.
+        """
+        if not 0 <= index < self._length:
+            raise IndexError(f"Row {index} out of range for a table with {self._length} rows.")
+        column = self._columns.get(column_name)
+        if column is None:
+            if value is None:
+                return
+            kind = self._kinds.get(column_name, "auto")
+            column = self._create_column(column_name, _infer_kind(value) if kind == "auto" else kind)
+        if len(column) <= index:
+            column.pad(index + 1 - len(column))
+        if not column.set(index, value):
+            self._degrade(column_name).set(index, value)
+        self._frame = None
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Materializes the buffer as a DataFrame. The result is cached until the next mutation.
+
+        :return: DataFrame holding all buffered rows.
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame(
+                {name: self.column(name).to_array() for name in self._columns},
+                columns=list(self._columns.keys())
+            )
+        return self._frame
@@ -1,7 +1,116 @@
 import abc
 import json
-from jsonschema import validate as validate_json
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Sequence, Tuple
+
 import jsonschema
+from jsonschema.protocols import Validator
+
+from src.readers.json_stream import JsonStreamReader, open_json
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# JSON path, message and schema keyword of an error, the form in which worker processes return errors
+_Issue = Tuple[str, str, str]
+
+
+class ValidationIssue:
+    """One violation of the schema, located by the JSON path of the offending value."""
+    __slots__ = ("path", "message", "keyword")
+
+    def __init__(self, path: str, message: str, keyword: str) -> None:
+        """
+        :param path: JSON path of the value, e.g. ``$.objects[3].object_id``.
+        :param message: Description of the violation.
+        :param keyword: Schema keyword that failed, e.g. ``required`` or ``type``.
+        """
+        self.path: str = path
+        self.message: str = message
+        self.keyword: str = keyword
+
+    def to_dict(self) -> Dict[str, str]:
+        """Return the issue as a JSON-serializable dictionary."""
+        return {"path": self.path, "message": self.message, "keyword": self.keyword}
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}"
+
+    def __repr__(self) -> str:
+        return f"ValidationIssue({self.path!r}, {self.message!r}, {self.keyword!r})"
+
+
+def _json_path(prefix: str, parts: Iterable[Any]) -> str:
+    path = prefix
+    for part in parts:
+        if isinstance(part, int):
+            path += f"[{part}]"
+        elif _IDENTIFIER.match(part):
+            path += f".{part}"
+        else:
+            path += f"[{json.dumps(part)}]"
+    return path
+
+
+def _issues(validator: Validator, instance: Any, prefix: str) -> List[_Issue]:
+    return [(_json_path(prefix, error.absolute_path), error.message, str(error.validator))
+            for error in validator.iter_errors(instance)]
+
+
+class _CompiledSchema:
+    """
+    A schema checked and compiled once into validator instances: one per array section of the root object,
+    validating a single record, and one for the root object with those sections left unconstrained.
+    """
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        self.schema: Dict[str, Any] = schema
+        # Without a format checker, as jsonschema.validate: "format" is an annotation and is not asserted
+        root = validator_class(schema)
+
+        properties = schema.get("properties", {}) if isinstance(schema, dict) else {}
+        self.sections: Dict[str, Validator] = {}
+        self.bounds: Dict[str, Tuple[int, Optional[int]]] = {}
+        for name, definition in properties.items():
+            if isinstance(definition, dict) and definition.get("type") == "array" \
+                    and isinstance(definition.get("items"), dict):
+                # Evolving keeps the root as the base of references in the item schema
+                self.sections[name] = root.evolve(schema=definition["items"])
+                self.bounds[name] = (definition.get("minItems", 0), definition.get("maxItems"))
+        self.properties: Dict[str, Validator] = {
+            name: root.evolve(schema=definition) for name, definition in properties.items()
+        }
+        self.root: Validator = root.evolve(schema={
+            **schema, "properties": {**properties, **{name: {} for name in self.sections}}
+        }) if self.sections else root
+
+
+@lru_cache(maxsize=None)
+def _compile(schema_path: str, modified: float) -> _CompiledSchema:
+    """Load and compile a schema, cached per path and modification time."""
+    with open(schema_path, "r") as schema_file:
+        return _CompiledSchema(json.load(schema_file))
+
+
+def _compiled(schema_path: str) -> _CompiledSchema:
+    return _compile(os.path.abspath(schema_path), os.path.getmtime(schema_path))
+
+
+def _validate_records(schema_path: str, section: str, start: int, records: List[Any]) -> List[_Issue]:
+    """Validate a chunk of records of a section. Runs in a worker process, which compiles the schema once."""
+    validator = _compiled(schema_path).sections[section]
+    issues: List[_Issue] = []
+    for index, record in enumerate(records, start):
+        issues.extend(_issues(validator, record, f"$.{section}[{index}]"))
+    return issues
 
 
 class BaseValidator(abc.ABC):
@@ -10,34 +119,184 @@ class BaseValidator(abc.ABC):
 
 
 class JsonValidator(BaseValidator):
+    """
+    Validates JSON documents against a JSON schema, e.g. ``schemas/json_schema.json``.
 
-    def __init__(self, schema_path: str):
+    The schema is checked and compiled once and shared by all validators of the same schema file. Every error is
+    collected with the JSON path of the offending value. Files are validated while they are streamed: the records
+    of the array sections of the root object, e.g. ``objects`` or ``process_events``, are validated one chunk at
+    a time, optionally in worker processes, so a file never has to be held in memory as a whole.
+    """
 
+    def __init__(self, schema_path: str):
+        """
+        :param schema_path: Path of the JSON schema.
+        """
         self.schema_path = schema_path
+        self._schema: _CompiledSchema = _compiled(schema_path)
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        """The JSON schema."""
+        return self._schema.schema
+
+    def iter_errors(self, document: Any) -> Iterator[ValidationIssue]:
+        """
+        Validate a document held in memory.
+
+        :param document: The document.
+        :return: Iterator over the issues, array sections record by record.
+        """
+        compiled = self._schema
+        yield from (ValidationIssue(*issue) for issue in _issues(compiled.root, document, "$"))
+        if not isinstance(document, dict):
+            return
+        for section, validator in compiled.sections.items():
+            records = document.get(section)
+            if not isinstance(records, list):
+                # Anything else than an array is reported against the section schema as a whole
+                if section in document:
+                    issues = _issues(compiled.properties[section], records, f"$.{section}")
+                    yield from (ValidationIssue(*issue) for issue in issues)
+                continue
+            yield from (ValidationIssue(*issue) for issue in self._bound_issues(section, len(records)))
+            for index, record in enumerate(records):
+                yield from (ValidationIssue(*issue) for issue in _issues(validator, record, f"$.{section}[{index}]"))
+
+    def _bound_issues(self, section: str, count: int) -> List[_Issue]:
+        minimum, maximum = self._schema.bounds[section]
+        if count < minimum:
+            return [(f"$.{section}", f"Expected at least {minimum} items but found {count}", "minItems")]
+        if maximum is not None and count > maximum:
+            return [(f"$.{section}", f"Expected at most {maximum} items but found {count}", "maxItems")]
+        return []
+
+    def _iter_chunks(
+            self,
+            reader: JsonStreamReader,
+            rest: Dict[str, Any],
+            streamed: List[str],
+            sections: Sequence[str],
+            chunk_size: int
+    ) -> Iterator[Tuple[str, int, List[Any]]]:
+        """
+        Stream the chunks of records of the array sections, whose keys are collected in ``streamed``. Other
+        members of the root object are collected in ``rest``. A chunk is yielded with an empty list of records
+        after the last chunk of every section.
+        """
+        for key in reader.iter_keys():
+            if key not in sections or reader.peek() != "[":
+                rest[key] = reader.decode_value()
+                continue
+            streamed.append(key)
+            records = reader.iter_items()
+            start = 0
+            while chunk := list(islice(records, chunk_size)):
+                yield key, start, chunk
+                start += len(chunk)
+            yield key, start, []
+
+    def iter_file_errors(
+            self,
+            path: str,
+            chunk_size: int = 10_000,
+            workers: int = 1,
+            sections: Optional[Sequence[str]] = None
+    ) -> Iterator[ValidationIssue]:
+        """
+        Validate a file while streaming it, holding at most a few chunks of records in memory.
 
-        with open(schema_path, 'r') as schema_file:
-            self.schema = json.load(schema_file)
+        Keywords on the array sections themselves other than ``minItems`` and ``maxItems``, e.g. ``uniqueItems``,
+        are not checked for streamed sections.
+
+        :param path: Path of the file, optionally ``.gz`` or ``.zst`` compressed.
+        :param chunk_size: Number of records validated at a time.
+        :param workers: Number of worker processes validating chunks; 1 validates in this process.
+        :param sections: Array sections of the root object to stream. All sections whose records the schema
+            describes by default.
+        :return: Iterator over the issues, in document order.
+        """
+        compiled = self._schema
+        sections = [section for section in (sections or compiled.sections) if section in compiled.sections]
+        rest: Dict[str, Any] = {}
+        streamed: List[str] = []
+
+        with open_json(path) as file:
+            reader = JsonStreamReader(file)
+            if reader.peek() != "{":
+                yield from self.iter_errors(reader.decode_value())
+                return
+            chunks = self._iter_chunks(reader, rest, streamed, sections, chunk_size)
+            if workers == 1:
+                for section, start, records in chunks:
+                    issues = _validate_records(self.schema_path, section, start, records) if records \
+                        else self._bound_issues(section, start)
+                    yield from (ValidationIssue(*issue) for issue in issues)
+            else:
+                yield from self._iter_parallel(chunks, workers)
+
+        # Streamed sections are present in the root object, e.g. for "required"; their records were checked above
+        issues = _issues(compiled.root, {**rest, **dict.fromkeys(streamed)}, "$")
+        for section in compiled.sections:
+            if section in rest:
+                issues.extend(_issues(compiled.properties[section], rest[section], f"$.{section}"))
+        yield from (ValidationIssue(*issue) for issue in issues)
+
+    def _iter_parallel(self, chunks: Iterator[Tuple[str, int, List[Any]]], workers: int) -> Iterator[ValidationIssue]:
+        """Validate chunks in worker processes, with at most two chunks per worker in flight."""
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending: deque = deque()
+            for section, start, records in chunks:
+                if records:
+                    pending.append(executor.submit(_validate_records, self.schema_path, section, start, records))
+                else:
+                    pending.append(self._bound_issues(section, start))
+                while len(pending) > 2 * workers:
+                    yield from self._resolve(pending.popleft())
+            while pending:
+                yield from self._resolve(pending.popleft())
+
+    @staticmethod
+    def _resolve(issues: Future | List[_Issue]) -> Iterator[ValidationIssue]:
+        for issue in issues.result() if isinstance(issues, Future) else issues:
+            yield ValidationIssue(*issue)
+
+    def validate_file(
+            self,
+            path: str,
+            chunk_size: int = 10_000,
+            workers: int = 1,
+            max_errors: Optional[int] = None
+    ) -> List[ValidationIssue]:
+        """
+        Validate a file while streaming it. See :meth:`iter_file_errors`.
+
+        :param path: Path of the file.
+        :param chunk_size: Number of records validated at a time.
+        :param workers: Number of worker processes validating chunks; 1 validates in this process.
+        :param max_errors: Stop after this many issues. All issues by default.
+        :return: The issues, empty if the file is valid.
+        """
+        return list(islice(self.iter_file_errors(path, chunk_size, workers), max_errors))
 
     def validate(self, to_validate_definition: dict | str) -> bool:
+        """
+        Validate a document, or a file while streaming it, and log every issue.
 
+        :param to_validate_definition: The document or the path of the file.
+        :return: Whether the document is valid.
+        """
         if isinstance(to_validate_definition, str):
-            with open(to_validate_definition, 'r') as schema_file:
-                to_validate = json.load(schema_file)
+            issues = self.iter_file_errors(to_validate_definition)
         else:
-            to_validate = to_validate_definition
+            issues = self.iter_errors(to_validate_definition)
 
+        valid = True
         try:
-            validate_json(instance=to_validate, schema=self.schema)
-            return True
-        except jsonschema.exceptions.ValidationError as e:
-            print(e)
-            return False
-        except jsonschema.exceptions.SchemaError as e:
-            print(e)
-            return False
-        except jsonschema.exceptions.RefResolutionError as e:
-            print(e)
-            return False
-        except Exception as e:
-            print(e)
+            for issue in issues:
+                logger.warning("%s", issue)
+                valid = False
+        except (OSError, ValueError) as e:
+            logger.warning("%s", e)
             return False
+        return valid
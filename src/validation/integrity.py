@@ -0,0 +1,185 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+# Reference columns of the relation tables: table, relationship class, column, referenced entity and field name
+_REFERENCES: Tuple[Tuple[str, str, str, str, str], ...] = (
+    ("relations", "event_object", "ocel:eid", "events", "event_id"),
+    ("relations", "event_object", "ocel:oid", "objects", "object_id"),
+    ("o2o", "object_object", "ocel:oid", "objects", "object_id"),
+    ("o2o", "object_object", "ocel:oid_2", "objects", "related_object_id"),
+    ("e2e", "event_event", "ocel:eid", "events", "event_id"),
+    ("e2e", "event_event", "ocel:eid_2", "events", "derived_from_event_id")
+)
+# Source and target columns of the relation tables
+_ENDPOINTS: Dict[str, Tuple[str, str]] = {
+    "relations": ("ocel:eid", "ocel:oid"),
+    "o2o": ("ocel:oid", "ocel:oid_2"),
+    "e2e": ("ocel:eid", "ocel:eid_2")
+}
+# Id column and entity name of the tables of events and objects
+_ENTITIES: Dict[str, Tuple[str, str]] = {"events": ("ocel:eid", "event"), "objects": ("ocel:oid", "object")}
+
+
+class IntegrityReport:
+    """
+    Result of :func:`check_integrity`, one DataFrame per check.
+
+    ``dangling_references`` has a row per relationship field pointing at an event or object that does not exist,
+    ``duplicate_ids`` a row per id used by more than one event or object, ``orphaned_objects`` a row per object
+    without any relationship, and ``e2e_cycles`` a row per event on a cycle of event-event relationships.
+    """
+
+    def __init__(
+            self,
+            dangling_references: pd.DataFrame,
+            duplicate_ids: pd.DataFrame,
+            orphaned_objects: pd.DataFrame,
+            e2e_cycles: pd.DataFrame
+    ) -> None:
+        self.dangling_references: pd.DataFrame = dangling_references
+        self.duplicate_ids: pd.DataFrame = duplicate_ids
+        self.orphaned_objects: pd.DataFrame = orphaned_objects
+        self.e2e_cycles: pd.DataFrame = e2e_cycles
+
+    @property
+    def valid(self) -> bool:
+        """Whether there are no dangling references, duplicate ids or cycles. Orphaned objects are allowed."""
+        return self.dangling_references.empty and self.duplicate_ids.empty and self.e2e_cycles.empty
+
+    def counts(self) -> pd.DataFrame:
+        """
+        Return the number of findings per check and detail, e.g. dangling references per relationship field,
+        duplicate ids per entity, orphaned objects per object type and the events of every cycle.
+
+        :return: Frame with the columns ``check``, ``detail`` and ``count``.
+        """
+        frames: List[pd.DataFrame] = []
+        for check, frame, detail in (
+                ("dangling_references", self.dangling_references,
+                 self.dangling_references["relationship_class"] + "." + self.dangling_references["field"]),
+                ("duplicate_ids", self.duplicate_ids, self.duplicate_ids["entity"]),
+                ("orphaned_objects", self.orphaned_objects, self.orphaned_objects["ocel:type"].astype(str)),
+                ("e2e_cycles", self.e2e_cycles, "cycle " + self.e2e_cycles["cycle"].astype(str))
+        ):
+            counts = detail.value_counts(sort=False)
+            frames.append(pd.DataFrame({"check": check, "detail": counts.index.astype(str),
+                                        "count": counts.to_numpy()}))
+        return pd.concat(frames, ignore_index=True)
+
+    def __str__(self) -> str:
+        return (f"{len(self.dangling_references)} dangling references, {len(self.duplicate_ids)} duplicate ids, "
+                f"{len(self.orphaned_objects)} orphaned objects, {self.e2e_cycles['cycle'].nunique()} E2E cycles")
+
+
+# Position of every reference among the unique ids of the referenced entity, -1 if missing, by table and column
+_Positions = Dict[Tuple[str, str], np.ndarray]
+
+
+def _dangling_references(tables: Dict[str, pd.DataFrame], positions: _Positions) -> pd.DataFrame:
+    """Every reference to an event or object that does not exist."""
+    frames: List[pd.DataFrame] = []
+    for table, relationship_class, column, _, field in _REFERENCES:
+        missing = positions[(table, column)] < 0
+        if not missing.any():
+            continue
+        source, target = _ENDPOINTS[table]
+        rows = tables[table][missing]
+        frames.append(pd.DataFrame({
+            "relationship_class": relationship_class,
+            "field": field,
+            "source_id": rows[source].to_numpy(dtype=object),
+            "target_id": rows[target].to_numpy(dtype=object),
+            "qualifier": rows["ocel:qualifier"].to_numpy(dtype=object)
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["relationship_class", "field", "source_id", "target_id", "qualifier"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _duplicate_ids(tables: Dict[str, pd.DataFrame], ids: Dict[str, pd.Index]) -> pd.DataFrame:
+    """Ids used by more than one event or object, only searched for if there are fewer unique ids than rows."""
+    frames: List[pd.DataFrame] = []
+    for table, (column, entity) in _ENTITIES.items():
+        if len(ids[table]) == len(tables[table]):
+            continue
+        values = pd.Series(tables[table][column].to_numpy(dtype=object))
+        counts = values[values.duplicated(keep=False)].value_counts(sort=False)
+        frames.append(pd.DataFrame({"entity": entity, "id": counts.index.to_numpy(dtype=object),
+                                    "count": counts.to_numpy()}))
+    if not frames:
+        return pd.DataFrame(columns=["entity", "id", "count"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _orphaned_objects(tables: Dict[str, pd.DataFrame], ids: Dict[str, pd.Index],
+                      positions: _Positions) -> pd.DataFrame:
+    """Objects no event-object or object-object relationship refers to, marked from the positions of the references."""
+    referenced = np.zeros(len(ids["objects"]), dtype=bool)
+    for table, _, column, entity, _ in _REFERENCES:
+        if entity == "objects":
+            found = positions[(table, column)]
+            referenced[found[found >= 0]] = True
+    objects = tables["objects"]
+    orphaned = objects[objects["ocel:oid"].isin(ids["objects"][~referenced]).to_numpy()]
+    columns = [column for column in ("ocel:oid", "ocel:type", "ocel:object_class") if column in orphaned]
+    return orphaned[columns].reset_index(drop=True)
+
+
+def _e2e_cycles(e2e: pd.DataFrame) -> pd.DataFrame:
+    """
+    Events on cycles of event-event relationships. The strongly connected components of the relationship graph
+    are computed in linear time; a component of more than one event, or an event derived from itself, is a
+    cycle.
+    """
+    if e2e.empty:
+        return pd.DataFrame({"cycle": pd.Series(dtype=np.int64), "event_id": pd.Series(dtype=object),
+                             "cycle_size": pd.Series(dtype=np.int64)})
+    sources = e2e["ocel:eid"].to_numpy(dtype=object)
+    targets = e2e["ocel:eid_2"].to_numpy(dtype=object)
+    codes, events = pd.factorize(np.concatenate([sources, targets]))
+    source_codes, target_codes = codes[:len(sources)], codes[len(sources):]
+
+    graph = csr_matrix((np.ones(len(sources), dtype=np.int8), (source_codes, target_codes)),
+                       shape=(len(events), len(events)))
+    _, components = connected_components(graph, directed=True, connection="strong")
+    sizes = np.bincount(components)
+    on_cycle = sizes[components] > 1
+    on_cycle[source_codes[source_codes == target_codes]] = True
+
+    members = np.flatnonzero(on_cycle)
+    # Number the cycles in the order of their first event
+    cycle_codes, _ = pd.factorize(components[members])
+    return pd.DataFrame({
+        "cycle": cycle_codes.astype(np.int64),
+        "event_id": np.asarray(events, dtype=object)[members],
+        "cycle_size": sizes[components[members]].astype(np.int64)
+    }).sort_values(["cycle", "event_id"], kind="stable").reset_index(drop=True)
+
+
+def check_integrity(tables: Dict[str, pd.DataFrame]) -> IntegrityReport:
+    """
+    Check the referential integrity of the tables of a model.
+
+    Every check works on whole id columns, never row by row: each reference column is looked up once in a hash
+    table of the ids of the referenced entity, and cycles are found on a sparse graph.
+
+    :param tables: Tables in the layout of :meth:`COREMetamodel.get_tables`, keyed by ``objects``, ``events``,
+        ``relations``, ``o2o`` and ``e2e``.
+    :return: The report.
+    """
+    ids = {table: pd.Index(tables[table][column].to_numpy(dtype=object)).unique()
+           for table, (column, _) in _ENTITIES.items()}
+    positions: _Positions = {
+        (table, column): ids[entity].get_indexer(tables[table][column].to_numpy(dtype=object))
+        for table, _, column, entity, _ in _REFERENCES
+    }
+    return IntegrityReport(
+        dangling_references=_dangling_references(tables, positions),
+        duplicate_ids=_duplicate_ids(tables, ids),
+        orphaned_objects=_orphaned_objects(tables, ids, positions),
+        e2e_cycles=_e2e_cycles(tables["e2e"])
+    )
@@ -0,0 +1,150 @@
+from typing import List, Dict, Any, Optional, Literal, Callable, Iterator, Iterable, Tuple, Union
+
+from src.types_defintion.object_definition import Object
+
+MergeStrategy = Literal["keep_first", "keep_last", "merge"]
+AttributeRule = Callable[[Any, Any], Any]
+ObjectLoader = Callable[[str], Object]
+
+
+def keep_first(existing: Any, incoming: Any) -> Any:
+    """Attribute rule that keeps the value seen first."""
+    return existing
+
+
+def keep_last(existing: Any, incoming: Any) -> Any:
+    """Attribute rule that keeps the value seen last."""
+    return incoming
+
+
+def collect_values(existing: Any, incoming: Any) -> Any:
+    """Attribute rule that collects all distinct values of an attribute in a list."""
+    values = list(existing) if isinstance(existing, list) else [existing]
+    for value in incoming if isinstance(incoming, list) else [incoming]:
+        if value not in values:
+            values.append(value)
+    return values
+
+
+class ObjectRegistry:
+    """
+    Registry of objects keyed by ``object_id`` with O(1) lookups and upsert semantics.
+
+    When an object arrives that is already registered, the ``strategy`` decides what happens:
+
+    - ``keep_first``: the incoming object is ignored.
+    - ``keep_last``: the incoming object replaces the registered one.
+    - ``merge``: id, type and class of the registered object are kept and the attributes are merged.
+      Conflicting attribute values are resolved by ``attribute_rules[key]`` or ``default_rule``.
+
+    Objects stored elsewhere, e.g. in a table, can be registered with :meth:`defer`; they are built on first
+    access.
+    """
+
+    def __init__(
+            self,
+            strategy: MergeStrategy = "keep_first",
+            attribute_rules: Optional[Dict[str, AttributeRule]] = None,
+            default_rule: AttributeRule = keep_last
+    ) -> None:
+        """
+        Initializes an empty registry.
+
+        :param strategy: How to handle an object whose id is already registered.
+        :param attribute_rules: Per-attribute conflict resolution used by the ``merge`` strategy.
+        :param default_rule: Conflict resolution for attributes without a rule in ``attribute_rules``.
+        """
+        if strategy not in ("keep_first", "keep_last", "merge"):
+            raise ValueError(f"Unknown merge strategy: {strategy}")
+
+        self.strategy: MergeStrategy = strategy
+        self.attribute_rules: Dict[str, AttributeRule] = attribute_rules or {}
+        self.default_rule: AttributeRule = default_rule
+        # Registered objects, or the loader of objects that are not built yet
+        self._objects: Dict[str, Union[Object, ObjectLoader]] = {}
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def __contains__(self, object_id: str) -> bool:
+        return object_id in self._objects
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._objects)
+
+    def __getitem__(self, object_id: str) -> Object:
+        return self._load(object_id, self._objects[object_id])
+
+    def _load(self, object_id: str, entry: Union[Object, ObjectLoader]) -> Object:
+        if isinstance(entry, Object):
+            return entry
+        obj = self._objects[object_id] = entry(object_id)
+        return obj
+
+    def get(self, object_id: str, default: Optional[Object] = None) -> Optional[Object]:
+        """Return the registered object with the given id, or ``default``."""
+        entry = self._objects.get(object_id)
+        return default if entry is None else self._load(object_id, entry)
+
+    def keys(self) -> List[str]:
+        """Return the registered object ids in insertion order."""
+        return list(self._objects.keys())
+
+    def values(self) -> List[Object]:
+        """Return the registered objects in insertion order."""
+        return [self._load(object_id, entry) for object_id, entry in list(self._objects.items())]
+
+    def items(self) -> List[Tuple[str, Object]]:
+        """Return ``(object_id, object)`` pairs in insertion order."""
+        return [(object_id, self._load(object_id, entry)) for object_id, entry in list(self._objects.items())]
+
+    def defer(self, object_ids: Iterable[str], load: ObjectLoader) -> None:
+        """
+        Registers objects without building them, e.g. objects added to a table column-wise. An object is built
+        with ``load`` on first access, e.g. when an object with the same id is upserted.
+
+        :param object_ids: Ids of the objects. None of them may be registered yet.
+        :param load: Builds the object with the given id.
+        """
+        self._objects.update(dict.fromkeys(object_ids, load))
+
+    def upsert(self, obj: Object) -> bool:
+        """
+        Registers an object or merges it into the already registered one.
+
+        :param obj: The object to register.
+        :return: True if the object id was not registered before.
+        """
+        existing = self.get(obj.object_id)
+        if existing is None:
+            self._objects[obj.object_id] = obj
+            return True
+
+        if self.strategy == "keep_last":
+            self._objects[obj.object_id] = obj
+        elif self.strategy == "merge":
+            self._objects[obj.object_id] = Object(
+                object_id=existing.object_id,
+                object_type=existing.object_type,
+                object_class=existing.object_class,
+                attributes=self._merge_attributes(existing.attributes, obj.attributes)
+            )
+        return False
+
+    def upsert_many(self, objects: Iterable[Object]) -> int:
+        """
+        Registers several objects.
+
+        :param objects: The objects to register.
+        :return: Number of object ids that were not registered before.
+        """
+        return sum(self.upsert(obj) for obj in objects)
+
+    def _merge_attributes(self, existing: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
+        merged = dict(existing)
+        for key, value in incoming.items():
+            if key in merged:
+                merged[key] = self.attribute_rules.get(key, self.default_rule)(merged[key], value)
+            else:
+                merged[key] = value
+        return merged
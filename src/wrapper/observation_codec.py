@@ -0,0 +1,265 @@
+import json
+import struct
+import zlib
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from src.types_defintion.object_definition import Object
+from src.wrapper.ocel_wrapper import COREMetamodel
+from src.wrapper.time_series_store import TimeSeriesStore, TimeSeries, dictionary_encode, dictionary_decode
+
+MAGIC: bytes = b"COREOBS"
+FORMAT_VERSION: int = 1
+
+_HEADER_LENGTH = struct.Struct("<I")
+# A varint holds 7 bits per byte, so 64 bit values need up to 10 bytes
+_VARINT_BYTES: int = 10
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    """Map signed to unsigned integers so that values close to zero get small codes."""
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(codes: np.ndarray) -> np.ndarray:
+    """Invert :func:`_zigzag`."""
+    return ((codes >> np.uint64(1)) ^ (np.uint64(0) - (codes & np.uint64(1)))).view(np.int64)
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """
+    Encode unsigned integers as LEB128 varints, 7 bits per byte, vectorized over the whole array.
+
+    :param values: Unsigned 64 bit integers.
+    :return: The encoded bytes.
+    """
+    values = values.astype(np.uint64)
+    shifts = np.arange(_VARINT_BYTES, dtype=np.uint64) * np.uint64(7)
+    groups = ((values[:, None] >> shifts) & np.uint64(0x7F)).astype(np.uint8)
+    # Number of bytes of every value: at least one, then one per started group of 7 significant bits
+    sizes = np.maximum(1, _VARINT_BYTES - np.argmax(groups[:, ::-1] != 0, axis=1))
+    sizes[~groups.any(axis=1)] = 1
+    used = np.arange(_VARINT_BYTES) < sizes[:, None]
+    groups[np.arange(_VARINT_BYTES) < sizes[:, None] - 1] |= 0x80
+    return groups[used].tobytes()
+
+
+def decode_varints(data: bytes, count: int) -> np.ndarray:
+    """
+    Decode ``count`` LEB128 varints, vectorized over the whole buffer.
+
+    :param data: The encoded bytes.
+    :param count: Number of encoded values.
+    :return: The values as unsigned 64 bit integers.
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)
+    if len(ends) != count:
+        raise ValueError(f"Expected {count} varints but found {len(ends)}.")
+    if not count:
+        return np.empty(0, dtype=np.uint64)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    positions = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    parts = (raw & 0x7F).astype(np.uint64) << (positions.astype(np.uint64) * np.uint64(7))
+    return np.bitwise_or.reduceat(parts, starts)
+
+
+def encode_timestamps(timestamps: np.ndarray) -> Tuple[int, bytes]:
+    """
+    Encode timestamps as zigzag varints of their delta-of-deltas.
+
+    Regularly sampled series have delta-of-deltas of zero, which take one byte before deflating.
+
+    :param timestamps: Timestamps in nanoseconds.
+    :return: The first timestamp and the encoded delta-of-deltas of the others.
+    """
+    if not len(timestamps):
+        return 0, b""
+    deltas = np.diff(timestamps.astype(np.int64))
+    delta_of_deltas = np.diff(deltas, prepend=np.int64(0))
+    return int(timestamps[0]), encode_varints(_zigzag(delta_of_deltas))
+
+
+def decode_timestamps(first: int, data: bytes, count: int) -> np.ndarray:
+    """Invert :func:`encode_timestamps`."""
+    if not count:
+        return np.empty(0, dtype=np.int64)
+    deltas = np.cumsum(_unzigzag(decode_varints(data, count - 1)))
+    return np.concatenate([[np.int64(first)], np.int64(first) + np.cumsum(deltas)]).astype(np.int64)
+
+
+def encode_floats(values: np.ndarray) -> Tuple[bytes, bytes]:
+    """
+    Encode floats by XORing each with its predecessor, in the style of Gorilla.
+
+    Successive readings of a sensor share sign, exponent and leading mantissa bits, so their XOR has leading and
+    trailing zero bytes. Only the bytes in between are kept; a header byte per value records the number of
+    leading zero bytes and of kept bytes. Unlike Gorilla the fields are byte-aligned, so encoding and decoding
+    are NumPy operations on whole arrays.
+
+    :param values: The values as float64.
+    :return: The header bytes and the kept bytes.
+    """
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    xor = bits ^ np.concatenate([np.zeros(1, dtype=np.uint64), bits[:-1]])
+    octets = xor.astype(">u8").view(np.uint8).reshape(-1, 8)
+    nonzero = octets != 0
+    zero = ~nonzero.any(axis=1)
+    leading = np.where(zero, 8, np.argmax(nonzero, axis=1))
+    trailing = np.where(zero, 0, np.argmax(nonzero[:, ::-1], axis=1))
+    lengths = 8 - leading - trailing
+    headers = (leading << 4 | lengths).astype(np.uint8)
+    columns = np.arange(8)
+    kept = (columns >= leading[:, None]) & (columns < (leading + lengths)[:, None])
+    return headers.tobytes(), octets[kept].tobytes()
+
+
+def decode_floats(headers: bytes, data: bytes) -> np.ndarray:
+    """Invert :func:`encode_floats`."""
+    header = np.frombuffer(headers, dtype=np.uint8)
+    leading, lengths = (header >> 4).astype(np.int64), (header & 0x0F).astype(np.int64)
+    columns = np.arange(8)
+    kept = (columns >= leading[:, None]) & (columns < (leading + lengths)[:, None])
+    octets = np.zeros((len(header), 8), dtype=np.uint8)
+    octets[kept] = np.frombuffer(data, dtype=np.uint8)
+    xor = octets.view(">u8").ravel().astype(np.uint64)
+    return np.bitwise_xor.accumulate(xor).view(np.float64)
+
+
+def encode_dictionary(values: np.ndarray) -> Tuple[bytes, bytes]:
+    """
+    Dictionary-encode values of any JSON type, e.g. states or identifiers. Values are restored with their type.
+
+    :param values: The values.
+    :return: The dictionary as JSON and the varint codes of the values.
+    :raises TypeError: If a value is not a JSON value.
+    """
+    codes, dictionary = dictionary_encode(values)
+    return json.dumps(dictionary).encode("utf-8"), encode_varints(codes)
+
+
+def decode_dictionary(dictionary: bytes, data: bytes, count: int) -> np.ndarray:
+    """Invert :func:`encode_dictionary`."""
+    return dictionary_decode(decode_varints(data, count).astype(np.int64), json.loads(dictionary))
+
+
+def encode_store(store: TimeSeriesStore, objects: Optional[List[Object]] = None, level: int = 6) -> bytes:
+    """
+    Encode a time series store into the compact observation stream format.
+
+    The format starts with a magic number, a JSON header listing the series and their sections, and the
+    deflated sections: the delta-of-delta timestamps and either the XOR encoded floats or the dictionary encoded
+    values of every series.
+
+    :param store: The store.
+    :param objects: Objects the series belong to, e.g. the sensors, stored along so that a model can be rebuilt.
+    :param level: zlib compression level of the sections.
+    :return: The encoded bytes.
+    """
+    sections: List[bytes] = []
+    series_headers: List[Dict[str, Any]] = []
+    for series_id in store:
+        series = store.series(series_id)
+        first, timestamps = encode_timestamps(series.timestamps)
+        if series.numeric:
+            parts = encode_floats(series.values)
+        else:
+            parts = encode_dictionary(series.values)
+        encoded = [zlib.compress(part, level) for part in (timestamps, *parts)]
+        sections.extend(encoded)
+        series_headers.append({
+            "series_id": series_id,
+            "object_id": series.object_id,
+            "count": len(series),
+            "first_timestamp": first,
+            "numeric": series.numeric,
+            "sections": [len(section) for section in encoded]
+        })
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "observation_prefix": store.observation_prefix,
+        "objects": [
+            {"object_id": obj.object_id, "object_type": obj.object_type, "object_class": obj.object_class,
+             "attributes": obj.attributes}
+            for obj in objects or []
+        ],
+        "series": series_headers
+    }, default=str).encode("utf-8")
+    return b"".join([MAGIC, _HEADER_LENGTH.pack(len(header)), header, *sections])
+
+
+def decode_store(data: bytes) -> Tuple[TimeSeriesStore, List[Object]]:
+    """
+    Decode bytes written by :func:`encode_store`.
+
+    :param data: The encoded bytes.
+    :return: The store and the objects stored along.
+    """
+    if not data.startswith(MAGIC):
+        raise ValueError("The data is not in the observation stream format.")
+    offset = len(MAGIC)
+    (header_length,) = _HEADER_LENGTH.unpack_from(data, offset)
+    offset += _HEADER_LENGTH.size
+    header = json.loads(data[offset:offset + header_length])
+    offset += header_length
+    if header["version"] > FORMAT_VERSION:
+        raise ValueError(f"Unsupported observation stream format version {header['version']}.")
+
+    store = TimeSeriesStore(observation_prefix=header["observation_prefix"])
+    for entry in header["series"]:
+        parts = []
+        for length in entry["sections"]:
+            parts.append(zlib.decompress(data[offset:offset + length]))
+            offset += length
+        count = entry["count"]
+        timestamps = decode_timestamps(entry["first_timestamp"], parts[0], count)
+        if entry["numeric"]:
+            values = decode_floats(parts[1], parts[2])
+        else:
+            values = decode_dictionary(parts[1], parts[2], count)
+        store._series[entry["series_id"]] = TimeSeries(entry["object_id"], timestamps, values)
+
+    objects = [Object(**entry) for entry in header["objects"]]
+    return store, objects
+
+
+def save_observation_streams(model: COREMetamodel, path: str, level: int = 6) -> None:
+    """
+    Save the time series store of a model, with the objects its series belong to, in the compact format.
+
+    Only the observations of the store are saved. Events added to the model as rows are left to
+    :meth:`COREMetamodel.save_ocel`.
+
+    :param model: The model.
+    :param path: Path of the file.
+    :param level: zlib compression level.
+    """
+    store = model.time_series
+    object_ids = {store.series(series_id).object_id for series_id in store}
+    registry = model.object_registry
+    objects = [registry[object_id] for object_id in registry if object_id in object_ids]
+    with open(path, "wb") as file:
+        file.write(encode_store(store, objects, level))
+
+
+def load_observation_streams(path: str, model: Optional[COREMetamodel] = None) -> COREMetamodel:
+    """
+    Load observation streams saved with :func:`save_observation_streams` into a model, without building events.
+
+    :param path: Path of the file.
+    :param model: Model whose store the series are appended to. A new model by default.
+    :return: The model. Its OCEL expands the observations when it is next built.
+    """
+    with open(path, "rb") as file:
+        store, objects = decode_store(file.read())
+
+    if model is None:
+        return COREMetamodel(objects=objects, time_series=store)
+    model.append_batch(objects=objects)
+    for series_id in store:
+        series = store.series(series_id)
+        model.time_series.extend(series_id, series.timestamps, series.values, object_id=series.object_id)
+    return model
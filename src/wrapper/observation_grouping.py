@@ -0,0 +1,136 @@
+from datetime import timedelta
+from typing import Dict, Any, Optional, Tuple, Set, List
+
+from src.wrapper.parallel_ingestion import PartialLog
+from src.utils.table_buffer import to_epoch_ns
+
+# Observation id, device id and time window index. Parts that are not grouped by are None
+GroupKey = Tuple[Optional[str], Optional[str], Optional[int]]
+
+
+class ObservationGrouper:
+    """
+    Groups observations into IoT events while they are parsed.
+
+    Observations with the same key share one IoT event. The key is made of the observation id, the device and
+    the time window of the observation, each of which can be switched off. Open groups are kept in a dictionary,
+    so every observation is assigned to its IoT event in O(1) and no second pass over all observations is needed.
+
+    Observations, IoT events and their relationships are appended to a :class:`PartialLog`:
+
+    - every IoT event is derived from its observations (event-event, ``derived_from``),
+    - every IoT event and observation is related to its device (event-object, ``observed_by``),
+    - a process event passed along with an observation is derived from its IoT event (event-event,
+      ``derived_from``), once per IoT event.
+    """
+
+    def __init__(
+            self,
+            partial: Optional[PartialLog] = None,
+            by_observation_id: bool = True,
+            by_device: bool = False,
+            window: Optional[timedelta] = None,
+            iot_event_prefix: str = "iot_event_"
+    ) -> None:
+        """
+        Initializes the grouper.
+
+        :param partial: Partial log the events and relationships are appended to. A new one by default.
+        :param by_observation_id: Whether observations with different ids go to different IoT events.
+        :param by_device: Whether observations of different devices go to different IoT events.
+        :param window: Length of the time windows. Observations of different windows go to different IoT events.
+        :param iot_event_prefix: Prefix of the ids of the IoT events.
+        """
+        if not (by_observation_id or by_device or window is not None):
+            raise ValueError("Observations have to be grouped by at least one of observation id, device or window.")
+        if window is not None and window <= timedelta(0):
+            raise ValueError(f"The time window has to be positive, got {window}.")
+
+        self.partial: PartialLog = partial if partial is not None else PartialLog()
+        self.by_observation_id: bool = by_observation_id
+        self.by_device: bool = by_device
+        self.window_ns: Optional[int] = window // timedelta(microseconds=1) * 1_000 if window is not None else None
+        self.iot_event_prefix: str = iot_event_prefix
+
+        self._groups: Dict[GroupKey, str] = {}
+        self._observation_counts: Dict[str, int] = {}
+        self._process_links: Set[Tuple[str, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def key(self, observation_id: str, device_id: Optional[str], timestamp: Any) -> GroupKey:
+        """
+        Return the group key of an observation.
+
+        :param observation_id: Id of the observation, shared by repeated measurements of the same property.
+        :param device_id: Id of the device that made the observation.
+        :param timestamp: Timestamp of the observation.
+        :return: The group key.
+        """
+        window_index = None
+        if self.window_ns is not None:
+            epoch_ns = to_epoch_ns(timestamp)
+            if epoch_ns is None:
+                raise ValueError(f"Cannot assign observation {observation_id} without a valid timestamp to a "
+                                 f"window, got {timestamp!r}.")
+            window_index = epoch_ns // self.window_ns
+        return (
+            observation_id if self.by_observation_id else None,
+            device_id if self.by_device else None,
+            window_index
+        )
+
+    def _iot_event(self, key: GroupKey, device_id: Optional[str], timestamp: Any) -> str:
+        """Return the id of the IoT event of a group, creating the event when the group is new."""
+        iot_event_id = self._groups.get(key)
+        if iot_event_id is not None:
+            return iot_event_id
+
+        parts: List[str] = [str(part) for part in key if part is not None]
+        iot_event_id = self.iot_event_prefix + "_".join(parts)
+        self._groups[key] = iot_event_id
+        # The first observation of the group determines timestamp and device of the IoT event
+        self.partial.events.append(iot_event_id, "iot_event", parts[0], timestamp)
+        if device_id is not None:
+            self.partial.relationships.append("event_object", iot_event_id, device_id, "observed_by")
+        return iot_event_id
+
+    def add(
+            self,
+            observation_id: str,
+            device_id: Optional[str],
+            timestamp: Any,
+            attributes: Optional[Dict[str, Any]] = None,
+            observation_type: str = "observation",
+            process_event_id: Optional[str] = None
+    ) -> str:
+        """
+        Add an observation and assign it to the IoT event of its group.
+
+        Repeated observation ids are numbered, i.e. the n-th observation with id ``obs`` gets the event id
+        ``obs_n``.
+
+        :param observation_id: Id of the observation, shared by repeated measurements of the same property.
+        :param device_id: Id of the device that made the observation.
+        :param timestamp: Timestamp of the observation.
+        :param attributes: Attributes of the observation.
+        :param observation_type: Event type of the observation.
+        :param process_event_id: Process event the observation was recorded for.
+        :return: The id of the IoT event the observation was assigned to.
+        """
+        iot_event_id = self._iot_event(self.key(observation_id, device_id, timestamp), device_id, timestamp)
+
+        count = self._observation_counts.get(observation_id, 0)
+        self._observation_counts[observation_id] = count + 1
+        event_id = f"{observation_id}_{count}"
+
+        self.partial.events.append(event_id, "observation", observation_type, timestamp, attributes)
+        self.partial.relationships.append("event_event", iot_event_id, event_id, "derived_from")
+        if device_id is not None:
+            self.partial.relationships.append("event_object", event_id, device_id, "observed_by")
+
+        if process_event_id is not None and (process_event_id, iot_event_id) not in self._process_links:
+            self._process_links.add((process_event_id, iot_event_id))
+            self.partial.relationships.append("event_event", process_event_id, iot_event_id, "derived_from")
+        return iot_event_id
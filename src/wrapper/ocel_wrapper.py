@@ -1,14 +1,23 @@
-from typing import List, Dict, Any, Optional, Literal, Self, Callable
+from typing import List, Dict, Any, Optional, Literal, Self, Callable, Tuple, Union
 
+import numpy as np
 import pandas as pd
 from pm4py import OCEL
+from src.types_defintion.batch_definition import EventBatch, ObjectBatch, RelationshipBatch, ATTRIBUTE_PREFIX
 from src.types_defintion.event_definition import IotEvent, ProcessEvent, Observation, Event
 from src.types_defintion.object_definition import Object, ObjectClassEnum
 from src.types_defintion.relationship_definitions import EventObjectRelationship, EventEventRelationship, \
     ObjectObjectRelationship
+from src.utils.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from src.validation.integrity import IntegrityReport, check_integrity
+from src.wrapper.object_registry import ObjectRegistry
+from src.utils.table_buffer import TableBuffer
+from src.wrapper.time_series_store import TimeSeriesStore
 
 ATTRIBUTE_KEY_PREFIX = "ocel:attr:"
 
+Relationship = Union[ObjectObjectRelationship, EventObjectRelationship, EventEventRelationship]
+
 
 def get_event_by_id(events: pd.DataFrame, event_id: str, ocel_string: str) -> Dict[str, Any]:
     """
@@ -33,6 +42,11 @@ def _get_event_sub_type_label(event: Event, event_class: str) -> str:
     return "NO EVENT TYPE"
 
 
+def _concat_rows(frame: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """Append rows to a table, skipping the concatenation if the table is empty."""
+    return rows if frame.empty else pd.concat([frame, rows], ignore_index=True)
+
+
 class COREMetamodel:
     def __init__(
             self,
@@ -42,212 +56,844 @@ class COREMetamodel:
             observations: Optional[List[Observation]] = None,
             object_object_relationships: Optional[List[ObjectObjectRelationship]] = None,
             event_object_relationships: Optional[List[EventObjectRelationship]] = None,
-            event_event_relationships: Optional[List[EventEventRelationship]] = None
+            event_event_relationships: Optional[List[EventEventRelationship]] = None,
+            object_registry: Optional[ObjectRegistry] = None,
+            instrumentation: Optional[Instrumentation] = None,
+            time_series: Optional[TimeSeriesStore] = None
     ) -> None:
-        """Initialize the OCELWrapper with strongly typed data structures."""
-        self.ocel = OCEL()
-
-        self.objects = objects or []
-        self.iot_events = iot_events or []
-        self.process_events = process_events or []
-        self.observations = observations or []
-        self.object_object_relationships = object_object_relationships or []
-        self.event_object_relationships = event_object_relationships or []
-        self.event_event_relationships = event_event_relationships or []
-
-        self._process_data()
-
-    def _process_data(self) -> None:
-        """Process the data by adding objects, events, and relationships to the OCEL."""
-
-        self._add_event_event_relationships(self.event_event_relationships)
-        print("Event-event relationships added.")
-
-        self._add_objects(self.objects)
-        print("Objects added.")
-        self._add_events(self.observations + self.iot_events + self.process_events)
-        print("Events added.")
-
-        self._add_object_relationships(self.object_object_relationships)
-        print("Object relationships added.")
-        # self._add_event_object_relationships(self.event_object_relationships)
-        # print("Event-object relationships added.")
-        # self._add_event_object_relationships(self.event_object_relationships)
-        # print("Event-event relationships added.")
-
-        self._process_relationships()
-        print("Relationships processed.")
-
-    def _process_relationships(self) -> None:
-        """Process and create the relationships DataFrame with optimized performance.
-        """
-        print("Processing relationships...")
-
-        # Pre-compute object type mappings
-        object_type_dict = (
-            self.ocel.objects[["ocel:oid", "ocel:type"]]
-            .set_index("ocel:oid")["ocel:type"]
-            .to_dict()
+        """
+        Initialize the OCELWrapper with strongly typed data structures.
+
+        :param object_registry: Empty registry that deduplicates objects by id. Pass one to configure how
+            objects arriving several times are merged; by default the first occurrence wins.
+        :param instrumentation: Recorder of the time, rows and memory of every processing phase. Disabled by
+            default.
+        :param time_series: Store of dense sensor observations. The model only references it; its observations
+            are expanded into OCEL events when the OCEL is built. An empty store by default.
+        """
+        if object_registry is not None and len(object_registry):
+            raise ValueError("The object registry passed to COREMetamodel must be empty.")
+
+        self._ocel = OCEL()
+        self.object_registry: ObjectRegistry = object_registry if object_registry is not None else ObjectRegistry()
+        self.instrumentation: Instrumentation = instrumentation if instrumentation is not None \
+            else NULL_INSTRUMENTATION
+        self.time_series: TimeSeriesStore = time_series if time_series is not None else TimeSeriesStore()
+
+        self.objects: List[Object] = []
+        self.iot_events: List[IotEvent] = []
+        self.process_events: List[ProcessEvent] = []
+        self.observations: List[Observation] = []
+        self.object_object_relationships: List[ObjectObjectRelationship] = []
+        self.event_object_relationships: List[EventObjectRelationship] = []
+        self.event_event_relationships: List[EventEventRelationship] = []
+
+        # Amortized column buffers backing the OCEL tables
+        self._objects_table = TableBuffer(
+            [self._ocel.object_id_column, self._ocel.object_type_column, "ocel:object_class"],
+            attribute_prefix=ATTRIBUTE_KEY_PREFIX
+        )
+        self._events_table = TableBuffer(
+            [
+                self._ocel.event_id_column,
+                self._ocel.event_activity,
+                self._ocel.event_timestamp,
+                "ocel:event_type",
+                "ocel:event_class"
+            ],
+            kinds={
+                self._ocel.event_activity: "category",
+                self._ocel.event_timestamp: "timestamp",
+                "ocel:event_class": "category"
+            },
+            attribute_prefix=ATTRIBUTE_KEY_PREFIX
+        )
+        self._relations_table = TableBuffer([
+            self._ocel.event_id_column,
+            self._ocel.object_id_column,
+            self._ocel.object_type_column,
+            self._ocel.event_activity,
+            self._ocel.qualifier
+        ])
+        self._o2o_table = TableBuffer(
+            [self._ocel.object_id_column, self._ocel.object_id_column + "_2", self._ocel.qualifier]
+        )
+        self._e2e_table = TableBuffer(
+            [self._ocel.event_id_column, self._ocel.event_id_column + "_2", self._ocel.qualifier]
         )
 
-        # Pre-compute event activity mappings
-        event_activity_dict = (
-            self.ocel.events[["ocel:eid", "ocel:activity"]]
-            .set_index("ocel:eid")["ocel:activity"]
-            .to_dict()
+        # Row of every object in the objects table, used to update merged objects in place
+        self._object_rows: Dict[str, int] = {}
+        # Deduplicated id lookups of the objects/events tables, rebuilt when the table frame changes
+        self._lookups: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+
+        self._relation_report: Dict[str, int] = {"relations": 0, "dangling_events": 0, "dangling_objects": 0}
+        # Event-object relationships waiting to be resolved when the OCEL is built
+        self._pending_relationships: List[pd.DataFrame] = []
+        # Rows of the relations table pointing at unknown objects or events, resolved again on every build
+        self._dangling_objects: np.ndarray = np.empty(0, dtype=np.int64)
+        self._dangling_events: np.ndarray = np.empty(0, dtype=np.int64)
+        # Objects whose type changed when they were merged, whose relations are resolved again on the next build
+        self._retyped_objects: set = set()
+
+        # Incremented on every mutation. The OCEL and the derived views are rebuilt when their version, which
+        # includes the version of the time series store, is stale
+        self._version: int = 0
+        self._ocel_version: Optional[Tuple[int, int]] = None
+        self._views: Dict[Any, Any] = {}
+        self._views_version: Optional[Tuple[int, int]] = None
+
+        self.append_batch(
+            objects=objects,
+            events=(observations or []) + (iot_events or []) + (process_events or []),
+            relationships=(
+                    (object_object_relationships or [])
+                    + (event_object_relationships or [])
+                    + (event_event_relationships or [])
+            )
         )
 
-        # Extract relationship data once
-        event_ids = [x.event_id for x in self.event_object_relationships]
-        object_ids = [x.object_id for x in self.event_object_relationships]
+    def append_batch(
+            self,
+            objects: Optional[Union[List[Object], ObjectBatch]] = None,
+            events: Optional[Union[List[Event], EventBatch]] = None,
+            relationships: Optional[Union[List[Relationship], RelationshipBatch]] = None
+    ) -> Self:
+        """
+        Appends a batch of entities to the model and updates the OCEL tables incrementally.
 
-        # Use dictionary lookups instead of DataFrame operations
-        resolved_o_types = [
-            object_type_dict.get(obj_id, "undefined")
-            for obj_id in object_ids
-        ]
+        Objects whose id is already known are merged according to the object registry. Event-object relations are
+        resolved when the OCEL is next built, against every object and event added until then.
 
-        resolved_activities = [
-            event_activity_dict.get(event_id, "undefined")
-            for event_id in event_ids
-        ]
+        Batches are consumed column-wise and are not copied into the ``objects``/``*_events`` lists. Objects of an
+        ObjectBatch whose id is new are registered without being built; only objects whose id is already known
+        are upserted one by one.
+
+        :param objects: Objects to add, as a list or an ObjectBatch.
+        :param events: IoT events, process events and observations to add, in any mix, as a list or an
+            EventBatch.
+        :param relationships: Object-object, event-object and event-event relationships to add, in any mix, as a
+            list or a RelationshipBatch.
+        :return: The model itself.
+        """
+        object_batch: Optional[ObjectBatch] = objects if isinstance(objects, ObjectBatch) else None
+        event_batch: Optional[EventBatch] = events if isinstance(events, EventBatch) else None
+        relationship_batch: Optional[RelationshipBatch] = relationships \
+            if isinstance(relationships, RelationshipBatch) else None
+        if relationship_batch is not None:
+            relationships = None
+        new_objects: List[Object] = list(objects or []) if object_batch is None else []
+        new_events: List[Event] = list(events or []) if event_batch is None else []
+        new_object_relationships: List[ObjectObjectRelationship] = []
+        new_event_object_relationships: List[EventObjectRelationship] = []
+        new_event_event_relationships: List[EventEventRelationship] = []
+
+        for relationship in relationships or []:
+            if isinstance(relationship, EventEventRelationship):
+                new_event_event_relationships.append(relationship)
+            elif isinstance(relationship, EventObjectRelationship):
+                new_event_object_relationships.append(relationship)
+            elif isinstance(relationship, ObjectObjectRelationship):
+                new_object_relationships.append(relationship)
+            else:
+                raise TypeError(f"Unsupported relationship type: {type(relationship).__name__}")
+
+        events_by_class: Dict[str, List[Event]] = {
+            "iot_event": self.iot_events,
+            "process_event": self.process_events,
+            "observation": self.observations
+        }
+        for event in new_events:
+            events_by_class[event.event_class].append(event)
+
+        self.objects.extend(new_objects)
+        self.object_object_relationships.extend(new_object_relationships)
+        self.event_object_relationships.extend(new_event_object_relationships)
+        self.event_event_relationships.extend(new_event_event_relationships)
+
+        with self.instrumentation.span("append_batch"):
+            self._process_data(
+                new_objects,
+                new_events,
+                new_object_relationships,
+                new_event_object_relationships,
+                new_event_event_relationships,
+                object_batch,
+                event_batch,
+                relationship_batch
+            )
+        self._version += 1
+        return self
+
+    def _process_data(
+            self,
+            objects: List[Object],
+            events: List[Event],
+            object_object_relationships: List[ObjectObjectRelationship],
+            event_object_relationships: List[EventObjectRelationship],
+            event_event_relationships: List[EventEventRelationship],
+            object_batch: Optional[ObjectBatch] = None,
+            event_batch: Optional[EventBatch] = None,
+            relationship_batch: Optional[RelationshipBatch] = None
+    ) -> None:
+        """Process one batch by adding objects, events, and relationships to the OCEL."""
+
+        with self.instrumentation.span("e2e", rows=len(event_event_relationships)):
+            self._add_event_event_relationships(event_event_relationships)
+
+        with self.instrumentation.span("objects", rows=len(objects)) as span:
+            self._add_objects(objects)
+            if object_batch is not None:
+                self._add_object_batch(object_batch)
+                span.add_rows(len(object_batch))
+
+        with self.instrumentation.span("events", rows=len(events)) as span:
+            self._add_events(events)
+            if event_batch is not None:
+                self._add_event_batch(event_batch)
+                span.add_rows(len(event_batch))
+
+        with self.instrumentation.span("o2o", rows=len(object_object_relationships)):
+            self._add_object_relationships(object_object_relationships)
+
+        if event_object_relationships:
+            with self.instrumentation.span("e2o", rows=len(event_object_relationships)):
+                self._pending_relationships.append(self._relationship_frame(event_object_relationships))
+
+        if relationship_batch is not None:
+            with self.instrumentation.span("relationship_batch", rows=len(relationship_batch)):
+                self._add_relationship_batch(relationship_batch)
+
+    def _state(self) -> Tuple[int, int]:
+        """Return the version of the model including its time series store."""
+        return self._version, self.time_series.version
+
+    def _materialize(self) -> None:
+        """Build the OCEL from the buffered tables if the model changed since it was last built."""
+        if self._ocel_version == self._state():
+            return
+
+        with self.instrumentation.span("build_ocel"):
+            if len(self._dangling_objects) or len(self._dangling_events) or self._retyped_objects:
+                with self.instrumentation.span("relations_update"):
+                    self._update_relationships()
+            if self._pending_relationships:
+                relationships = pd.concat(self._pending_relationships, ignore_index=True)
+                with self.instrumentation.span("relations", rows=len(relationships)):
+                    self._process_relationships(relationships)
+                self._pending_relationships = []
+            with self.instrumentation.span("tables", rows=len(self._events_table) + len(self._objects_table)):
+                self._flush_tables()
+        self._ocel_version = self._state()
+
+    def _view(self, key: Any, build: Callable[[], Any]) -> Any:
+        """
+        Return a derived view of the model, computed once per model version.
+
+        :param key: Key of the view in the cache.
+        :param build: Computes the view.
+        :return: The cached or newly computed view.
+        """
+        if self._views_version != self._state():
+            self._views.clear()
+            self._views_version = self._state()
+        if key not in self._views:
+            self._views[key] = build()
+        return self._views[key]
+
+    @property
+    def ocel(self) -> OCEL:
+        """The OCEL object, built on first access after a change."""
+        return self.get_ocel()
+
+    @property
+    def relation_report(self) -> Dict[str, int]:
+        """
+        Number of event-object relations of the OCEL, including those of the time series store, and of those
+        pointing at unknown events or objects when the OCEL was last built.
+        """
+        self._materialize()
+        return self._relation_report
+
+    def _flush_tables(self) -> None:
+        """Expose the buffered tables on the OCEL. Unchanged tables are served from the buffer cache."""
+        self._ocel.objects = self._objects_table.to_frame()
+        self._ocel.events = self._events_table.to_frame()
+        self._ocel.relations = self._relations_table.to_frame()
+        self._ocel.o2o = self._o2o_table.to_frame()
+        self._ocel.e2e = self._e2e_table.to_frame()
+        self._relation_report = {
+            "relations": len(self._relations_table),
+            "dangling_events": len(self._dangling_events),
+            "dangling_objects": len(self._dangling_objects)
+        }
+
+        if len(self.time_series):
+            with self.instrumentation.span("time_series", rows=len(self.time_series)):
+                events, relations, dangling = self._time_series_tables()
+                self._ocel.events = _concat_rows(self._ocel.events, events)
+                self._ocel.relations = _concat_rows(self._ocel.relations, relations)
+                self._relation_report["relations"] += len(relations)
+                self._relation_report["dangling_objects"] += dangling
+
+    def _time_series_tables(self) -> Tuple[pd.DataFrame, pd.DataFrame, int]:
+        """
+        Expand the observations of the time series store into OCEL event rows and event-object relations to
+        the objects of their series. Relations to unknown objects get the object type "undefined" and are
+        counted.
+        """
+        observations = self.time_series.to_observations()
+        count = len(observations)
+        observed = pd.Categorical.from_codes(np.zeros(count, dtype=np.int64), categories=["observed"])
+
+        events = pd.DataFrame({
+            self._ocel.event_id_column: observations["event_id"],
+            self._ocel.event_activity: observed,
+            self._ocel.event_timestamp: observations["timestamp"],
+            "ocel:event_type": observed,
+            "ocel:event_class": pd.Categorical.from_codes(np.zeros(count, dtype=np.int64),
+                                                          categories=["observation"]),
+            ATTRIBUTE_KEY_PREFIX + "value": observations["value"],
+            ATTRIBUTE_KEY_PREFIX + "series": observations["series_id"]
+        })
+
+        object_types = observations[["object_id"]].merge(
+            self._lookup(self._objects_table, self._ocel.object_id_column, self._ocel.object_type_column),
+            how="left",
+            left_on="object_id",
+            right_on=self._ocel.object_id_column
+        )[self._ocel.object_type_column]
+        relations = pd.DataFrame({
+            self._ocel.event_id_column: observations["event_id"],
+            self._ocel.object_id_column: observations["object_id"],
+            self._ocel.object_type_column: object_types.fillna("undefined").to_numpy(),
+            self._ocel.event_activity: "observed",
+            self._ocel.qualifier: "observed_by"
+        })
+        return events, relations, int(object_types.isna().sum())
+
+    def _relationship_frame(self, relationships: List[EventObjectRelationship]) -> pd.DataFrame:
+        """Collect event-object relationships into a frame with event id, object id and qualifier columns."""
+        return pd.DataFrame({
+            self._ocel.event_id_column: [rel.event_id for rel in relationships],
+            self._ocel.object_id_column: [rel.object_id for rel in relationships],
+            self._ocel.qualifier: [rel.qualifier for rel in relationships]
+        }, dtype=object)
+
+    def _lookup(self, table: TableBuffer, key: str, value: str) -> pd.DataFrame:
+        """Return the ``key``/``value`` columns of a table with unique keys, cached until the table changes."""
+        frame = table.to_frame()
+        cached = self._lookups.get(key)
+        if cached is None or cached[0] is not frame:
+            lookup = frame[[key, value]].drop_duplicates(key)
+            lookup[value] = lookup[value].astype(object)
+            cached = self._lookups[key] = (frame, lookup)
+        return cached[1]
+
+    def _join_relationships(self, relationships: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the object type and event activity of event-object relationships with a hash join against the
+        objects and events tables. Both are missing for relationships pointing at unknown objects or events.
+
+        :param relationships: Frame with event id and object id columns.
+        :return: The relationships with object type and event activity columns, in their order.
+        """
+        return relationships.merge(
+            self._lookup(self._objects_table, self._ocel.object_id_column, self._ocel.object_type_column),
+            how="left",
+            on=self._ocel.object_id_column
+        ).merge(
+            self._lookup(self._events_table, self._ocel.event_id_column, self._ocel.event_activity),
+            how="left",
+            on=self._ocel.event_id_column
+        )
 
-        # Create relationships dictionary in one go
-        relationships = {
-            self.ocel.event_id_column: event_ids,
-            self.ocel.object_id_column: object_ids,
-            self.ocel.object_type_column: resolved_o_types,
-            self.ocel.event_activity: resolved_activities,
-            "ocel:qualifier": ["related"] * len(self.event_object_relationships)
+    def _process_relationships(self, relationships: pd.DataFrame) -> None:
+        """
+        Resolve object types and event activities of new event-object relationships, keeping their qualifiers.
+        Relationships pointing at unknown events or objects are kept as "undefined" and resolved again on every
+        build until the events or objects are added.
+
+        :param relationships: Frame with event id, object id and qualifier columns.
+        """
+        if relationships.empty:
+            return
+
+        resolved = self._join_relationships(relationships)
+        dangling_objects = resolved[self._ocel.object_type_column].isna()
+        dangling_events = resolved[self._ocel.event_activity].isna()
+        start = len(self._relations_table)
+        self._dangling_objects = np.concatenate([self._dangling_objects,
+                                                 start + np.flatnonzero(dangling_objects.to_numpy())])
+        self._dangling_events = np.concatenate([self._dangling_events,
+                                                start + np.flatnonzero(dangling_events.to_numpy())])
+
+        self._relations_table.extend_columns({
+            self._ocel.event_id_column: resolved[self._ocel.event_id_column].to_numpy(),
+            self._ocel.object_id_column: resolved[self._ocel.object_id_column].to_numpy(),
+            self._ocel.object_type_column: resolved[self._ocel.object_type_column].where(
+                ~dangling_objects, "undefined").to_numpy(),
+            self._ocel.event_activity: resolved[self._ocel.event_activity].where(
+                ~dangling_events, "undefined").to_numpy(),
+            self._ocel.qualifier: resolved[self._ocel.qualifier].to_numpy()
+        }, len(resolved))
+
+    def _update_relationships(self) -> None:
+        """
+        Resolve again the relations that pointed at unknown objects or events and those of objects whose type
+        changed, so the relations table does not depend on when the OCEL was built.
+        """
+        rows = np.union1d(self._dangling_objects, self._dangling_events)
+        if self._retyped_objects:
+            object_ids = self._relations_table.to_frame()[self._ocel.object_id_column]
+            rows = np.union1d(rows, np.flatnonzero(object_ids.isin(self._retyped_objects).to_numpy()))
+            self._retyped_objects = set()
+        if not len(rows):
+            return
+
+        resolved = self._join_relationships(pd.DataFrame({
+            column: np.asarray(self._relations_table.column(column).take(rows).to_list(), dtype=object)
+            for column in (self._ocel.event_id_column, self._ocel.object_id_column)
+        }))
+        dangling_objects = resolved[self._ocel.object_type_column].isna().to_numpy()
+        dangling_events = resolved[self._ocel.event_activity].isna().to_numpy()
+        self._set_relation_values(self._ocel.object_type_column, rows[~dangling_objects],
+                                  resolved[self._ocel.object_type_column].to_numpy()[~dangling_objects])
+        self._set_relation_values(self._ocel.event_activity, rows[~dangling_events],
+                                  resolved[self._ocel.event_activity].to_numpy()[~dangling_events])
+        self._dangling_objects = rows[dangling_objects]
+        self._dangling_events = rows[dangling_events]
+
+    def _set_relation_values(self, column: str, rows: np.ndarray, values: np.ndarray) -> None:
+        """Overwrite cells of a column of the relations table, cell by cell or, for many rows, column-wise."""
+        if not len(rows):
+            return
+        if len(rows) * 8 < len(self._relations_table):
+            for row, value in zip(rows.tolist(), values.tolist()):
+                self._relations_table.set_value(row, column, value)
+            return
+        updated = np.asarray(self._relations_table.column(column).to_list(), dtype=object)
+        updated[rows] = values
+        self._relations_table.set_column(column, updated)
+
+    def _object_row(self, obj: Object) -> Dict[str, Any]:
+        """Build the OCEL objects row of an object."""
+        new_row = {
+            self._ocel.object_id_column: obj.object_id,
+            self._ocel.object_type_column: obj.object_type,
+            "ocel:object_class": obj.object_class
         }
 
-        # Create DataFrame in a single operation
-        self.ocel.relations = pd.DataFrame(relationships)
+        for key, value in obj.attributes.items():
+            new_row[ATTRIBUTE_KEY_PREFIX + key] = value
 
+        return new_row
 
     def _add_objects(self, objects: List[Object]) -> None:
-        """Add objects to the OCEL."""
-        new_rows = []
+        """Add objects to the OCEL. Objects whose id is already known are upserted through the registry."""
         for obj in objects:
-            new_row = {
-                self.ocel.object_id_column: obj.object_id,
-                self.ocel.object_type_column: obj.object_type,
-                "ocel:object_class": obj.object_class
-            }
+            previous = self.object_registry.get(obj.object_id)
+            if self.object_registry.upsert(obj):
+                self._object_rows[obj.object_id] = self._objects_table.append_record(
+                    (obj.object_id, obj.object_type, obj.object_class),
+                    obj.attributes
+                )
+                continue
 
-            for key, value in obj.attributes.items():
-                new_row[ATTRIBUTE_KEY_PREFIX + key] = value
+            current = self.object_registry[obj.object_id]
+            if current is previous:
+                continue
+            if current.object_type != previous.object_type:
+                self._retyped_objects.add(obj.object_id)
 
-            if not any(x[self.ocel.object_id_column] == obj.object_id for x in new_rows):
-                new_rows.append(new_row)
+            row = self._object_rows[obj.object_id]
+            for key in previous.attributes.keys() - current.attributes.keys():
+                self._objects_table.set_value(row, ATTRIBUTE_KEY_PREFIX + key, None)
+            for column, value in self._object_row(current).items():
+                self._objects_table.set_value(row, column, value)
 
-        if new_rows:
-            new_df = pd.DataFrame(new_rows)
-            self.ocel.objects = pd.concat([self.ocel.objects, new_df], ignore_index=True)
+    def _add_object_batch(self, batch: ObjectBatch) -> None:
+        """
+        Add the objects of an ObjectBatch to the OCEL. Objects with a new id are appended column-wise and
+        registered without being built; objects whose id is already known, or repeats within the batch, are
+        upserted through the registry one by one.
+        """
+        object_ids = batch.field("object_id").to_list()
+        repeated = pd.Index(object_ids).duplicated() if len(object_ids) else np.empty(0, dtype=bool)
+        registry = self.object_registry
+        new = ~repeated & np.fromiter((object_id not in registry for object_id in object_ids), dtype=bool,
+                                      count=len(object_ids))
+        rows = np.flatnonzero(new)
+        table = batch.table if len(rows) == len(batch) else batch.table.take(rows)
+
+        if len(rows):
+            new_ids = table.column("object_id").to_list()
+            object_classes = table.column("object_class").to_list()
+            classes = {value: ObjectClassEnum(value) for value in set(object_classes)}
+            columns = {
+                self._ocel.object_id_column: new_ids,
+                self._ocel.object_type_column: table.column("object_type"),
+                "ocel:object_class": [classes[value] for value in object_classes]
+            }
+            for name in batch.attribute_names:
+                columns[ATTRIBUTE_KEY_PREFIX + name] = table.column(ATTRIBUTE_PREFIX + name)
+            start = len(self._objects_table)
+            self._objects_table.extend_columns(columns, len(rows))
+            self._object_rows.update(zip(new_ids, range(start, start + len(rows))))
+            registry.defer(new_ids, self._load_object)
+
+        # Detached copies, so that the registry does not keep the batch alive
+        self._add_objects([batch[index].to_model() for index in np.flatnonzero(~new).tolist()])
+
+    def _load_object(self, object_id: str) -> Object:
+        """Build an object from its row of the objects table, for objects added column-wise."""
+        table, row = self._objects_table, self._object_rows[object_id]
+        attributes = {}
+        for column in table.columns:
+            if column.startswith(ATTRIBUTE_KEY_PREFIX):
+                value = table.value(row, column)
+                if value is not None:
+                    attributes[column[len(ATTRIBUTE_KEY_PREFIX):]] = value
+        return Object(
+            object_id=object_id,
+            object_type=table.value(row, self._ocel.object_type_column),
+            object_class=ObjectClassEnum(table.value(row, "ocel:object_class")),
+            attributes=attributes
+        )
 
     def _add_events(self, events: List[Event]) -> None:
         """Add events to the OCEL."""
-        new_rows = []
         for event in events:
             event_sub_type_label: str = _get_event_sub_type_label(event, event.event_class)
 
-            new_row = {
-                self.ocel.event_id_column: event.event_id,
-                self.ocel.event_activity: event_sub_type_label,
-                self.ocel.event_timestamp: event.timestamp,
-                "ocel:event_type": event_sub_type_label,
-                "ocel:event_class": event.event_class
-            }
+            self._events_table.append_record(
+                (event.event_id, event_sub_type_label, event.timestamp, event_sub_type_label, event.event_class),
+                event.attributes
+            )
 
-            for key, value in event.attributes.items():
-                new_row[ATTRIBUTE_KEY_PREFIX + key] = value
+    def _add_event_batch(self, batch: EventBatch) -> None:
+        """Add the events of an EventBatch to the OCEL column-wise."""
+        labels: List[str] = [
+            (activity if activity is not None else "NO EVENT TYPE") if event_class == "process_event"
+            else event_type if event_class == "iot_event"
+            else "observed"
+            for event_class, event_type, activity in zip(
+                batch.field("event_class").to_list(),
+                batch.field("event_type").to_list(),
+                batch.field("activity").to_list()
+            )
+        ]
 
-            new_rows.append(new_row)
+        columns = {
+            self._ocel.event_id_column: batch.field("event_id"),
+            self._ocel.event_activity: labels,
+            self._ocel.event_timestamp: batch.field("timestamp"),
+            "ocel:event_type": labels,
+            "ocel:event_class": batch.field("event_class")
+        }
+        for name in batch.attribute_names:
+            columns[ATTRIBUTE_KEY_PREFIX + name] = batch.field(ATTRIBUTE_PREFIX + name)
 
-        if new_rows:
-            new_df = pd.DataFrame(new_rows)
-            self.ocel.events = pd.concat([self.ocel.events, new_df], ignore_index=True)
+        self._events_table.extend_columns(columns, len(batch))
 
     def _add_object_relationships(self, relationships: List[ObjectObjectRelationship]) -> None:
         """Add object-object relationships to the OCEL."""
-        new_rows = [{
-            self.ocel.object_id_column: rel.object_id,
-            self.ocel.object_id_column + "_2": rel.related_object_id,
-            self.ocel.qualifier: rel.qualifier
-        } for rel in relationships]
-
-        if new_rows:
-            new_df = pd.DataFrame(new_rows)
-            self.ocel.o2o = pd.concat([self.ocel.o2o, new_df], ignore_index=True)
-
-    def _add_event_object_relationships(self, relationships: List[EventObjectRelationship]) -> None:
-        """Add event-object relationships to the OCEL."""
-        new_rows = []
         for rel in relationships:
-            obj = next((x for x in self.objects if x.object_id == rel.object_id), None)
-            if not obj:
-                continue
+            self._o2o_table.append_record((rel.object_id, rel.related_object_id, rel.qualifier))
+
+    def _add_relationship_batch(self, batch: RelationshipBatch) -> None:
+        """Add the relationships of a RelationshipBatch to the OCEL column-wise, split by relationship class."""
+        classes = np.asarray(batch.field("relationship_class").to_array(), dtype=object)
+        sources = np.asarray(batch.field("source_id").to_array(), dtype=object)
+        targets = np.asarray(batch.field("target_id").to_array(), dtype=object)
+        qualifiers = np.asarray(batch.field("qualifier").to_array(), dtype=object)
+
+        tables = {
+            "object_object": (self._o2o_table, self._ocel.object_id_column, self._ocel.object_id_column + "_2"),
+            "event_event": (self._e2e_table, self._ocel.event_id_column, self._ocel.event_id_column + "_2")
+        }
+        for relationship_class, (table, source_column, target_column) in tables.items():
+            mask = classes == relationship_class
+            count = int(mask.sum())
+            if count:
+                table.extend_columns({
+                    source_column: sources[mask],
+                    target_column: targets[mask],
+                    self._ocel.qualifier: qualifiers[mask]
+                }, count)
+
+        mask = classes == "event_object"
+        if mask.any():
+            self._pending_relationships.append(pd.DataFrame({
+                self._ocel.event_id_column: sources[mask],
+                self._ocel.object_id_column: targets[mask],
+                self._ocel.qualifier: qualifiers[mask]
+            }, dtype=object))
 
-            event = next(
-                (x for x in self.iot_events + self.process_events if x.event_id == rel.event_id),
-                None
-            )
-            if not event:
-                continue
+    def _add_event_event_relationships(self, relationships: List[EventEventRelationship]) -> None:
+        """Add event-event relationships to the E2E table of the OCEL."""
+        for rel in relationships:
+            self._e2e_table.append_record((rel.event_id, rel.derived_from_event_id, rel.qualifier))
 
-            new_row = {
-                self.ocel.event_id_column: rel.event_id,
-                self.ocel.event_activity: getattr(event, 'activity', ''),
-                self.ocel.event_timestamp: event.timestamp,
-                self.ocel.object_type_column: obj.object_type,
-                self.ocel.object_id_column: obj.object_id
-            }
-            new_rows.append(new_row)
+    def _link_objects_ocel(self) -> OCEL:
+        """
+        Build a copy of the OCEL in which every event-event relationship is also represented by an e20 linking
+        object of type "link", related to the first event with "derived_from" and to the second with
+        "derived_to". Used for exports whose format has no E2E table.
 
-        if new_rows:
-            new_df = pd.DataFrame(new_rows)
-            self.ocel.relations = pd.concat([self.ocel.relations, new_df], ignore_index=True)
+        :return: The OCEL with linking objects and their relations added.
+        """
+        ocel = self.get_ocel()
+        e2e = ocel.e2e
+        if e2e.empty:
+            return ocel
+
+        source = e2e[self._ocel.event_id_column].astype(object)
+        target = e2e[self._ocel.event_id_column + "_2"].astype(object)
+        link_ids = "e20_" + source.astype(str) + "_" + target.astype(str)
+
+        new_ids = link_ids.drop_duplicates()
+        new_ids = new_ids[~new_ids.isin(self._ocel.objects[self._ocel.object_id_column])]
+        link_objects = pd.DataFrame({
+            self._ocel.object_id_column: new_ids.to_numpy(),
+            self._ocel.object_type_column: "link",
+            "ocel:object_class": ObjectClassEnum.LINK
+        })
+
+        link_relations = pd.concat([
+            pd.DataFrame({
+                self._ocel.event_id_column: source.to_numpy(),
+                self._ocel.object_id_column: link_ids.to_numpy(),
+                self._ocel.qualifier: "derived_from"
+            }),
+            pd.DataFrame({
+                self._ocel.event_id_column: target.to_numpy(),
+                self._ocel.object_id_column: link_ids.to_numpy(),
+                self._ocel.qualifier: "derived_to"
+            })
+        ], ignore_index=True).merge(
+            self._lookup(self._events_table, self._ocel.event_id_column, self._ocel.event_activity),
+            how="left",
+            on=self._ocel.event_id_column
+        )
+        link_relations[self._ocel.event_activity] = link_relations[self._ocel.event_activity].fillna("undefined")
+        link_relations[self._ocel.object_type_column] = "link"
+
+        return OCEL(
+            events=self._ocel.events,
+            objects=pd.concat([self._ocel.objects, link_objects], ignore_index=True),
+            relations=pd.concat(
+                [self._ocel.relations, link_relations[self._ocel.relations.columns]], ignore_index=True
+            ),
+            globals=self._ocel.globals,
+            parameters=self._ocel.parameters,
+            o2o=self._ocel.o2o,
+            e2e=e2e
+        )
 
-    def _add_event_event_relationships(self, relationships: List[EventEventRelationship]) -> None:
-        """Add event-event relationships to the OCEL by creating an e20 relationship with a linking object."""
-
-        for relationship in relationships:
-            # Create a linking object
-            linking_object = Object(
-                object_id=f"e20_{relationship.event_id}_{relationship.derived_from_event_id}",
-                object_type="link",
-                object_class=ObjectClassEnum.LINK,
-                attributes={}
-            )
+    def get_ocel(self, link_objects: bool = False) -> OCEL:
+        """
+        Return the OCEL object. It is built from the buffered tables on the first call after a change.
+
+        :param link_objects: Whether to return a copy that represents event-event relationships as linking
+            objects in addition to the E2E table.
+        """
+        if link_objects:
+            return self._view("link_objects", self._link_objects_ocel)
+        self._materialize()
+        return self._ocel
+
+    def get_extended_table(self) -> pd.DataFrame:
+        """
+        Transform the current OCEL data structure into a Pandas DataFrame.
+
+        The table is cached until the model changes, so callers must not modify it.
+        """
+        return self._view("extended_table", lambda: self.get_ocel().get_extended_table())
+
+    def get_summary(self) -> str:
+        """Return the pm4py summary of the OCEL, cached until the model changes."""
+        return self._view("summary", lambda: self.get_ocel().get_summary())
+
+    def get_flattened_table(self, object_type: str) -> pd.DataFrame:
+        """
+        Flatten the OCEL into a traditional event log with the objects of one type as cases.
+
+        The table is cached per object type until the model changes, so callers must not modify it.
+
+        :param object_type: The object type used as case notion.
+        :return: The flattened event log.
+        """
+        import pm4py
+        return self._view(("flattened", object_type), lambda: pm4py.ocel_flattening(self.get_ocel(), object_type))
+
+    def get_tables(self) -> Dict[str, pd.DataFrame]:
+        """
+        Return the tables of the model without the observations of the time series store, keyed by ``objects``,
+        ``events``, ``relations``, ``o2o`` and ``e2e``. Event-object relations are resolved first.
 
-            self.objects.append(linking_object)
-
-            # Create the relationship
-            self.event_object_relationships.append(
-                EventObjectRelationship(
-                    object_id=linking_object.object_id,
-                    event_id=relationship.event_id,
-                    qualifier="derived_from"
-            ))
-            self.event_object_relationships.append(
-                EventObjectRelationship(
-                    object_id=linking_object.object_id,
-                    event_id=relationship.derived_from_event_id,
-                    qualifier="derived_to"
+        The tables are cached until the model changes, so callers must not modify them.
+        """
+        self._materialize()
+        return {
+            "objects": self._objects_table.to_frame(),
+            "events": self._events_table.to_frame(),
+            "relations": self._relations_table.to_frame(),
+            "o2o": self._o2o_table.to_frame(),
+            "e2e": self._e2e_table.to_frame()
+        }
+
+    @classmethod
+    def from_tables(
+            cls,
+            tables: Dict[str, pd.DataFrame],
+            time_series: Optional[TimeSeriesStore] = None,
+            instrumentation: Optional[Instrumentation] = None
+    ) -> "COREMetamodel":
+        """
+        Build a model from tables in the layout of :meth:`get_tables`, e.g. read back from storage.
+
+        Objects are registered one by one, so they can be merged with objects added later. The other tables are
+        copied column-wise; relations are taken as resolved.
+
+        :param tables: The tables. Missing tables are taken as empty.
+        :param time_series: Store of dense sensor observations of the model.
+        :param instrumentation: Recorder of the processing phases.
+        :return: The model.
+        """
+        model = cls(instrumentation=instrumentation, time_series=time_series)
+        object_id, object_type = model._ocel.object_id_column, model._ocel.object_type_column
+
+        objects = tables.get("objects")
+        if objects is not None and not objects.empty:
+            attribute_columns = [column for column in objects.columns if column.startswith(ATTRIBUTE_KEY_PREFIX)]
+            attributes = objects[attribute_columns].astype(object).where(objects[attribute_columns].notna(), None)
+            model.append_batch(objects=[
+                Object(
+                    object_id=row_id,
+                    object_type=row_type,
+                    object_class=ObjectClassEnum(object_class),
+                    attributes={
+                        column[len(ATTRIBUTE_KEY_PREFIX):]: value
+                        for column, value in zip(attribute_columns, row_attributes) if value is not None
+                    }
                 )
-            )
+                for row_id, row_type, object_class, row_attributes in zip(
+                    objects[object_id], objects[object_type], objects["ocel:object_class"],
+                    attributes.to_numpy().tolist()
+                )
+            ])
+
+        for name, table in (("events", model._events_table), ("relations", model._relations_table),
+                            ("o2o", model._o2o_table), ("e2e", model._e2e_table)):
+            frame = tables.get(name)
+            if frame is None or frame.empty:
+                continue
+            table.extend_columns({
+                column: frame[column].array if isinstance(frame[column].dtype, (pd.CategoricalDtype,
+                                                                                  pd.DatetimeTZDtype))
+                else frame[column].to_numpy()
+                for column in frame.columns
+            }, len(frame))
+
+        relations = tables.get("relations")
+        if relations is not None and not relations.empty:
+            # Relations stored as "undefined" are resolved again, against objects and events added later too
+            model._dangling_objects = np.flatnonzero((relations[object_type] == "undefined").to_numpy())
+            model._dangling_events = np.flatnonzero((relations[model._ocel.event_activity] == "undefined").to_numpy())
+        model._version += 1
+        return model
+
+    def validate_integrity(self) -> IntegrityReport:
+        """
+        Check that every relationship points at existing events and objects, and find duplicate ids, objects
+        without relationships and cycles of event-event relationships. Observations of the time series store are
+        included.
 
+        :return: The report, see :class:`src.validation.integrity.IntegrityReport`.
+        """
+        ocel = self.get_ocel()
+        return check_integrity({"objects": ocel.objects, "events": ocel.events, "relations": ocel.relations,
+                                "o2o": ocel.o2o, "e2e": ocel.e2e})
 
+    def save_parquet(self, directory: str, row_group_size: int = 100_000) -> None:
+        """
+        Save the tables of the model as Parquet files, keeping the dtypes of the attribute columns. Requires
+        pyarrow.
 
-    def get_ocel(self) -> OCEL:
-        """Return the OCEL object."""
-        return self.ocel
+        :param directory: Target directory, created if missing.
+        :param row_group_size: Number of rows per row group, the unit skipped by filters when loading.
+        """
+        from src.wrapper.parquet_storage import save_parquet
+        save_parquet(self, directory, row_group_size)
 
-    def get_extended_table(self) -> pd.DataFrame:
-        """Transform the current OCEL data structure into a Pandas DataFrame."""
-        return self.ocel.get_extended_table()
+    @classmethod
+    def load_parquet(cls, directory: str, **kwargs) -> "COREMetamodel":
+        """
+        Load a model saved with :meth:`save_parquet`. Requires pyarrow.
+
+        :param directory: Directory of the model.
+        :param kwargs: Projection and filters, see :func:`src.wrapper.parquet_storage.load_parquet`.
+        :return: The model.
+        """
+        from src.wrapper.parquet_storage import load_parquet
+        return load_parquet(directory, **kwargs)
+
+    @classmethod
+    def load_ocel_json(cls, path: str, **kwargs) -> "COREMetamodel":
+        """
+        Import an OCEL 1.0 ``.jsonocel`` or OCEL 2.0 JSON log, streaming it chunk by chunk instead of loading the
+        document at once.
+
+        :param path: Path of the log, optionally ``.gz`` or ``.zst`` compressed.
+        :param kwargs: Chunking and object class recovery, see :func:`src.readers.ocel_json_reader.load_ocel_json`.
+        :return: The model.
+        """
+        from src.readers.ocel_json_reader import load_ocel_json
+        return load_ocel_json(path, **kwargs)
 
-    def save_ocel(self, path: str) -> None:
-        """Save the OCEL object to a file."""
+    def load_from_json_schema(self, path: str, **kwargs) -> Self:
+        """
+        Append a file of the custom CCM schema (``schemas/json_schema.json``) to the model, streaming it chunk by
+        chunk. Records are not validated, see :class:`src.validation.base.JsonValidator` for that.
+
+        :param path: Path of the file, optionally ``.gz`` or ``.zst`` compressed.
+        :param kwargs: Chunking and object classes, see :func:`src.readers.custom_schema_reader.load_custom_schema`.
+        :return: The model itself.
+        """
+        from src.readers.custom_schema_reader import load_custom_schema
+        load_custom_schema(path, model=self, **kwargs)
+        return self
+
+    def save_to_json(self, path: str, chunk_size: int = 10_000) -> None:
+        """
+        Save the model in the custom CCM schema, which :meth:`load_from_json_schema` reads back. Uses orjson when
+        it is installed.
+
+        :param path: Path of the file, compressed for ``.gz`` and ``.zst`` paths.
+        :param chunk_size: Number of records converted at a time.
+        """
+        from src.writers.custom_schema_writer import save_custom_schema
+        save_custom_schema(self, path, chunk_size)
+
+    def write_ocel2(self, path: str, **kwargs) -> None:
+        """
+        Write the model as OCEL 2.0 JSON, XML or SQLite, streaming from its tables instead of building the
+        document in memory. Unlike :meth:`save_ocel`, the ``ocel:attr:`` attributes are kept.
+
+        :param path: Path of the file, e.g. ``log.json``, ``log.xml.gz`` or ``log.sqlite``.
+        :param kwargs: Format, compression and chunking, see :func:`src.writers.ocel2_writer.write_ocel2`.
+        """
+        from src.writers.ocel2_writer import write_ocel2
+        write_ocel2(self, path, **kwargs)
+
+    def save_ocel(self, path: str, link_objects: bool = True) -> None:
+        """
+        Save the OCEL object to a file.
+
+        :param path: Path of the file. The extension determines the format.
+        :param link_objects: Whether to export event-event relationships as linking objects, as the pm4py
+            exporters do not write the E2E table.
+        """
         import pm4py
-        pm4py.write_ocel(self.ocel, path)
+        pm4py.write_ocel(self.get_ocel(link_objects), path)
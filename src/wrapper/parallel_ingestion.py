@@ -0,0 +1,206 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Any, Optional, Literal, Callable, Iterable, Iterator, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+from src.types_defintion.batch_definition import EventBatch, ObjectBatch, RelationshipBatch
+from src.wrapper.ocel_wrapper import COREMetamodel
+
+IdCollisionStrategy = Literal["rename", "keep_first", "error"]
+
+
+class PartialLog:
+    """
+    Columnar result of parsing one source, e.g. one log file.
+
+    Partial logs consist of batches only, so they are cheap to send from a worker process to the merging process.
+    """
+
+    def __init__(
+            self,
+            objects: Optional[ObjectBatch] = None,
+            events: Optional[EventBatch] = None,
+            relationships: Optional[RelationshipBatch] = None,
+            source: str = ""
+    ) -> None:
+        """
+        Initializes a partial log.
+
+        :param objects: Objects of the source.
+        :param events: Events of the source.
+        :param relationships: Relationships of the source, in any mix of classes.
+        :param source: Name of the source, used in error messages.
+        """
+        self.objects: ObjectBatch = objects if objects is not None else ObjectBatch()
+        self.events: EventBatch = events if events is not None else EventBatch()
+        self.relationships: RelationshipBatch = relationships if relationships is not None else RelationshipBatch()
+        self.source: str = source
+
+
+PartialParser = Callable[[Any], PartialLog]
+
+
+def _event_id_array(events: EventBatch) -> np.ndarray:
+    return np.asarray(events.field("event_id").to_array(), dtype=object)
+
+
+def rename_event_ids(relationships: RelationshipBatch, renames: pd.Series) -> None:
+    """
+    Rewrite the event ids referenced by relationships.
+
+    :param relationships: The relationships, rewritten in place.
+    :param renames: New event id by old event id. Ids that are not in the index are kept.
+    """
+    renames = renames[~renames.index.duplicated()]
+    classes = np.asarray(relationships.field("relationship_class").to_array(), dtype=object)
+    sources = pd.Series(relationships.field("source_id").to_array(), dtype=object)
+    targets = pd.Series(relationships.field("target_id").to_array(), dtype=object)
+    # Sources are events for every class but object-object, targets only for event-event
+    sources = sources.where(classes == "object_object", sources.map(renames).fillna(sources))
+    targets = targets.where(classes != "event_event", targets.map(renames).fillna(targets))
+    relationships.table.set_column("source_id", sources.to_numpy())
+    relationships.table.set_column("target_id", targets.to_numpy())
+
+
+def _resolve_id_collisions(
+        partial: PartialLog,
+        index: int,
+        seen_event_ids: Set[str],
+        strategy: IdCollisionStrategy
+) -> PartialLog:
+    """
+    Make the event ids of a partial log unique with respect to the event ids of the partial logs merged before.
+
+    With ``rename`` colliding events get the suffix ``#<index>`` and the relationships of the partial log are
+    rewritten to the new ids. With ``keep_first`` colliding events are dropped, so that relationships refer to
+    the event merged first. With ``error`` a ValueError is raised.
+
+    :param partial: The partial log.
+    :param index: Position of the partial log in the merge.
+    :param seen_event_ids: Event ids merged so far. The ids of this partial log are added.
+    :param strategy: How to handle colliding event ids.
+    :return: The partial log with unique event ids.
+    """
+    event_ids = _event_id_array(partial.events)
+    colliding = np.fromiter((event_id in seen_event_ids for event_id in event_ids), dtype=bool,
+                            count=len(event_ids))
+
+    if colliding.any():
+        if strategy == "error":
+            raise ValueError(f"Event ids of {partial.source or f'partial log {index}'} collide with earlier logs, "
+                             f"e.g. {event_ids[colliding][0]}.")
+        if strategy == "keep_first":
+            partial.events.table = partial.events.table.take(np.flatnonzero(~colliding))
+            event_ids = event_ids[~colliding]
+        else:
+            renames = pd.Series(event_ids[colliding] + f"#{index}", index=event_ids[colliding])
+            event_ids = np.where(colliding, event_ids + f"#{index}", event_ids)
+            partial.events.table.set_column("event_id", event_ids)
+            rename_event_ids(partial.relationships, renames)
+
+    seen_event_ids.update(event_ids.tolist())
+    return partial
+
+
+def concatenate_partials(partials: Iterable[PartialLog]) -> PartialLog:
+    """
+    Concatenate partial logs column-wise into one, without handling colliding ids.
+
+    :param partials: The partial logs.
+    :return: A partial log holding the rows of all partial logs in the order given.
+    """
+    merged = PartialLog()
+    for partial in partials:
+        merged.objects.table.extend_table(partial.objects.table)
+        merged.events.table.extend_table(partial.events.table)
+        merged.relationships.table.extend_table(partial.relationships.table)
+    return merged
+
+
+def merge_partials(
+        partials: Iterable[PartialLog],
+        model: Optional[COREMetamodel] = None,
+        order_by_timestamp: bool = False,
+        id_collisions: IdCollisionStrategy = "rename"
+) -> COREMetamodel:
+    """
+    Merge partial logs into one model.
+
+    Objects with the same id are merged by the object registry of the model. Colliding event ids are handled
+    according to ``id_collisions``.
+
+    :param partials: The partial logs, merged in the order given.
+    :param model: Model to merge into. A new one by default.
+    :param order_by_timestamp: Whether to add the events of all partial logs ordered by timestamp, instead of
+        partial log by partial log. Requires holding all partial logs in memory until the merge.
+    :param id_collisions: How to handle event ids that occur in several partial logs.
+    :return: The model.
+    """
+    model = model if model is not None else COREMetamodel()
+    seen_event_ids: Set[str] = set()
+
+    if not order_by_timestamp:
+        for index, partial in enumerate(partials):
+            partial = _resolve_id_collisions(partial, index, seen_event_ids, id_collisions)
+            model.append_batch(objects=partial.objects, events=partial.events, relationships=partial.relationships)
+        return model
+
+    partials = [
+        _resolve_id_collisions(partial, index, seen_event_ids, id_collisions)
+        for index, partial in enumerate(partials)
+    ]
+    merged = concatenate_partials(partials)
+    events = merged.events
+
+    # A stable sort of the concatenated timestamps is the k-way merge of the partial logs: events with equal
+    # timestamps keep the order of their partial log and of the partial logs among each other
+    timestamps = pd.DatetimeIndex(pd.to_datetime(events.field("timestamp").to_array(), utc=True)).asi8
+    events.table = events.table.take(np.argsort(timestamps, kind="stable"))
+
+    return model.append_batch(objects=merged.objects, events=events, relationships=merged.relationships)
+
+
+def _parse_chunk(parse: PartialParser, sources: Sequence[Any]) -> List[PartialLog]:
+    """Parse several sources in one worker task."""
+    return [parse(source) for source in sources]
+
+
+def ingest_parallel(
+        sources: Sequence[Any],
+        parse: PartialParser,
+        workers: Optional[int] = None,
+        chunk_size: int = 1,
+        order_by_timestamp: bool = False,
+        id_collisions: IdCollisionStrategy = "rename",
+        model: Optional[COREMetamodel] = None
+) -> COREMetamodel:
+    """
+    Parse sources in worker processes and merge the partial logs into one model.
+
+    Every worker task parses ``chunk_size`` sources with ``parse`` into partial logs. The partial logs are merged
+    in the order of the sources as they arrive, see :func:`merge_partials`.
+
+    :param sources: The sources, e.g. file paths.
+    :param parse: Picklable function, i.e. defined at module level, parsing one source into a PartialLog.
+    :param workers: Number of worker processes. Defaults to the number of CPUs; 1 parses in this process.
+    :param chunk_size: Number of sources parsed per worker task. Larger chunks lower the scheduling overhead of
+        many small sources.
+    :param order_by_timestamp: Whether to merge the events of all sources ordered by timestamp.
+    :param id_collisions: How to handle event ids that occur in several sources.
+    :param model: Model to merge into. A new one by default.
+    :return: The model.
+    """
+    chunks = [sources[start:start + chunk_size] for start in range(0, len(sources), chunk_size)]
+
+    def partials(results: Iterable[List[PartialLog]]) -> Iterator[PartialLog]:
+        for chunk in results:
+            yield from chunk
+
+    if workers == 1:
+        return merge_partials(partials(_parse_chunk(parse, chunk) for chunk in chunks), model,
+                              order_by_timestamp, id_collisions)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_parse_chunk, [parse] * len(chunks), chunks)
+        return merge_partials(partials(results), model, order_by_timestamp, id_collisions)
@@ -0,0 +1,178 @@
+import json
+import math
+import os
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from src.wrapper.ocel_wrapper import COREMetamodel, ATTRIBUTE_KEY_PREFIX
+from src.wrapper.time_series_store import TimeSeriesStore
+
+# Version 1 stored object columns of mixed types as strings, which cannot be restored
+FORMAT_VERSION: int = 2
+TABLES: Tuple[str, ...] = ("objects", "events", "relations", "o2o", "e2e")
+
+_MANIFEST: str = "manifest.json"
+_TIME_SERIES_DIRECTORY: str = "time_series"
+# Columns of the events table that are always loaded
+_EVENT_COLUMNS: Tuple[str, ...] = ("ocel:eid", "ocel:activity", "ocel:timestamp", "ocel:event_type",
+                                   "ocel:event_class")
+# Inferred types of object columns that Arrow stores as one column type without changing their values
+_ARROW_TYPES: Tuple[str, ...] = ("string", "integer", "floating", "boolean", "datetime", "date", "bytes", "empty")
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Please install pyarrow using 'pip install pyarrow' to use the Parquet storage")
+    return pyarrow
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and math.isnan(value))
+
+
+def _json_array(values: pd.Series, column: str) -> Any:
+    """Encode the values of a column as JSON strings, keeping missing values as nulls."""
+    pa = _import_pyarrow()
+    encoded: List[Optional[str]] = []
+    for value in values.tolist():
+        if _is_missing(value):
+            encoded.append(None)
+            continue
+        try:
+            encoded.append(json.dumps(value))
+        except (TypeError, ValueError):
+            raise TypeError(f"Column {column} mixes types and holds {value!r} of type {type(value).__name__}, "
+                            f"which cannot be stored losslessly.")
+    return pa.array(encoded, type=pa.string())
+
+
+def _to_arrow(frame: pd.DataFrame) -> Tuple[Any, List[str]]:
+    """
+    Convert a table to Arrow. Object columns that Arrow cannot store without changing their values, e.g.
+    strings mixed with numbers, or dicts, which Arrow pads to a common struct, are stored as JSON strings.
+
+    :return: The Arrow table and the names of the columns stored as JSON.
+    """
+    pa = _import_pyarrow()
+    json_columns: List[str] = []
+    arrays = []
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in _ARROW_TYPES:
+            json_columns.append(column)
+            arrays.append(_json_array(values, column))
+            continue
+        try:
+            arrays.append(pa.array(values, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            json_columns.append(column)
+            arrays.append(_json_array(values, column))
+    return pa.Table.from_arrays(arrays, names=list(frame.columns)), json_columns
+
+
+def _from_json(frame: pd.DataFrame, columns: Sequence[str]) -> None:
+    """Decode the columns of a table that were stored as JSON strings, in place."""
+    for column in columns:
+        if column in frame:
+            frame[column] = pd.Series([None if value is None else json.loads(value) for value in frame[column]],
+                                      index=frame.index, dtype=object)
+
+
+def save_parquet(model: COREMetamodel, directory: str, row_group_size: int = 100_000) -> None:
+    """
+    Save the objects, events, relations, O2O and E2E tables of a model as one Parquet file each.
+
+    Categorical columns are stored dictionary-encoded and timestamps as UTC timestamps, so the tables are read
+    back with their dtypes. Object columns mixing types, or holding lists or dicts, are stored as JSON and
+    decoded on load. Parquet keeps min/max statistics per row group, which lets :func:`load_parquet`
+    skip row groups outside a time range or event class. The time series store of the model is saved along
+    with :meth:`TimeSeriesStore.save`.
+
+    :param model: The model.
+    :param directory: Target directory, created if missing.
+    :param row_group_size: Number of rows per row group.
+    """
+    pa = _import_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    manifest: Dict[str, Any] = {"version": FORMAT_VERSION, "json": {}}
+
+    for name, frame in model.get_tables().items():
+        table, json_columns = _to_arrow(frame)
+        pa.parquet.write_table(table, os.path.join(directory, f"{name}.parquet"), row_group_size=row_group_size)
+        manifest["json"][name] = json_columns
+
+    if len(model.time_series):
+        model.time_series.save(os.path.join(directory, _TIME_SERIES_DIRECTORY))
+    with open(os.path.join(directory, _MANIFEST), "w") as file:
+        json.dump(manifest, file)
+
+
+def load_parquet(
+        directory: str,
+        attributes: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        event_classes: Optional[Sequence[str]] = None,
+        time_series: bool = True
+) -> COREMetamodel:
+    """
+    Load a model saved with :func:`save_parquet`, optionally only some event attributes and events.
+
+    Filters are pushed down to the Parquet reader, which skips row groups whose statistics rule them out and
+    never materializes the filtered rows. Relations are reduced to the loaded events; objects and O2O relations
+    are always loaded in full.
+
+    :param directory: Directory of the model.
+    :param attributes: Event attributes to load, without the ``ocel:attr:`` prefix. All by default.
+    :param start: Load only events at or after this time. Naive values are UTC.
+    :param end: Load only events before this time. Naive values are UTC.
+    :param event_classes: Load only events of these classes, e.g. ``["process_event"]``.
+    :param time_series: Whether to load the time series store, memory-mapped. It is not filtered.
+    :return: The model.
+    """
+    pa = _import_pyarrow()
+    with open(os.path.join(directory, _MANIFEST)) as file:
+        manifest = json.load(file)
+    if manifest["version"] > FORMAT_VERSION:
+        raise ValueError(f"Unsupported Parquet storage version {manifest['version']}.")
+
+    filters = []
+    for operator, bound in ((">=", start), ("<", end)):
+        if bound is not None:
+            bound = pd.Timestamp(bound)
+            filters.append(("ocel:timestamp", operator,
+                            bound.tz_localize("UTC") if bound.tzinfo is None else bound.tz_convert("UTC")))
+    if event_classes is not None:
+        filters.append(("ocel:event_class", "in", list(event_classes)))
+
+    columns = None
+    if attributes is not None:
+        columns = list(_EVENT_COLUMNS) + [ATTRIBUTE_KEY_PREFIX + name for name in attributes]
+
+    tables: Dict[str, pd.DataFrame] = {}
+    for name in TABLES:
+        path = os.path.join(directory, f"{name}.parquet")
+        if name == "events":
+            table = pa.parquet.read_table(path, columns=columns, filters=filters or None)
+        else:
+            table = pa.parquet.read_table(path)
+        # Int columns with nulls were object columns of exact ints, keep them instead of rounding to float
+        tables[name] = table.to_pandas(integer_object_nulls=True)
+        _from_json(tables[name], manifest.get("json", {}).get(name, []))
+
+    if filters:
+        event_ids = tables["events"]["ocel:eid"]
+        relations, e2e = tables["relations"], tables["e2e"]
+        tables["relations"] = relations[relations["ocel:eid"].isin(event_ids)]
+        tables["e2e"] = e2e[e2e["ocel:eid"].isin(event_ids) & e2e["ocel:eid_2"].isin(event_ids)]
+
+    store = None
+    store_directory = os.path.join(directory, _TIME_SERIES_DIRECTORY)
+    if time_series and os.path.isdir(store_directory):
+        store = TimeSeriesStore.load(store_directory, mmap=True)
+    return COREMetamodel.from_tables(tables, time_series=store)
@@ -0,0 +1,278 @@
+import math
+from typing import Dict, Any, Optional, Literal, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.types_defintion.batch_definition import ATTRIBUTE_PREFIX, RELATIONSHIP_FIELDS
+from src.wrapper.parallel_ingestion import PartialLog, rename_event_ids
+
+CompressionMethod = Literal["change", "deadband", "swinging_door"]
+
+# Attributes recording what a retained observation stands for
+SPAN_END_ATTRIBUTE: str = "span_end"
+SPAN_SAMPLES_ATTRIBUTE: str = "span_samples"
+MAX_ERROR_ATTRIBUTE: str = "max_error"
+
+
+class CompressedSeries:
+    """
+    Result of compressing the series of one sensor.
+
+    Every retained sample stands for itself and the dropped samples up to the next retained one, its span.
+    """
+
+    def __init__(self, keep: np.ndarray, span_end: np.ndarray, span_samples: np.ndarray,
+                 max_error: np.ndarray) -> None:
+        """
+        :param keep: Whether each sample is retained.
+        :param span_end: Timestamp in nanoseconds of the last sample of the span of each retained sample.
+        :param span_samples: Number of samples in the span of each retained sample, including itself.
+        :param max_error: Largest absolute difference between a sample of the span and its reconstruction from
+            the retained samples. 0 for non-numeric series.
+        """
+        self.keep: np.ndarray = keep
+        self.span_end: np.ndarray = span_end
+        self.span_samples: np.ndarray = span_samples
+        self.max_error: np.ndarray = max_error
+
+    def __len__(self) -> int:
+        return int(self.keep.sum())
+
+
+def _summarize(timestamps: np.ndarray, values: np.ndarray, keep: np.ndarray,
+               reconstruction: Optional[np.ndarray]) -> CompressedSeries:
+    """Compute the spans of the retained samples and the error of the reconstruction within each span."""
+    starts = np.flatnonzero(keep)
+    ends = np.append(starts[1:], len(keep))
+    if reconstruction is None:
+        max_error = np.zeros(len(starts))
+    else:
+        max_error = np.maximum.reduceat(np.abs(values - reconstruction), starts)
+    return CompressedSeries(keep, timestamps[ends - 1], ends - starts, max_error)
+
+
+def _step_reconstruction(values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    """Reconstruct a series by holding every retained value until the next one."""
+    return values[np.flatnonzero(keep)][np.cumsum(keep) - 1]
+
+
+def change_only(timestamps: np.ndarray, values: np.ndarray) -> CompressedSeries:
+    """
+    Retain the samples whose value differs from the previous sample. Works for values of any type.
+
+    :param timestamps: Timestamps in nanoseconds, in ascending order.
+    :param values: Values of the samples.
+    :return: The compressed series. Holding every retained value reconstructs the series exactly.
+    """
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return _summarize(timestamps, values, keep, None)
+
+
+def deadband(timestamps: np.ndarray, values: np.ndarray, tolerance: float) -> CompressedSeries:
+    """
+    Retain a sample when it deviates by more than ``tolerance`` from the last retained sample.
+
+    :param timestamps: Timestamps in nanoseconds, in ascending order.
+    :param values: Numeric values of the samples.
+    :param tolerance: Largest deviation that is not retained.
+    :return: The compressed series. Holding every retained value reconstructs every sample within
+        ``tolerance``.
+    """
+    if tolerance <= 0:
+        keep = np.ones(len(values), dtype=bool)
+        keep[1:] = values[1:] != values[:-1]
+    else:
+        # Whether a sample is retained depends on the last retained one, so this cannot be vectorized
+        keep_list = [False] * len(values)
+        keep_list[0] = True
+        reference = values[0]
+        for index, value in enumerate(values.tolist()):
+            if abs(value - reference) > tolerance:
+                keep_list[index] = True
+                reference = value
+        keep = np.asarray(keep_list, dtype=bool)
+    return _summarize(timestamps, values, keep, _step_reconstruction(values, keep))
+
+
+def swinging_door(timestamps: np.ndarray, values: np.ndarray, tolerance: float) -> CompressedSeries:
+    """
+    Retain the samples needed to reconstruct the series by linear interpolation within ``tolerance``.
+
+    Swinging door compression keeps a corridor of the slopes from the last retained sample that pass every later
+    sample within ``tolerance``. While the slope to the current sample lies in the corridor of the samples before
+    it, the line to the current sample reconstructs all of them. Otherwise the previous sample is retained and a
+    new corridor starts there. The first and the last sample are always retained.
+
+    :param timestamps: Timestamps in nanoseconds, in ascending order.
+    :param values: Numeric values of the samples.
+    :param tolerance: Largest deviation of the interpolation from a sample.
+    :return: The compressed series. Interpolating linearly between the retained samples reconstructs every
+        sample within ``tolerance``.
+    """
+    count = len(values)
+    keep_list = [False] * count
+    keep_list[0] = keep_list[-1] = True
+    seconds = ((timestamps - timestamps[0]) / 1e9).tolist()
+    samples = values.tolist()
+
+    archive_time, archive_value = seconds[0], samples[0]
+    upper, lower = math.inf, -math.inf
+    for index in range(1, count):
+        time, value = seconds[index], samples[index]
+        elapsed = time - archive_time
+        if elapsed > 0 and not lower <= (value - archive_value) / elapsed <= upper:
+            keep_list[index - 1] = True
+            archive_time, archive_value = seconds[index - 1], samples[index - 1]
+            upper, lower = math.inf, -math.inf
+            elapsed = time - archive_time
+        if elapsed <= 0:
+            # Samples at the time of the retained one cannot be interpolated, retain them as well
+            keep_list[index] = True
+            archive_time, archive_value = time, value
+            upper, lower = math.inf, -math.inf
+            continue
+        upper = min(upper, (value + tolerance - archive_value) / elapsed)
+        lower = max(lower, (value - tolerance - archive_value) / elapsed)
+
+    keep = np.asarray(keep_list, dtype=bool)
+    retained = np.flatnonzero(keep)
+    reconstruction = np.interp(timestamps.astype(np.float64), timestamps[retained].astype(np.float64),
+                               values[retained])
+    # Samples sharing a timestamp are retained, interpolation would mix them
+    reconstruction[keep] = values[keep]
+    return _summarize(timestamps, values, keep, reconstruction)
+
+
+class SensorCompressor:
+    """
+    Drops observations that do not change a sensor signal significantly.
+
+    Numeric series are compressed with the configured method and tolerance, which can be set per sensor.
+    Series with non-numeric values, e.g. states, fall back to retaining changes only.
+    """
+
+    def __init__(
+            self,
+            method: CompressionMethod = "deadband",
+            tolerance: float = 0.0,
+            tolerances: Optional[Dict[Any, float]] = None
+    ) -> None:
+        """
+        Initializes the compressor.
+
+        :param method: ``change`` retains changed values, ``deadband`` values deviating by more than the
+            tolerance from the last retained one and ``swinging_door`` the samples needed for a linear
+            interpolation within the tolerance.
+        :param tolerance: Tolerance of sensors without an entry in ``tolerances``, in the unit of the values.
+        :param tolerances: Tolerance by sensor.
+        """
+        if method not in ("change", "deadband", "swinging_door"):
+            raise ValueError(f"Unknown compression method: {method}")
+        if tolerance < 0 or any(value < 0 for value in (tolerances or {}).values()):
+            raise ValueError("Compression tolerances must not be negative.")
+
+        self.method: CompressionMethod = method
+        self.tolerance: float = tolerance
+        self.tolerances: Dict[Any, float] = tolerances or {}
+
+    def compress(self, sensor: Any, timestamps: np.ndarray, values: np.ndarray) -> CompressedSeries:
+        """
+        Compress the series of one sensor.
+
+        :param sensor: The sensor, used to look up its tolerance.
+        :param timestamps: Timestamps in nanoseconds, in ascending order.
+        :param values: Values of the samples, without missing values.
+        :return: The compressed series.
+        """
+        if values.dtype.kind not in "fiu":
+            numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+            if np.isnan(numbers).any():
+                return change_only(timestamps, values)
+            values = numbers
+        values = values.astype(np.float64)
+
+        if self.method == "change":
+            return change_only(timestamps, values)
+        tolerance = self.tolerances.get(sensor, self.tolerance)
+        if self.method == "deadband":
+            return deadband(timestamps, values, tolerance)
+        return swinging_door(timestamps, values, tolerance)
+
+
+def compress_observations(
+        partial: PartialLog,
+        compressor: SensorCompressor,
+        sensor_attributes: Sequence[str],
+        value_attribute: str = "value"
+) -> PartialLog:
+    """
+    Compress the observations of a partial log sensor by sensor.
+
+    Retained observations get the attributes ``span_end``, ``span_samples`` and ``max_error`` describing the
+    samples they stand for. Relationships of dropped observations are moved to the retained observation whose
+    span covers them; relationships that become duplicates are dropped.
+
+    Compression starts anew for every partial log, so the first observation of every sensor in a partial log
+    is retained.
+
+    :param partial: The partial log, compressed in place.
+    :param compressor: The compressor.
+    :param sensor_attributes: Attributes identifying the sensor of an observation, e.g. device and property.
+    :param value_attribute: Attribute holding the value of an observation.
+    :return: The partial log.
+    """
+    events = partial.events
+    missing = [name for name in [*sensor_attributes, value_attribute] if name not in events.attribute_names]
+    if missing:
+        raise ValueError(f"The events have no attributes {missing}.")
+
+    classes = np.asarray(events.field("event_class").to_array(), dtype=object)
+    observations = np.flatnonzero(classes == "observation")
+    if not len(observations):
+        return partial
+
+    timestamps = pd.DatetimeIndex(pd.to_datetime(events.field("timestamp").to_array(), utc=True)).asi8
+    values = np.asarray(events.field(ATTRIBUTE_PREFIX + value_attribute).to_array(), dtype=object)
+    sensors = pd.DataFrame({name: np.asarray(events.field(ATTRIBUTE_PREFIX + name).to_array(), dtype=object)[observations]
+                            for name in sensor_attributes})
+
+    keep = np.ones(len(events), dtype=bool)
+    representative = np.arange(len(events))
+    span_end = np.full(len(events), np.iinfo(np.int64).min, dtype=np.int64)
+    span_samples = np.full(len(events), np.nan)
+    max_error = np.full(len(events), np.nan)
+
+    for sensor, positions in sensors.groupby(list(sensor_attributes), sort=False, dropna=False).indices.items():
+        rows = observations[positions]
+        rows = rows[np.argsort(timestamps[rows], kind="stable")]
+        series = compressor.compress(sensor, timestamps[rows], values[rows])
+
+        retained = rows[series.keep]
+        keep[rows] = series.keep
+        representative[rows] = retained[np.cumsum(series.keep) - 1]
+        span_end[retained] = series.span_end
+        span_samples[retained] = series.span_samples
+        max_error[retained] = series.max_error
+
+    table = events.table
+    table.set_column(ATTRIBUTE_PREFIX + SPAN_END_ATTRIBUTE, span_end.view("datetime64[ns]"))
+    table.set_column(ATTRIBUTE_PREFIX + SPAN_SAMPLES_ATTRIBUTE, span_samples)
+    table.set_column(ATTRIBUTE_PREFIX + MAX_ERROR_ATTRIBUTE, max_error)
+
+    if keep.all():
+        return partial
+    event_ids = np.asarray(events.field("event_id").to_array(), dtype=object)
+    dropped = np.flatnonzero(~keep)
+    rename_event_ids(partial.relationships, pd.Series(event_ids[representative[dropped]], index=event_ids[dropped]))
+    events.table = table.take(np.flatnonzero(keep))
+
+    relationships = partial.relationships
+    duplicated = pd.DataFrame({
+        name: np.asarray(relationships.field(name).to_array(), dtype=object)
+        for name in RELATIONSHIP_FIELDS
+    }).duplicated().to_numpy()
+    if duplicated.any():
+        relationships.table = relationships.table.take(np.flatnonzero(~duplicated))
+    return partial
@@ -0,0 +1,192 @@
+from typing import Dict, List, Optional, Iterator, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.types_defintion.batch_definition import EventBatch, RelationshipBatch
+from src.wrapper.parallel_ingestion import PartialLog
+from src.wrapper.sensor_compression import SensorCompressor, SPAN_END_ATTRIBUTE, SPAN_SAMPLES_ATTRIBUTE, \
+    MAX_ERROR_ATTRIBUTE
+
+
+def _constant(value: str, length: int) -> pd.Categorical:
+    """Return a categorical column repeating one value, which batches consume without a Python loop."""
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int64), categories=[value])
+
+
+def _join_ids(prefix: str, names: Sequence[str], name_codes: np.ndarray, row_labels: np.ndarray,
+              rows: np.ndarray) -> np.ndarray:
+    """Build the ids ``<prefix><name>_<row>`` elementwise, formatting every name and row only once."""
+    heads = np.asarray([f"{prefix}{name}_" for name in names], dtype=object)
+    return heads[name_codes] + row_labels[rows]
+
+
+def _frame_timestamps(frame: pd.DataFrame, timestamp_column: Optional[str]) -> pd.DatetimeIndex:
+    """Return the timestamps of the rows of a sensor frame, in UTC."""
+    values = frame[timestamp_column] if timestamp_column is not None else frame.index
+    timestamps = pd.DatetimeIndex(pd.to_datetime(values))
+    return timestamps.tz_localize("UTC") if timestamps.tz is None else timestamps.tz_convert("UTC")
+
+
+def _compress_columns(
+        values: np.ndarray,
+        present: np.ndarray,
+        timestamps: np.ndarray,
+        columns: Sequence[str],
+        compressor: SensorCompressor
+) -> Dict[str, np.ndarray]:
+    """
+    Compress every column of a melted frame. Dropped cells are marked as not present.
+
+    :return: Span attributes of the retained cells, as arrays shaped like ``values``.
+    """
+    spans = {
+        SPAN_END_ATTRIBUTE: np.zeros(values.shape, dtype=np.int64),
+        SPAN_SAMPLES_ATTRIBUTE: np.zeros(values.shape, dtype=np.int64),
+        MAX_ERROR_ATTRIBUTE: np.zeros(values.shape, dtype=np.float64),
+    }
+    # Frames are sorted by time unless the timestamps say otherwise
+    order = np.argsort(timestamps, kind="stable")
+    for position, column in enumerate(columns):
+        rows = order[present[order, position]]
+        if not len(rows):
+            continue
+        series = compressor.compress(column, timestamps[rows], values[rows, position])
+        retained = rows[series.keep]
+        present[rows[~series.keep], position] = False
+        spans[SPAN_END_ATTRIBUTE][retained, position] = series.span_end
+        spans[SPAN_SAMPLES_ATTRIBUTE][retained, position] = series.span_samples
+        spans[MAX_ERROR_ATTRIBUTE][retained, position] = series.max_error
+    return spans
+
+
+def melt_sensor_frame(
+        frame: pd.DataFrame,
+        column_objects: Mapping[str, Sequence[str]],
+        timestamp_column: Optional[str] = None,
+        row_offset: int = 0,
+        observation_prefix: str = "obs_",
+        iot_event_prefix: str = "iot_",
+        partial: Optional[PartialLog] = None,
+        compressor: Optional[SensorCompressor] = None
+) -> PartialLog:
+    """
+    Convert a wide sensor frame into observations, IoT events and their relationships in bulk.
+
+    Every row of the frame is one point in time and every column one sensor. Each non-missing cell becomes an
+    observation whose type is its column and whose ``value`` attribute is the cell. The cells of one object in one
+    row form one IoT event, which is derived from those observations (event-event, ``derived_from``) and related
+    to the object (event-object, ``observed_by``). Rows in which all columns of an object are missing produce no
+    IoT event for it.
+
+    The frame is melted with NumPy operations on whole columns, so the cost per cell is a few array operations
+    instead of a Python loop iteration.
+
+    :param frame: The wide frame, indexed by time or with a ``timestamp_column``.
+    :param column_objects: Columns of every object, e.g. ``{"R01": ["I_R01_Gripper_Pot", ...]}``.
+    :param timestamp_column: Column holding the timestamps. The index of the frame by default.
+    :param row_offset: Number added to the row positions in the event ids, to keep ids of chunks unique.
+    :param observation_prefix: Prefix of the observation ids ``<prefix><column>_<row>``.
+    :param iot_event_prefix: Prefix of the IoT event ids ``<prefix><object>_<row>``.
+    :param partial: Partial log the entities are appended to. A new one by default.
+    :param compressor: If given, every column is compressed before it is melted, keeping only the observations
+        that change the signal significantly. Retained observations get the span attributes described in
+        :func:`compress_observations`.
+    :return: The partial log.
+    """
+    partial = partial if partial is not None else PartialLog()
+
+    object_ids: List[str] = list(column_objects.keys())
+    columns: List[str] = [column for object_id in object_ids for column in column_objects[object_id]]
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise KeyError(f"Columns {missing} of the column mapping are not in the frame.")
+    if not columns or frame.empty:
+        return partial
+
+    # Position of the object of every column. The columns of an object are adjacent
+    column_object = np.repeat(np.arange(len(object_ids)), [len(column_objects[o]) for o in object_ids])
+    timestamps = _frame_timestamps(frame, timestamp_column).as_unit("ns").asi8
+
+    # Numeric sensors are melted into a float buffer, anything else falls back to Python objects
+    numeric = all(dtype.kind in "fiu" for dtype in frame[columns].dtypes)
+    values = frame[columns].to_numpy(dtype=np.float64 if numeric else object)
+    present = pd.notna(values)
+    if compressor is not None:
+        spans = _compress_columns(values, present, timestamps, columns, compressor)
+    rows, cells = np.nonzero(present)
+    if not len(rows):
+        return partial
+    cell_values = values[rows, cells]
+    attributes = {"value": cell_values}
+    if compressor is not None:
+        attributes.update({name: span[rows, cells] for name, span in spans.items()})
+        attributes[SPAN_END_ATTRIBUTE] = attributes[SPAN_END_ATTRIBUTE].view("datetime64[ns]")
+    column_codes, column_names = pd.factorize(np.asarray(columns, dtype=object))
+
+    # Cells are in row-major order, so the cells of one object in one row are adjacent: every change of the
+    # (row, object) pair starts a new IoT event
+    group_keys = rows * len(object_ids) + column_object[cells]
+    starts = np.flatnonzero(np.diff(group_keys, prepend=-1))
+    iot_index = np.cumsum(np.diff(group_keys, prepend=-1) != 0) - 1
+
+    row_labels = np.arange(row_offset, row_offset + len(frame)).astype(str).astype(object)
+    observation_ids = _join_ids(observation_prefix, column_names, column_codes[cells], row_labels, rows)
+    iot_rows = rows[starts]
+    iot_object_codes = column_object[cells[starts]]
+    iot_objects = np.asarray(object_ids, dtype=object)[iot_object_codes]
+    iot_event_ids = _join_ids(iot_event_prefix, object_ids, iot_object_codes, row_labels, iot_rows)
+
+    events: EventBatch = partial.events
+    events.extend(
+        iot_event_ids.tolist(),
+        _constant("iot_event", len(starts)),
+        pd.Categorical.from_codes(iot_object_codes, categories=object_ids),
+        timestamps[iot_rows].view("datetime64[ns]")
+    )
+    events.extend(
+        observation_ids.tolist(),
+        _constant("observation", len(rows)),
+        pd.Categorical.from_codes(column_codes[cells], categories=column_names),
+        timestamps[rows].view("datetime64[ns]"),
+        attributes=attributes
+    )
+
+    relationships: RelationshipBatch = partial.relationships
+    relationships.extend(
+        _constant("event_event", len(rows)),
+        iot_event_ids[iot_index].tolist(),
+        observation_ids.tolist(),
+        _constant("derived_from", len(rows))
+    )
+    relationships.extend(
+        _constant("event_object", len(starts)),
+        iot_event_ids.tolist(),
+        iot_objects.tolist(),
+        _constant("observed_by", len(starts))
+    )
+    return partial
+
+
+def iter_sensor_frame_chunks(
+        frame: pd.DataFrame,
+        column_objects: Mapping[str, Sequence[str]],
+        chunk_rows: int = 100_000,
+        timestamp_column: Optional[str] = None,
+        **kwargs
+) -> Iterator[PartialLog]:
+    """
+    Melt a wide sensor frame chunk by chunk, bounding the memory of the long format by ``chunk_rows`` rows.
+
+    A compressor passed on to :func:`melt_sensor_frame` starts anew in every chunk.
+
+    :param frame: The wide frame, see :func:`melt_sensor_frame`.
+    :param column_objects: Columns of every object.
+    :param chunk_rows: Number of rows melted at once.
+    :param timestamp_column: Column holding the timestamps. The index of the frame by default.
+    :param kwargs: Further arguments of :func:`melt_sensor_frame`.
+    :return: Iterator over one partial log per chunk, with event ids unique across chunks.
+    """
+    for start in range(0, len(frame), chunk_rows):
+        yield melt_sensor_frame(frame.iloc[start:start + chunk_rows], column_objects, timestamp_column,
+                                row_offset=start, **kwargs)
@@ -0,0 +1,418 @@
+import json
+import os
+from array import array
+from datetime import timedelta
+from typing import Dict, List, Any, Optional, Literal, Sequence, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.table_buffer import to_epoch_ns
+
+Aggregation = Literal["mean", "min", "max", "first", "last", "count"]
+
+_MANIFEST: str = "manifest.json"
+
+
+def _epoch_ns_array(timestamps: Any) -> np.ndarray:
+    """Convert timestamps of any array-like to UTC nanoseconds since the epoch. Naive values are taken as UTC."""
+    if isinstance(timestamps, np.ndarray) and timestamps.dtype == np.int64:
+        return timestamps
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True))
+    return index.as_unit("ns").asi8
+
+
+def _dictionary_key(value: Any) -> Tuple[type, Any]:
+    """
+    Key of a value in the dictionary. Values are only shared if JSON restores them identically: ``True``, ``1``
+    and ``1.0`` are equal in Python but get their own entries, and floats are told apart by their bits, so
+    ``-0.0`` is kept and NaNs are shared.
+    """
+    if isinstance(value, float):
+        return float, value.hex()
+    if isinstance(value, (list, dict)):
+        _check_json(value)
+        return type(value), json.dumps(value)
+    return type(value), value
+
+
+def _check_json(value: Any) -> None:
+    """Reject values that JSON does not restore as they are, e.g. timestamps, tuples or non-string keys."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return
+    if isinstance(value, list):
+        for item in value:
+            _check_json(item)
+        return
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Cannot dictionary-encode a mapping with the key {key!r}, keys must be strings.")
+            _check_json(item)
+        return
+    raise TypeError(f"Cannot dictionary-encode {value!r} of type {type(value).__name__}, only JSON values are "
+                    f"stored losslessly.")
+
+
+def dictionary_encode(values: np.ndarray) -> Tuple[np.ndarray, List[Any]]:
+    """
+    Dictionary-encode values of any JSON type, e.g. states or identifiers. Values are restored with their type.
+
+    :param values: The values.
+    :return: The codes of the values as int64 and the list of distinct values, which can be stored as JSON.
+    :raises TypeError: If a value is not a JSON value.
+    """
+    codes: Dict[Tuple[type, Any], int] = {}
+    dictionary: List[Any] = []
+    indices = np.empty(len(values), dtype=np.int64)
+    for position, value in enumerate(values.tolist()):
+        if isinstance(value, np.generic):
+            value = value.item()
+        key = _dictionary_key(value)
+        code = codes.get(key)
+        if code is None:
+            _check_json(value)
+            code = codes[key] = len(dictionary)
+            dictionary.append(value)
+        indices[position] = code
+    return indices, dictionary
+
+
+def dictionary_decode(codes: np.ndarray, dictionary: List[Any]) -> np.ndarray:
+    """Invert :func:`dictionary_encode`."""
+    # Filled one by one, as NumPy would turn list entries into a further dimension
+    values = np.empty(len(dictionary), dtype=object)
+    for code, value in enumerate(dictionary):
+        values[code] = value
+    return values[np.asarray(codes, dtype=np.int64)]
+
+
+class TimeSeries:
+    """
+    Timestamps and values of one sensor in contiguous arrays.
+
+    Numeric values are kept as float64, anything else as Python objects. Appended points are buffered and merged
+    into one array on the next read, so reads return contiguous arrays that may be memory-mapped.
+    """
+
+    def __init__(
+            self,
+            object_id: str,
+            timestamps: Optional[np.ndarray] = None,
+            values: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        :param object_id: Id of the sensor or device object that made the observations.
+        :param timestamps: Initial timestamps in UTC nanoseconds, e.g. memory-mapped from a file.
+        :param values: Initial values, aligned with ``timestamps``.
+        """
+        self.object_id: str = object_id
+        self._timestamps: np.ndarray = timestamps if timestamps is not None else np.empty(0, dtype=np.int64)
+        self._values: np.ndarray = values if values is not None else np.empty(0, dtype=np.float64)
+        self.numeric: bool = self._values.dtype.kind in "fiu"
+        self._pending_timestamps: array = array("q")
+        self._pending_values: Any = array("d") if self.numeric else []
+
+    def __len__(self) -> int:
+        return len(self._timestamps) + len(self._pending_timestamps)
+
+    def _degrade(self) -> None:
+        """Switch to object values after a non-numeric value arrived."""
+        self._values = self._values.astype(object)
+        self._pending_values = list(self._pending_values)
+        self.numeric = False
+
+    def append(self, timestamp: Any, value: Any) -> None:
+        """
+        Append one point.
+
+        :param timestamp: Timestamp as datetime, pandas Timestamp or ISO string. Naive values are UTC.
+        :param value: The value.
+        """
+        nanoseconds = to_epoch_ns(timestamp)
+        if nanoseconds is None:
+            raise ValueError(f"Invalid timestamp: {timestamp!r}")
+        if self.numeric and (isinstance(value, bool) or not isinstance(value, (int, float, np.number))):
+            self._degrade()
+        self._pending_timestamps.append(nanoseconds)
+        self._pending_values.append(value)
+
+    def extend(self, timestamps: Any, values: Sequence[Any]) -> None:
+        """
+        Append many points at once.
+
+        :param timestamps: Timestamps as UTC nanoseconds, a ``datetime64`` array or any values pandas parses.
+        :param values: The values, aligned with ``timestamps``.
+        """
+        timestamps = _epoch_ns_array(timestamps)
+        values = np.asarray(values)
+        if len(timestamps) != len(values):
+            raise ValueError(f"Got {len(timestamps)} timestamps but {len(values)} values.")
+        self._consolidate()
+        if self.numeric and values.dtype.kind not in "fiu":
+            self._degrade()
+        self._timestamps = np.concatenate([self._timestamps, timestamps])
+        self._values = np.concatenate([self._values, values.astype(np.float64 if self.numeric else object)])
+
+    def _consolidate(self) -> None:
+        """Merge the buffered points into the arrays."""
+        if not len(self._pending_timestamps):
+            return
+        pending_values = np.frombuffer(self._pending_values, dtype=np.float64) if self.numeric \
+            else np.asarray(self._pending_values + [None], dtype=object)[:-1]
+        self._timestamps = np.concatenate([self._timestamps, np.frombuffer(self._pending_timestamps, dtype=np.int64)])
+        self._values = np.concatenate([self._values, pending_values])
+        self._pending_timestamps = array("q")
+        self._pending_values = array("d") if self.numeric else []
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Timestamps in UTC nanoseconds since the epoch."""
+        self._consolidate()
+        return self._timestamps
+
+    @property
+    def values(self) -> np.ndarray:
+        """Values as float64 array for numeric series, else as object array."""
+        self._consolidate()
+        return self._values
+
+    def to_series(self) -> pd.Series:
+        """Return the values as a pandas Series indexed by UTC timestamps."""
+        index = pd.DatetimeIndex(self.timestamps.view("datetime64[ns]")).tz_localize("UTC")
+        return pd.Series(self.values, index=index)
+
+
+class TimeSeriesStore:
+    """
+    Side store of observations, one series per sensor.
+
+    Dense sensor data is kept as one timestamp and one value array per series instead of one event row per
+    observation. A series is keyed by its id, by default the id of the sensor object that made the observations.
+    Devices observing several properties get one series per property and name the device as their object.
+
+    :class:`COREMetamodel` keeps a reference to the store and expands the observations into OCEL event rows only
+    when the OCEL is built, e.g. for an export. The n-th observation of series ``s`` gets the event id
+    ``<observation_prefix><s>_<n>`` and is related to the object of the series with the qualifier ``observed_by``.
+
+    Stores can be saved as one ``.npy`` file per array and loaded memory-mapped, so series larger than the
+    memory can be analysed.
+    """
+
+    def __init__(self, observation_prefix: str = "obs_") -> None:
+        """
+        :param observation_prefix: Prefix of the event ids of the observations.
+        """
+        self.observation_prefix: str = observation_prefix
+        self._series: Dict[str, TimeSeries] = {}
+        # Incremented on every change, so that models rebuild their OCEL
+        self.version: int = 0
+        self._observations: Optional[pd.DataFrame] = None
+        self._observations_version: int = -1
+
+    def __len__(self) -> int:
+        return sum(len(series) for series in self._series.values())
+
+    def __contains__(self, series_id: str) -> bool:
+        return series_id in self._series
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._series)
+
+    @property
+    def series_ids(self) -> List[str]:
+        """Return the series ids in insertion order."""
+        return list(self._series.keys())
+
+    def series(self, series_id: str) -> TimeSeries:
+        """Return a series."""
+        return self._series[series_id]
+
+    def observation_id(self, series_id: str, index: int) -> str:
+        """Return the event id of the ``index``-th observation of a series."""
+        return f"{self.observation_prefix}{series_id}_{index}"
+
+    def _get_or_create(self, series_id: str, object_id: Optional[str]) -> TimeSeries:
+        series = self._series.get(series_id)
+        if series is None:
+            series = self._series[series_id] = TimeSeries(object_id if object_id is not None else series_id)
+        return series
+
+    def append(self, series_id: str, timestamp: Any, value: Any, object_id: Optional[str] = None) -> str:
+        """
+        Append one observation.
+
+        :param series_id: Id of the series.
+        :param timestamp: Timestamp of the observation.
+        :param value: Value of the observation.
+        :param object_id: Sensor or device object of a new series. The series id by default.
+        :return: The event id the observation gets in the OCEL, e.g. to relate other events to it.
+        """
+        series = self._get_or_create(series_id, object_id)
+        series.append(timestamp, value)
+        self.version += 1
+        return self.observation_id(series_id, len(series) - 1)
+
+    def extend(self, series_id: str, timestamps: Any, values: Sequence[Any], object_id: Optional[str] = None) -> None:
+        """
+        Append many observations of one series.
+
+        :param series_id: Id of the series.
+        :param timestamps: Timestamps of the observations.
+        :param values: Values of the observations.
+        :param object_id: Sensor or device object of a new series. The series id by default.
+        """
+        self._get_or_create(series_id, object_id).extend(timestamps, values)
+        self.version += 1
+
+    def statistics(self) -> pd.DataFrame:
+        """
+        Return count, time range and value statistics of every series.
+
+        :return: Frame indexed by series id. Value statistics are missing for non-numeric series and
+            series without values.
+        """
+        rows = []
+        for series_id, series in self._series.items():
+            timestamps, values = series.timestamps, series.values
+            row = {"series_id": series_id, "object_id": series.object_id, "count": len(values),
+                   "start": timestamps.min() if len(values) else None,
+                   "end": timestamps.max() if len(values) else None}
+            if series.numeric and not np.isnan(values).all():
+                row.update(min=np.nanmin(values), max=np.nanmax(values), mean=np.nanmean(values),
+                           std=np.nanstd(values))
+            rows.append(row)
+        frame = pd.DataFrame(rows, columns=["series_id", "object_id", "count", "start", "end", "min", "max", "mean",
+                                            "std"])
+        for column in ("start", "end"):
+            frame[column] = pd.to_datetime(frame[column], unit="ns", utc=True)
+        return frame.set_index("series_id")
+
+    def resample(self, series_id: str, interval: timedelta, how: Aggregation = "mean") -> pd.Series:
+        """
+        Aggregate the observations of a series into fixed intervals, aligned to the epoch.
+
+        :param series_id: Id of the series.
+        :param interval: Length of the intervals.
+        :param how: Aggregation of the values within an interval. Only ``first``, ``last`` and ``count`` are
+            defined for non-numeric series.
+        :return: Series indexed by the start of the intervals that hold observations.
+        """
+        series = self._series[series_id]
+        timestamps, values = series.timestamps, series.values
+        step = interval // timedelta(microseconds=1) * 1_000
+        if step <= 0:
+            raise ValueError(f"The interval has to be positive, got {interval}.")
+        if how not in ("first", "last", "count") and not series.numeric:
+            raise ValueError(f"Cannot aggregate the non-numeric series {series_id} with {how}.")
+
+        order = np.argsort(timestamps, kind="stable")
+        bins = timestamps[order] // step
+        values = values[order]
+        starts = np.flatnonzero(np.diff(bins, prepend=bins[:1] - 1)) if len(bins) else np.empty(0, dtype=np.int64)
+        ends = np.append(starts[1:], len(bins))
+
+        if how == "count":
+            result = ends - starts
+        elif how == "first":
+            result = values[starts]
+        elif how == "last":
+            result = values[ends - 1]
+        elif how == "mean":
+            result = np.add.reduceat(values, starts) / (ends - starts) if len(starts) else values[:0]
+        else:
+            reduce = np.minimum if how == "min" else np.maximum
+            result = reduce.reduceat(values, starts) if len(starts) else values[:0]
+
+        index = pd.DatetimeIndex((bins[starts] * step).view("datetime64[ns]")).tz_localize("UTC")
+        return pd.Series(result, index=index, name=series_id)
+
+    def to_observations(self) -> pd.DataFrame:
+        """
+        Expand the store into one row per observation, cached until the store changes.
+
+        :return: Frame with the columns ``event_id``, ``series_id``, ``object_id``, ``timestamp`` (UTC) and
+            ``value``.
+        """
+        if self._observations is not None and self._observations_version == self.version:
+            return self._observations
+
+        frames = []
+        for series_id, series in self._series.items():
+            count = len(series)
+            if not count:
+                continue
+            labels = np.arange(count).astype(str).astype(object)
+            frames.append(pd.DataFrame({
+                "event_id": (self.observation_prefix + series_id + "_") + labels,
+                "series_id": pd.Categorical.from_codes(np.zeros(count, dtype=np.int64), categories=[series_id]),
+                "object_id": pd.Categorical.from_codes(np.zeros(count, dtype=np.int64),
+                                                       categories=[series.object_id]),
+                "timestamp": series.timestamps,
+                "value": series.values
+            }))
+        if frames:
+            observations = pd.concat(frames, ignore_index=True)
+            for column in ("series_id", "object_id"):
+                observations[column] = observations[column].astype(object)
+        else:
+            observations = pd.DataFrame({"event_id": [], "series_id": [], "object_id": [],
+                                         "timestamp": np.empty(0, np.int64), "value": []})
+        observations["timestamp"] = pd.to_datetime(observations["timestamp"], unit="ns", utc=True)
+
+        self._observations, self._observations_version = observations, self.version
+        return observations
+
+    def save(self, directory: str) -> None:
+        """
+        Save the store as one ``.npy`` file per timestamp and value array plus a manifest. Values of non-numeric
+        series are dictionary-encoded into a code array and a JSON list of the distinct values, so no file needs
+        pickling.
+
+        :param directory: Target directory, created if missing.
+        :raises TypeError: If a value of a non-numeric series is not a JSON value.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = {"observation_prefix": self.observation_prefix, "series": []}
+        for position, (series_id, series) in enumerate(self._series.items()):
+            stem = f"series_{position}"
+            np.save(os.path.join(directory, stem + ".timestamps.npy"), series.timestamps)
+            if series.numeric:
+                np.save(os.path.join(directory, stem + ".values.npy"), series.values)
+            else:
+                codes, dictionary = dictionary_encode(series.values)
+                np.save(os.path.join(directory, stem + ".codes.npy"), codes)
+                with open(os.path.join(directory, stem + ".dictionary.json"), "w") as file:
+                    json.dump(dictionary, file)
+            manifest["series"].append({"series_id": series_id, "object_id": series.object_id, "file": stem,
+                                       "numeric": series.numeric})
+        with open(os.path.join(directory, _MANIFEST), "w") as file:
+            json.dump(manifest, file)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "TimeSeriesStore":
+        """
+        Load a store saved with :meth:`save`.
+
+        :param directory: Directory of the store.
+        :param mmap: Whether to memory-map the numeric arrays instead of reading them. Non-numeric series are always
+            decoded into memory. Appending to a series copies it into memory.
+        :return: The store.
+        """
+        with open(os.path.join(directory, _MANIFEST)) as file:
+            manifest = json.load(file)
+
+        store = cls(observation_prefix=manifest["observation_prefix"])
+        for entry in manifest["series"]:
+            path = os.path.join(directory, entry["file"])
+            mmap_mode = "r" if mmap else None
+            timestamps = np.load(path + ".timestamps.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            if entry["numeric"]:
+                values = np.load(path + ".values.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            else:
+                with open(path + ".dictionary.json") as file:
+                    dictionary = json.load(file)
+                values = dictionary_decode(np.load(path + ".codes.npy", mmap_mode=mmap_mode, allow_pickle=False),
+                                           dictionary)
+            store._series[entry["series_id"]] = TimeSeries(entry["object_id"], timestamps, values)
+        return store
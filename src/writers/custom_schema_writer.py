@@ -0,0 +1,212 @@
+import gzip
+import json
+from typing import Dict, List, Any, Callable, Iterator, Tuple, IO
+
+import pandas as pd
+
+from src.readers.custom_schema_reader import RELATIONSHIP_SECTIONS
+from src.types_defintion.object_definition import ObjectClassEnum
+from src.utils.table_buffer import format_times
+from src.wrapper.ocel_wrapper import COREMetamodel, ATTRIBUTE_KEY_PREFIX
+
+_SEPARATOR: bytes = b",\n    "
+# Column holding the IoT device of every observation while it is written
+_DEVICE_COLUMN: str = "ocel:iot_device_id"
+
+
+def _json_encoder() -> Callable[[Any], bytes]:
+    """Encoder of the records, orjson when it is installed as it is several times faster than the json module."""
+    try:
+        import orjson
+    except ImportError:
+        return lambda value: json.dumps(value, default=str, ensure_ascii=False).encode("utf-8")
+    return lambda value: orjson.dumps(value, default=str)
+
+
+def _open_binary(path: str) -> IO[bytes]:
+    """Open a file for writing, compressed on the fly for ``.gz`` and ``.zst`` paths."""
+    lowered = path.lower()
+    if lowered.endswith(".gz"):
+        return gzip.open(path, "wb")
+    if lowered.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Please install zstandard using 'pip install zstandard' to write zstd compressed files")
+        return zstandard.open(path, "wb")
+    return open(path, "wb")
+
+
+def _attribute_rows(chunk: pd.DataFrame) -> List[Dict[str, Any]]:
+    """The attributes of every row of a chunk, without missing values. Columns are converted once each."""
+    columns = []
+    for column in chunk.columns:
+        if not column.startswith(ATTRIBUTE_KEY_PREFIX):
+            continue
+        series = chunk[column]
+        present = series.notna().to_numpy()
+        if not present.any():
+            continue
+        if isinstance(series.dtype, pd.DatetimeTZDtype) or series.dtype.kind == "M":
+            values = format_times(series).tolist()
+        else:
+            values = series.tolist()
+        columns.append((column[len(ATTRIBUTE_KEY_PREFIX):], present, values))
+    return [{name: values[row] for name, present, values in columns if present[row]} for row in range(len(chunk))]
+
+
+def _class_values(series: pd.Series) -> List[str]:
+    return [value.value if isinstance(value, ObjectClassEnum) else str(value) for value in series.tolist()]
+
+
+class CustomSchemaWriter:
+    """
+    Writes a model in the custom CCM schema (``schemas/json_schema.json``), the counterpart of
+    :class:`src.readers.custom_schema_reader.CustomSchemaImporter`.
+
+    Sections are written one chunk of records at a time. Objects of type ``iot_device`` and
+    ``information_system`` are written as data sources, every other object with its object class so that it
+    is read back with it. Event-object relationships to data sources are written as event-data source
+    relationships. Qualifiers are only written where they differ from the default of their section.
+    """
+
+    def __init__(self, model: COREMetamodel, chunk_size: int = 10_000) -> None:
+        """
+        :param model: The model. Observations of its time series store are written as well.
+        :param chunk_size: Number of records converted at a time.
+        """
+        self.model: COREMetamodel = model
+        self.chunk_size: int = chunk_size
+        self._encode: Callable[[Any], bytes] = _json_encoder()
+
+    def _chunks(self, frame: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        for start in range(0, len(frame), self.chunk_size):
+            yield frame.iloc[start:start + self.chunk_size]
+
+    def _objects(self, objects: pd.DataFrame) -> Iterator[List[Dict[str, Any]]]:
+        for chunk in self._chunks(objects):
+            yield [
+                {"object_id": object_id, "object_type": object_type, "object_class": object_class,
+                 "attributes": attributes}
+                for object_id, object_type, object_class, attributes in zip(
+                    chunk["ocel:oid"].tolist(), chunk["ocel:type"].tolist(),
+                    _class_values(chunk["ocel:object_class"]), _attribute_rows(chunk))
+            ]
+
+    def _data_sources(self, objects: pd.DataFrame, named: bool) -> Iterator[List[Dict[str, Any]]]:
+        for chunk in self._chunks(objects):
+            records = []
+            for object_id, attributes in zip(chunk["ocel:oid"].tolist(), _attribute_rows(chunk)):
+                record: Dict[str, Any] = {"data_source_id": object_id}
+                if named:
+                    record["name"] = str(attributes.pop("name", object_id))
+                if attributes:
+                    record["attributes"] = attributes
+                records.append(record)
+            yield records
+
+    def _events(self, events: pd.DataFrame, label_column: str) -> Iterator[List[Dict[str, Any]]]:
+        for chunk in self._chunks(events):
+            yield [
+                {"event_id": event_id, "timestamp": timestamp, "activity": {"activity_type": label},
+                 "attributes": attributes}
+                for event_id, timestamp, label, attributes in zip(
+                    chunk["ocel:eid"].tolist(), format_times(chunk["ocel:timestamp"]).tolist(),
+                    chunk[label_column].astype(str).tolist(), _attribute_rows(chunk))
+            ]
+
+    def _observations(self, observations: pd.DataFrame) -> Iterator[List[Dict[str, Any]]]:
+        for chunk in self._chunks(observations):
+            records = []
+            for event_id, timestamp, device, attributes in zip(
+                    chunk["ocel:eid"].tolist(), format_times(chunk["ocel:timestamp"]).tolist(),
+                    chunk[_DEVICE_COLUMN].tolist(), _attribute_rows(chunk)):
+                attributes.pop("iot_device_id", None)
+                record: Dict[str, Any] = {"observation_id": event_id, "timestamp": timestamp,
+                                          "iot_device_id": "" if pd.isna(device) else str(device)}
+                if attributes:
+                    record["attributes"] = attributes
+                records.append(record)
+            yield records
+
+    def _relationships(self, frame: pd.DataFrame, section: str, source: str,
+                       target: str) -> Iterator[List[Dict[str, Any]]]:
+        _, source_key, target_key, default_qualifier = RELATIONSHIP_SECTIONS[section]
+        for chunk in self._chunks(frame):
+            records = []
+            for source_id, target_id, qualifier in zip(chunk[source].tolist(), chunk[target].tolist(),
+                                                       chunk["ocel:qualifier"].tolist()):
+                record = {source_key: source_id, target_key: target_id}
+                if isinstance(qualifier, str) and qualifier != default_qualifier:
+                    record["qualifier"] = qualifier
+                records.append(record)
+            yield records
+
+    def _sections(self) -> Iterator[Tuple[str, Iterator[List[Dict[str, Any]]]]]:
+        ocel = self.model.get_ocel()
+        objects, events, relations = ocel.objects, ocel.events, ocel.relations
+        classes = events["ocel:event_class"].astype(str)
+        object_types = objects["ocel:type"].astype(str)
+
+        observations = events[classes == "observation"]
+        # The IoT device of an observation is its attribute, else the first object it is related to
+        device_column = ATTRIBUTE_KEY_PREFIX + "iot_device_id"
+        devices = pd.Series(observations[device_column] if device_column in observations else None,
+                            index=observations.index, dtype=object)
+        first_objects = relations.drop_duplicates("ocel:eid").set_index("ocel:eid")["ocel:oid"]
+        devices = devices.fillna(observations["ocel:eid"].map(first_objects))
+        observations = observations.assign(**{_DEVICE_COLUMN: devices})
+
+        # The relationship of an observation to its device is implied by iot_device_id
+        observed = pd.MultiIndex.from_arrays([observations["ocel:eid"].astype(object), devices.astype(object)])
+        relations = relations[~pd.MultiIndex.from_arrays([relations["ocel:eid"].astype(object),
+                                                          relations["ocel:oid"].astype(object)]).isin(observed)]
+        data_sources = objects["ocel:oid"][[ObjectClassEnum(value).get_category() == "data_source"
+                                            for value in _class_values(objects["ocel:object_class"])]]
+        to_data_source = relations["ocel:oid"].isin(data_sources)
+
+        yield "objects", self._objects(objects[~object_types.isin(["iot_device", "information_system"])])
+        yield "iot_events", self._events(events[classes == "iot_event"], "ocel:event_type")
+        yield "process_events", self._events(events[classes == "process_event"], "ocel:activity")
+        yield "iot_devices", self._data_sources(objects[object_types == "iot_device"], named=False)
+        yield "observations", self._observations(observations)
+        yield "information_systems", self._data_sources(objects[object_types == "information_system"], named=True)
+        yield "object_object_relationships", self._relationships(
+            ocel.o2o, "object_object_relationships", "ocel:oid", "ocel:oid_2")
+        yield "event_object_relationships", self._relationships(
+            relations[~to_data_source], "event_object_relationships", "ocel:eid", "ocel:oid")
+        yield "event_event_relationships", self._relationships(
+            ocel.e2e, "event_event_relationships", "ocel:eid", "ocel:eid_2")
+        yield "event_data_source_relationships", self._relationships(
+            relations[to_data_source], "event_data_source_relationships", "ocel:eid", "ocel:oid")
+
+    def write(self, path: str) -> None:
+        """
+        Write the model.
+
+        :param path: Path of the file, compressed for ``.gz`` and ``.zst`` paths.
+        """
+        with _open_binary(path) as file:
+            file.write(b"{")
+            for position, (section, chunks) in enumerate(self._sections()):
+                file.write(b"%s\n  %s: [" % (b"," if position else b"", self._encode(section)))
+                written = False
+                for records in chunks:
+                    if not records:
+                        continue
+                    file.write(_SEPARATOR if written else b"\n    ")
+                    file.write(_SEPARATOR.join(self._encode(record) for record in records))
+                    written = True
+                file.write(b"\n  ]" if written else b"]")
+            file.write(b"\n}\n")
+
+
+def save_custom_schema(model: COREMetamodel, path: str, chunk_size: int = 10_000) -> None:
+    """
+    Write a model in the custom CCM schema. See :class:`CustomSchemaWriter`.
+
+    :param model: The model.
+    :param path: Path of the file, compressed for ``.gz`` and ``.zst`` paths.
+    :param chunk_size: Number of records converted at a time.
+    """
+    CustomSchemaWriter(model, chunk_size).write(path)
@@ -0,0 +1,524 @@
+import gzip
+import json
+import os
+import re
+import sqlite3
+from typing import Dict, List, Any, Optional, Literal, Tuple, IO, Iterator
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+
+from src.utils.table_buffer import format_times
+from src.wrapper.ocel_wrapper import COREMetamodel, ATTRIBUTE_KEY_PREFIX
+
+OcelFormat = Literal["json", "xml", "sqlite"]
+Compression = Literal["gzip", "zstd"]
+
+_FORMATS: Dict[str, OcelFormat] = {
+    ".json": "json", ".jsonocel": "json",
+    ".xml": "xml", ".xmlocel": "xml",
+    ".sqlite": "sqlite", ".db": "sqlite"
+}
+_COMPRESSIONS: Dict[str, Compression] = {".gz": "gzip", ".zst": "zstd"}
+# Object attributes in OCEL 2.0 carry the time they were set. Attributes of the objects table hold from the start
+_INITIAL_TIME: str = "1970-01-01T00:00:00Z"
+# OCEL 2.0 types of the value types pandas infers for object columns, any other column is written as strings
+_INFERRED_TYPES: Dict[str, str] = {
+    "integer": "integer",
+    "floating": "float",
+    "mixed-integer-float": "float",
+    "boolean": "boolean",
+    "datetime": "time",
+    "datetime64": "time"
+}
+
+# Attribute name, attribute type, and per row a flag whether the value is present plus the value
+_Column = Tuple[str, str, np.ndarray, List[Any]]
+
+
+def _infer_format(path: str) -> Tuple[OcelFormat, Optional[Compression]]:
+    """Infer format and compression from the extensions of a path, e.g. ``log.json.gz``."""
+    root, extension = os.path.splitext(path.lower())
+    compression = _COMPRESSIONS.get(extension)
+    if compression is not None:
+        root, extension = os.path.splitext(root)
+    if extension not in _FORMATS:
+        raise ValueError(f"Cannot infer the OCEL format of {path}, pass it explicitly.")
+    return _FORMATS[extension], compression
+
+
+def _open_text(path: str, compression: Optional[Compression]) -> IO[str]:
+    """Open a text file for writing, compressed on the fly."""
+    if compression is None:
+        return open(path, "w", encoding="utf-8")
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8")
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Please install zstandard using 'pip install zstandard' to write zstd compressed logs")
+    return zstandard.open(path, "wt", encoding="utf-8")
+
+
+def _attribute_name(column: str) -> str:
+    """Name of the OCEL 2.0 attribute of a column, e.g. ``value`` for ``ocel:attr:value``."""
+    for prefix in (ATTRIBUTE_KEY_PREFIX, "ocel:"):
+        if column.startswith(prefix):
+            return column[len(prefix):]
+    return column
+
+
+def _attribute_type(series: pd.Series) -> str:
+    """
+    OCEL 2.0 type of a column. Object columns, e.g. sparse ones, are typed after their present values, and only
+    columns mixing several types are written as strings.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype) or dtype.kind == "M":
+        return "time"
+    if dtype.kind == "f":
+        return "float"
+    if dtype.kind in "iu":
+        return "integer"
+    if dtype.kind == "b":
+        return "boolean"
+    return _INFERRED_TYPES.get(pd.api.types.infer_dtype(series, skipna=True), "string")
+
+
+def _xml_value(value: Any) -> str:
+    """Text of an attribute value in OCEL 2.0 XML, where booleans are written as in XML Schema."""
+    if isinstance(value, (bool, np.bool_)):
+        return "true" if value else "false"
+    return escape(str(value))
+
+
+def _columns(chunk: pd.DataFrame, types: Dict[str, str]) -> List[_Column]:
+    """Convert the attribute columns of a chunk to Python values, once per column instead of once per cell."""
+    columns = []
+    for column, attribute_type in types.items():
+        series = chunk[column]
+        present = series.notna().to_numpy()
+        if attribute_type == "time":
+            values = format_times(pd.to_datetime(series, utc=True)).tolist()
+        elif attribute_type == "string":
+            values = [str(value) for value in series.astype(object).tolist()]
+        elif attribute_type == "float":
+            values = series.astype(np.float64).tolist()
+        else:
+            values = series.tolist()
+        columns.append((_attribute_name(column), attribute_type, present, values))
+    return columns
+
+
+def _row_attributes(columns: List[_Column], row: int) -> Iterator[Tuple[str, Any]]:
+    for name, _, present, values in columns:
+        if present[row]:
+            yield name, values[row]
+
+
+def _typed_rows(
+        types: List[str],
+        prefixes: List[Tuple],
+        columns: List[_Column],
+        column_names: List[str],
+        type_attributes: Dict[str, List[str]]
+) -> Dict[str, List[Tuple]]:
+    """
+    Build the rows of the per-type SQLite tables of a chunk.
+
+    :param types: Type of every row.
+    :param prefixes: Leading values of every row, e.g. id and time.
+    :param columns: The converted attribute columns of the chunk, aligned with ``column_names``.
+    :param column_names: Names of the attribute columns.
+    :param type_attributes: Attribute columns of every type, the columns of its table.
+    :return: Rows by type.
+    """
+    positions = {column: position for position, column in enumerate(column_names)}
+    selected = {type_name: [columns[positions[column]] for column in type_attributes[type_name]]
+                for type_name in dict.fromkeys(types)}
+    rows: Dict[str, List[Tuple]] = {}
+    for row, type_name in enumerate(types):
+        values = [
+            (int(column_values[row]) if attribute_type == "boolean" else column_values[row]) if present[row] else None
+            for _, attribute_type, present, column_values in selected[type_name]
+        ]
+        rows.setdefault(type_name, []).append(prefixes[row] + tuple(values))
+    return rows
+
+
+class _Groups:
+    """
+    Rows of a relation table grouped by their source, so that the relations of a chunk of events or objects are
+    found by binary search instead of a scan.
+    """
+
+    def __init__(self, keys: np.ndarray, sources: np.ndarray, targets: np.ndarray, qualifiers: np.ndarray) -> None:
+        """
+        :param keys: Ids of the events or objects in the order they are written.
+        :param sources: Source id of every relation.
+        :param targets: Target object id of every relation.
+        :param qualifiers: Qualifier of every relation.
+        """
+        codes, _ = pd.factorize(np.concatenate([keys, sources]))
+        self.key_codes: np.ndarray = codes[:len(keys)]
+        source_codes = codes[len(keys):]
+        order = np.argsort(source_codes, kind="stable")
+        self.sorted_codes: np.ndarray = source_codes[order]
+        self.targets: np.ndarray = targets[order]
+        self.qualifiers: np.ndarray = qualifiers[order]
+
+    def chunk(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray, List[Any], List[Any]]:
+        """
+        Return the relations of the rows ``start`` to ``stop``.
+
+        :return: Start and end of the relations of every row in the returned lists, targets and qualifiers.
+        """
+        codes = self.key_codes[start:stop]
+        begins = np.searchsorted(self.sorted_codes, codes, side="left")
+        ends = np.searchsorted(self.sorted_codes, codes, side="right")
+        low = int(begins.min()) if len(begins) else 0
+        high = int(ends.max()) if len(ends) else 0
+        return begins - low, ends - low, self.targets[low:high].tolist(), self.qualifiers[low:high].tolist()
+
+
+class Ocel2Writer:
+    """
+    Writes a model as OCEL 2.0 JSON, XML or SQLite, streaming from its tables chunk by chunk.
+
+    Only one chunk of events or objects is converted to Python values at a time and written before the next one,
+    so the memory needed beyond the model stays flat instead of growing with a complete document. Event-event
+    relationships, which OCEL 2.0 cannot express, are written as linking objects like in
+    :meth:`COREMetamodel.save_ocel`. Event types and classes and object classes are written as attributes
+    ``event_type``, ``event_class`` and ``object_class``.
+    """
+
+    def __init__(self, model: COREMetamodel, chunk_size: int = 10_000, link_objects: bool = True) -> None:
+        """
+        :param model: The model to write.
+        :param chunk_size: Number of events or objects converted and written at once.
+        :param link_objects: Whether to write event-event relationships as linking objects.
+        """
+        self.chunk_size: int = chunk_size
+        ocel = model.get_ocel()
+        self._event_id, self._activity, self._timestamp = ocel.event_id_column, ocel.event_activity, \
+            ocel.event_timestamp
+        self._object_id, self._object_type, self._qualifier = ocel.object_id_column, ocel.object_type_column, \
+            ocel.qualifier
+
+        self.events: pd.DataFrame = ocel.events
+        self.objects: pd.DataFrame = ocel.objects
+        relations = ocel.relations
+        sources = relations[self._event_id].to_numpy(dtype=object)
+        targets = relations[self._object_id].to_numpy(dtype=object)
+        qualifiers = relations[self._qualifier].to_numpy(dtype=object)
+
+        self._link_ids: np.ndarray = np.empty(0, dtype=object)
+        if link_objects and not ocel.e2e.empty:
+            source = ocel.e2e[self._event_id].astype(str).to_numpy(dtype=object)
+            target = ocel.e2e[self._event_id + "_2"].astype(str).to_numpy(dtype=object)
+            link_ids = "e20_" + source + "_" + target
+            new_ids = pd.unique(link_ids)
+            self._link_ids = new_ids[~pd.Index(new_ids).isin(self.objects[self._object_id])]
+            sources = np.concatenate([sources, source, target])
+            targets = np.concatenate([targets, link_ids, link_ids])
+            qualifiers = np.concatenate([
+                qualifiers,
+                np.full(len(link_ids), "derived_from", dtype=object),
+                np.full(len(link_ids), "derived_to", dtype=object)
+            ])
+
+        self._event_relations = _Groups(self.events[self._event_id].to_numpy(dtype=object), sources, targets,
+                                        qualifiers)
+        o2o = ocel.o2o
+        self._object_relations = _Groups(
+            np.concatenate([self.objects[self._object_id].to_numpy(dtype=object), self._link_ids]),
+            o2o[self._object_id].to_numpy(dtype=object),
+            o2o[self._object_id + "_2"].to_numpy(dtype=object),
+            o2o[self._qualifier].to_numpy(dtype=object)
+        )
+
+        self._event_attributes: Dict[str, str] = {
+            column: _attribute_type(self.events[column]) for column in self.events.columns
+            if column not in (self._event_id, self._activity, self._timestamp)
+        }
+        self._object_attributes: Dict[str, str] = {
+            column: _attribute_type(self.objects[column]) for column in self.objects.columns
+            if column not in (self._object_id, self._object_type)
+        }
+        self.event_types: Dict[str, List[str]] = self._type_attributes(self.events, self._activity,
+                                                                       self._event_attributes)
+        self.object_types: Dict[str, List[str]] = self._type_attributes(self.objects, self._object_type,
+                                                                        self._object_attributes)
+        if len(self._link_ids):
+            self.object_types.setdefault("link", [])
+
+    def _type_attributes(self, frame: pd.DataFrame, type_column: str,
+                         attributes: Dict[str, str]) -> Dict[str, List[str]]:
+        """Collect the attribute columns that hold a value for at least one row of every type, chunk by chunk."""
+        present: Dict[str, np.ndarray] = {}
+        columns = list(attributes.keys())
+        for start in range(0, len(frame), self.chunk_size):
+            chunk = frame.iloc[start:start + self.chunk_size]
+            flags = chunk[columns].notna().groupby(chunk[type_column].astype(object).to_numpy(), sort=False).any()
+            for type_name, row in zip(flags.index, flags.to_numpy()):
+                present[type_name] = present[type_name] | row if type_name in present else row
+        return {str(type_name): [column for column, flag in zip(columns, flags) if flag]
+                for type_name, flags in present.items()}
+
+    def _type_declarations(self, types: Dict[str, List[str]], attributes: Dict[str, str]) -> List[Dict[str, Any]]:
+        return [
+            {"name": type_name,
+             "attributes": [{"name": _attribute_name(column), "type": attributes[column]} for column in columns]}
+            for type_name, columns in types.items()
+        ]
+
+    def _event_chunks(self) -> Iterator[Tuple[List[Any], List[Any], List[Any], List[_Column], Tuple]]:
+        """Yield every chunk of events with ids, formatted times, attribute columns and relations."""
+        for start in range(0, len(self.events), self.chunk_size):
+            chunk = self.events.iloc[start:start + self.chunk_size]
+            yield (
+                chunk[self._event_id].astype(str).tolist(),
+                chunk[self._activity].astype(str).tolist(),
+                format_times(chunk[self._timestamp]).tolist(),
+                _columns(chunk, self._event_attributes),
+                self._event_relations.chunk(start, start + len(chunk))
+            )
+
+    def _object_chunks(self) -> Iterator[Tuple[List[Any], List[Any], List[_Column], Tuple]]:
+        """Yield every chunk of objects, followed by the linking objects, with their attributes and relations."""
+        for start in range(0, len(self.objects), self.chunk_size):
+            chunk = self.objects.iloc[start:start + self.chunk_size]
+            yield (
+                chunk[self._object_id].astype(str).tolist(),
+                chunk[self._object_type].astype(str).tolist(),
+                _columns(chunk, self._object_attributes),
+                self._object_relations.chunk(start, start + len(chunk))
+            )
+        offset = len(self.objects)
+        for start in range(0, len(self._link_ids), self.chunk_size):
+            ids = self._link_ids[start:start + self.chunk_size].tolist()
+            yield ids, ["link"] * len(ids), [], self._object_relations.chunk(offset + start,
+                                                                             offset + start + len(ids))
+
+    def write(self, path: str, ocel_format: Optional[OcelFormat] = None,
+              compression: Optional[Compression] = None) -> None:
+        """
+        Write the model to a file.
+
+        :param path: Path of the file, e.g. ``log.json``, ``log.xml.gz`` or ``log.sqlite``.
+        :param ocel_format: ``json``, ``xml`` or ``sqlite``. Inferred from the path by default.
+        :param compression: ``gzip`` or ``zstd`` for JSON and XML. Inferred from a ``.gz`` or ``.zst`` extension
+            by default.
+        """
+        inferred_format, inferred_compression = _infer_format(path) if ocel_format is None else (ocel_format, None)
+        compression = compression if compression is not None else inferred_compression
+        if inferred_format == "sqlite":
+            if compression is not None:
+                raise ValueError("SQLite databases cannot be written compressed.")
+            self.write_sqlite(path)
+            return
+        with _open_text(path, compression) as file:
+            if inferred_format == "json":
+                self.write_json(file)
+            else:
+                self.write_xml(file)
+
+    def write_json(self, file: IO[str]) -> None:
+        """Write the model as OCEL 2.0 JSON to a text file."""
+        file.write('{"objectTypes": ')
+        file.write(json.dumps(self._type_declarations(self.object_types, self._object_attributes)))
+        file.write(', "eventTypes": ')
+        file.write(json.dumps(self._type_declarations(self.event_types, self._event_attributes)))
+
+        file.write(', "objects": [')
+        separator = ""
+        for ids, types, columns, (begins, ends, targets, qualifiers) in self._object_chunks():
+            records = []
+            for row, (object_id, object_type) in enumerate(zip(ids, types)):
+                record: Dict[str, Any] = {"id": object_id, "type": object_type}
+                attributes = [{"name": name, "time": _INITIAL_TIME, "value": value}
+                              for name, value in _row_attributes(columns, row)]
+                if attributes:
+                    record["attributes"] = attributes
+                if ends[row] > begins[row]:
+                    record["relationships"] = [
+                        {"objectId": targets[index], "qualifier": qualifiers[index]}
+                        for index in range(begins[row], ends[row])
+                    ]
+                records.append(record)
+            if records:
+                file.write(separator + json.dumps(records, default=str)[1:-1])
+                separator = ", "
+
+        file.write('], "events": [')
+        separator = ""
+        for ids, types, times, columns, (begins, ends, targets, qualifiers) in self._event_chunks():
+            records = []
+            for row, (event_id, event_type, time) in enumerate(zip(ids, types, times)):
+                record = {"id": event_id, "type": event_type, "time": time,
+                          "attributes": [{"name": name, "value": value}
+                                         for name, value in _row_attributes(columns, row)]}
+                if ends[row] > begins[row]:
+                    record["relationships"] = [
+                        {"objectId": targets[index], "qualifier": qualifiers[index]}
+                        for index in range(begins[row], ends[row])
+                    ]
+                records.append(record)
+            if records:
+                file.write(separator + json.dumps(records, default=str)[1:-1])
+                separator = ", "
+        file.write("]}")
+
+    def _xml_types(self, file: IO[str], tag: str, types: Dict[str, List[str]], attributes: Dict[str, str]) -> None:
+        file.write(f"<{tag}s>")
+        for type_name, columns in types.items():
+            file.write(f"<{tag} name={quoteattr(type_name)}><attributes>")
+            for column in columns:
+                file.write(f"<attribute name={quoteattr(_attribute_name(column))} "
+                           f"type={quoteattr(attributes[column])}/>")
+            file.write(f"</attributes></{tag}>")
+        file.write(f"</{tag}s>")
+
+    def write_xml(self, file: IO[str]) -> None:
+        """Write the model as OCEL 2.0 XML to a text file."""
+        file.write("<?xml version='1.0' encoding='UTF-8'?>\n<log>")
+        self._xml_types(file, "object-type", self.object_types, self._object_attributes)
+        self._xml_types(file, "event-type", self.event_types, self._event_attributes)
+
+        file.write("<objects>")
+        for ids, types, columns, (begins, ends, targets, qualifiers) in self._object_chunks():
+            parts = []
+            for row, (object_id, object_type) in enumerate(zip(ids, types)):
+                parts.append(f"<object id={quoteattr(object_id)} type={quoteattr(object_type)}><attributes>")
+                for name, value in _row_attributes(columns, row):
+                    parts.append(f"<attribute name={quoteattr(name)} time=\"{_INITIAL_TIME}\">"
+                                 f"{_xml_value(value)}</attribute>")
+                parts.append("</attributes><objects>")
+                for index in range(begins[row], ends[row]):
+                    parts.append(f"<relationship object-id={quoteattr(str(targets[index]))} "
+                                 f"qualifier={quoteattr(str(qualifiers[index]))}/>")
+                parts.append("</objects></object>")
+            file.write("".join(parts))
+        file.write("</objects>")
+
+        file.write("<events>")
+        for ids, types, times, columns, (begins, ends, targets, qualifiers) in self._event_chunks():
+            parts = []
+            for row, (event_id, event_type, time) in enumerate(zip(ids, types, times)):
+                parts.append(f"<event id={quoteattr(event_id)} type={quoteattr(event_type)} time=\"{time}\">"
+                             f"<attributes>")
+                for name, value in _row_attributes(columns, row):
+                    parts.append(f"<attribute name={quoteattr(name)}>{_xml_value(value)}</attribute>")
+                parts.append("</attributes><objects>")
+                for index in range(begins[row], ends[row]):
+                    parts.append(f"<relationship object-id={quoteattr(str(targets[index]))} "
+                                 f"qualifier={quoteattr(str(qualifiers[index]))}/>")
+                parts.append("</objects></event>")
+            file.write("".join(parts))
+        file.write("</events></log>")
+
+    @staticmethod
+    def _table_names(types: List[str]) -> Dict[str, str]:
+        """Map types to unique SQLite-safe table name suffixes, like the pm4py SQLite exporter."""
+        names: Dict[str, str] = {}
+        used = set()
+        for type_name in types:
+            base = re.sub(r"[^0-9a-zA-Z]", "", type_name) or "Type"
+            candidate, suffix = base, 2
+            while candidate.casefold() in used:
+                candidate, suffix = f"{base}_{suffix}", suffix + 1
+            used.add(candidate.casefold())
+            names[type_name] = candidate
+        return names
+
+    def write_sqlite(self, path: str) -> None:
+        """
+        Write the model as OCEL 2.0 SQLite database, replacing an existing file. Every chunk is inserted with
+        ``executemany`` and the whole database is written in one transaction.
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        connection = sqlite3.connect(path)
+        try:
+            self._write_sqlite(connection)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _write_sqlite(self, connection: sqlite3.Connection) -> None:
+        sql_types = {"time": "TIMESTAMP", "float": "REAL", "integer": "INTEGER", "boolean": "INTEGER",
+                     "string": "TEXT"}
+        event_tables = self._table_names(list(self.event_types))
+        object_tables = self._table_names(list(self.object_types))
+
+        connection.executescript(
+            'CREATE TABLE event (ocel_id TEXT, ocel_type TEXT);'
+            'CREATE TABLE object (ocel_id TEXT, ocel_type TEXT);'
+            'CREATE TABLE event_map_type (ocel_type TEXT, ocel_type_map TEXT);'
+            'CREATE TABLE object_map_type (ocel_type TEXT, ocel_type_map TEXT);'
+            'CREATE TABLE event_object (ocel_event_id TEXT, ocel_object_id TEXT, ocel_qualifier TEXT);'
+            'CREATE TABLE object_object (ocel_source_id TEXT, ocel_target_id TEXT, ocel_qualifier TEXT);'
+        )
+        connection.executemany("INSERT INTO event_map_type VALUES (?, ?)", event_tables.items())
+        connection.executemany("INSERT INTO object_map_type VALUES (?, ?)", object_tables.items())
+
+        def create(table: str, fixed: List[str], columns: List[str], attributes: Dict[str, str]) -> str:
+            definitions = fixed + [f'"{_attribute_name(column)}" {sql_types[attributes[column]]}'
+                                   for column in columns]
+            connection.execute(f'CREATE TABLE "{table}" ({", ".join(definitions)})')
+            return f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(definitions))})'
+
+        event_inserts = {
+            type_name: create("event_" + event_tables[type_name], ["ocel_id TEXT", "ocel_time TIMESTAMP"], columns,
+                              self._event_attributes)
+            for type_name, columns in self.event_types.items()
+        }
+        object_inserts = {
+            type_name: create("object_" + object_tables[type_name],
+                              ["ocel_id TEXT", "ocel_time TIMESTAMP", "ocel_changed_field TEXT"], columns,
+                              self._object_attributes)
+            for type_name, columns in self.object_types.items()
+        }
+
+        for ids, types, columns, (begins, ends, targets, qualifiers) in self._object_chunks():
+            connection.executemany("INSERT INTO object VALUES (?, ?)", zip(ids, types))
+            prefixes = [(object_id, None, None) for object_id in ids]
+            rows = _typed_rows(types, prefixes, columns, list(self._object_attributes), self.object_types)
+            for type_name, type_rows in rows.items():
+                connection.executemany(object_inserts[type_name], type_rows)
+            connection.executemany("INSERT INTO object_object VALUES (?, ?, ?)", (
+                (object_id, targets[index], qualifiers[index])
+                for object_id, begin, end in zip(ids, begins, ends) for index in range(begin, end)
+            ))
+
+        for ids, types, times, columns, (begins, ends, targets, qualifiers) in self._event_chunks():
+            connection.executemany("INSERT INTO event VALUES (?, ?)", zip(ids, types))
+            rows = _typed_rows(types, list(zip(ids, times)), columns, list(self._event_attributes), self.event_types)
+            for type_name, type_rows in rows.items():
+                connection.executemany(event_inserts[type_name], type_rows)
+            connection.executemany("INSERT INTO event_object VALUES (?, ?, ?)", (
+                (event_id, targets[index], qualifiers[index])
+                for event_id, begin, end in zip(ids, begins, ends) for index in range(begin, end)
+            ))
+
+
+def write_ocel2(
+        model: COREMetamodel,
+        path: str,
+        ocel_format: Optional[OcelFormat] = None,
+        compression: Optional[Compression] = None,
+        chunk_size: int = 10_000,
+        link_objects: bool = True
+) -> None:
+    """
+    Write a model as OCEL 2.0 JSON, XML or SQLite, streaming from its tables. See :class:`Ocel2Writer`.
+
+    :param model: The model.
+    :param path: Path of the file. Format and compression are inferred from its extensions by default.
+    :param ocel_format: ``json``, ``xml`` or ``sqlite``.
+    :param compression: ``gzip`` or ``zstd``, for JSON and XML.
+    :param chunk_size: Number of events or objects converted and written at once.
+    :param link_objects: Whether to write event-event relationships as linking objects.
+    """
+    Ocel2Writer(model, chunk_size, link_objects).write(path, ocel_format, compression)
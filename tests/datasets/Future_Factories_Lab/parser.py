@@ -1,5 +1,5 @@
 import pickle
-from typing import List, Dict
+from typing import List, Dict, Mapping, Sequence, Optional
 
 import pandas as pd
 
@@ -7,6 +7,10 @@ from src.types_defintion.event_definition import Event, ProcessEvent, IotEvent,
 from src.types_defintion.object_definition import Object, ObjectClassEnum
 from src.types_defintion.relationship_definitions import ObjectObjectRelationship, EventObjectRelationship, \
     EventEventRelationship
+from src.wrapper.object_registry import ObjectRegistry
+from src.wrapper.ocel_wrapper import COREMetamodel
+from src.wrapper.sensor_compression import SensorCompressor
+from src.wrapper.sensor_frame import iter_sensor_frame_chunks
 
 
 ROBOT_ARMS = ["R01", "R02", "R03", "R04"]
@@ -27,7 +31,7 @@ class SensorStreamParser:
         """
         Initializes the SensorStreamParser class.
         """
-        self.objects: List[Object] = []
+        self.objects: ObjectRegistry = ObjectRegistry()
         self.iot_events: List[IotEvent] = []
         self.process_events: List[ProcessEvent] = []
         self.observations: List[Event] = []
@@ -55,7 +59,7 @@ class SensorStreamParser:
                 attributes={}
             )
 
-            self.objects.extend([robot_arm, robot_arm_pot, robot_arm_load])
+            self.objects.upsert_many([robot_arm, robot_arm_pot, robot_arm_load])
 
             # Create O2o relationships
             self.object_object_relationships.append(
@@ -78,19 +82,36 @@ class SensorStreamParser:
                 object_type=f"Conv_{c}",
                 attributes={}
             )
-            self.objects.append(conv)
-
-    def parse_data(self, data: pd.DataFrame):
-        # Iterate over the rows of the DataFrame
-        for index, row in data.iterrows():
-            # Create an IotEvent object
+            self.objects.upsert(conv)
+
+    def parse_data(
+            self,
+            data: pd.DataFrame,
+            column_objects: Mapping[str, Sequence[str]] = ROBOT_ARM_COLUMNS,
+            chunk_rows: int = 100_000,
+            compressor: Optional[SensorCompressor] = None
+    ) -> COREMetamodel:
+        """
+        Parses the combined sensor frame and returns a COREMetamodel.
 
-            for object_ref in self.objects:
-                object_id: str = object_ref.object_id
+        The frame is melted chunk by chunk into observations, one IoT event per object and row, and their
+        relationships, see :func:`melt_sensor_frame`. Event ids are unique across chunks, so the chunks are
+        appended to the model as they are, without checking for colliding ids.
 
-                obj_attributes: List[str] = ROBOT_ARM_COLUMNS[object_id]
-                obj_values: List[Dict] = [row[attr] for attr in obj_attributes]
-                print(obj_values)
+        :param data: The combined frame with one column per sensor and a "timestamp" column.
+        :param column_objects: Sensor columns of every object.
+        :param chunk_rows: Number of rows melted at once.
+        :param compressor: If given, only observations that change a sensor signal significantly are kept.
+        :return: COREMetamodel containing the parsed data.
+        """
+        model = COREMetamodel(
+            objects=self.objects.values(),
+            object_object_relationships=self.object_object_relationships
+        )
+        for chunk in iter_sensor_frame_chunks(data, column_objects, chunk_rows, timestamp_column="timestamp",
+                                              compressor=compressor):
+            model.append_batch(objects=chunk.objects, events=chunk.events, relationships=chunk.relationships)
+        return model
 
 
 if __name__ == "__main__":
@@ -101,4 +122,5 @@ if __name__ == "__main__":
     parser = SensorStreamParser()
 
     print(list(data.columns))
-    # parser.parse_data(data)
\ No newline at end of file
+    model: COREMetamodel = parser.parse_data(data)
+    print(model.get_ocel().get_summary())
\ No newline at end of file
@@ -6,6 +6,8 @@ import yaml
 from typing import Union, Dict, List, Any
 import xmltodict
 
+from src.types_defintion.object_definition import Object, ObjectClassEnum
+from src.wrapper.object_registry import ObjectRegistry, keep_first, keep_last
 from src.wrapper.ocel_wrapper import COREMetamodel
 
 
@@ -16,7 +18,13 @@ class SensorStreamParser:
         """
         Initializes the SensorStreamParser class.
         """
-        self.objects = []
+        # A case can span several traces: keep its first start and its last end, and the first value of every
+        # other attribute
+        self.objects: ObjectRegistry = ObjectRegistry(
+            strategy="merge",
+            attribute_rules={"lifecycle:end": keep_last},
+            default_rule=keep_first
+        )
         self.iot_events = []
         self.process_events = []
         self.iot_devices = []
@@ -39,15 +47,16 @@ class SensorStreamParser:
             concept_name: str = trace['string']['@value']
             stream_points: List[dict] = trace["list"]["list"]["list"]
 
-            self.objects.append({
-                "object_id": concept_name,
-                "object_type": "case_object",
-                "attributes": {
+            self.objects.upsert(Object(
+                object_id=concept_name,
+                object_type="case_object",
+                object_class=ObjectClassEnum.CASE_OBJECT,
+                attributes={
                     "concept:name": concept_name,
                     "lifecycle:start": stream_points[0]["date"]["@value"],
                     "lifecycle:end": stream_points[-1]["date"]["@value"]
                 }
-            })
+            ))
 
             for elem in stream_points:
                 # StreamPoint
@@ -79,7 +88,7 @@ class SensorStreamParser:
                 })
 
         return COREMetamodel(
-            objects=self.objects,
+            objects=self.objects.values(),
             iot_events=self.iot_events,
             process_events=self.process_events,
             iot_devices=self.iot_devices,
@@ -1,13 +1,15 @@
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+import functools
+from typing import Dict, List, Any, Optional, Iterable, Iterator
 from uuid import uuid4
-import xml
+import xml.etree.ElementTree as ET
 
 import pm4py
-import xmltodict
 from pathlib import Path
 from pydantic import BaseModel, ConfigDict
 
+from src.readers.xes_reader import iter_xes_events, XesSource
+from src.types_defintion.batch_definition import EventBatch
 from src.types_defintion.event_definition import IotEvent, ProcessEvent, Observation
 from src.types_defintion.object_definition import Object, ObjectClassEnum
 from src.types_defintion.relationship_definitions import (
@@ -15,7 +17,11 @@ from src.types_defintion.relationship_definitions import (
     EventEventRelationship,
     ObjectObjectRelationship
 )
+from src.wrapper.object_registry import ObjectRegistry
 from src.wrapper.ocel_wrapper import COREMetamodel
+from src.wrapper.parallel_ingestion import PartialLog, ingest_parallel
+from src.wrapper.sensor_compression import SensorCompressor, compress_observations
+from src.wrapper.time_series_store import TimeSeriesStore
 
 
 class StreamPoint(BaseModel):
@@ -39,6 +45,10 @@ class ProcessEventData(BaseModel):
     operation_end_time: datetime
     data_stream: List[StreamPoint]
 
+# Attributes of an observation that identify its sensor
+SENSOR_ATTRIBUTES: List[str] = ["system", "observation"]
+
+
 def get_file_paths(folder_path: str, pattern: str = "*.xes", recursive: bool = False) -> List[str]:
     folder = Path(folder_path)
     if not folder.exists():
@@ -59,13 +69,25 @@ def find_value_by_key(data_list: List[Dict[str, str]], search_key: str) -> str:
 
 
 class SensorStreamParser:
-    def __init__(self) -> None:
-        """Initialize the SensorStreamParser with empty collections."""
-        self.objects: List[Object] = []
-        self.process_events: List[ProcessEvent] = []
-        self.observations: List[Observation] = []
-        self.event_event_relationships: List[EventEventRelationship] = []
-        self.event_object_relationships: List[EventObjectRelationship] = []
+    def __init__(
+            self,
+            chunk_size: int = 64,
+            compressor: Optional[SensorCompressor] = None,
+            time_series: Optional[TimeSeriesStore] = None
+    ) -> None:
+        """
+        Initialize the SensorStreamParser.
+
+        :param chunk_size: Number of process events, with their stream points, handed to the model at once.
+        :param compressor: If given, only observations that change the signal of their sensor significantly are
+            kept. Compression starts anew with every chunk, so larger chunks drop more observations.
+        :param time_series: If given, stream points are appended to this store instead of becoming observation
+            events, one series per system and observed property. Pass the same store to the model.
+        """
+        self.chunk_size: int = chunk_size
+        self.compressor: Optional[SensorCompressor] = compressor
+        self.time_series: Optional[TimeSeriesStore] = time_series
+        self.objects: ObjectRegistry = ObjectRegistry()
 
     def _parse_stream_point(self, stream_point: Dict[str, Any]) -> StreamPoint:
         """Parse a stream point from the raw data."""
@@ -89,15 +111,28 @@ class SensorStreamParser:
             data_stream=[self._parse_stream_point(point) for point in event["list"]["list"]]
         )
 
-    def _create_object(self, resource_id: str) -> None:
-        """Create a new object if it doesn't exist."""
-        if not any(obj.object_id == resource_id for obj in self.objects):
-            self.objects.append(Object(
-                object_id=resource_id,
-                object_type="resource",
-                object_class=ObjectClassEnum.RESOURCE,
-                attributes={}
-            ))
+    def iter_process_events(self, source: XesSource) -> Iterator[ProcessEventData]:
+        """
+        Stream the process events of an XES log, holding only one raw event in memory at a time.
+
+        :param source: Path or binary file object of the XES log.
+        :return: Iterator over the parsed process events.
+        """
+        for event_raw in iter_xes_events(source):
+            yield self._parse_process_event(event_raw)
+
+    def _create_object(self, resource_id: str) -> Optional[Object]:
+        """Create a new object if it doesn't exist. Return it, or None if it was known already."""
+        if resource_id in self.objects:
+            return None
+        resource = Object(
+            object_id=resource_id,
+            object_type="resource",
+            object_class=ObjectClassEnum.RESOURCE,
+            attributes={}
+        )
+        self.objects.upsert(resource)
+        return resource
 
     def _create_process_event(self, event_data: ProcessEventData) -> ProcessEvent:
         """Create a process event from parsed data."""
@@ -114,14 +149,15 @@ class SensorStreamParser:
             }
         )
 
-    def _create_observation(self, stream_point: StreamPoint) -> Observation:
-        """Create an observation from a stream point."""
-        return Observation(
-            event_id=f"observation_{str(uuid4())[:8]}",
-            event_class="observation",
-            event_type="observation",
-            timestamp=stream_point.timestamp,
-            attributes={
+    def _append_observation(self, observations: EventBatch, stream_point: StreamPoint) -> str:
+        """Append an observation of a stream point to a batch and return its id."""
+        event_id = f"observation_{str(uuid4())[:8]}"
+        observations.append(
+            event_id,
+            "observation",
+            "observation",
+            stream_point.timestamp,
+            {
                 "system": stream_point.system,
                 "system_type": stream_point.system_type,
                 "observation": stream_point.observation,
@@ -130,70 +166,173 @@ class SensorStreamParser:
                 "value": stream_point.value
             }
         )
+        return event_id
+
+    def _store_observation(self, partial: PartialLog, stream_point: StreamPoint) -> str:
+        """Append a stream point to the time series of its sensor and return the id of its observation."""
+        if stream_point.system not in self.objects:
+            sensor = Object(
+                object_id=stream_point.system,
+                object_type=stream_point.system_type,
+                object_class=ObjectClassEnum.SENSOR,
+                attributes={}
+            )
+            self.objects.upsert(sensor)
+            partial.objects.append(sensor.object_id, sensor.object_type, sensor.object_class, sensor.attributes)
 
-    def parse_sensor_stream_log(self, process_events_raw: List[Dict[str, Any]]) -> COREMetamodel:
+        try:
+            value = float(stream_point.value)
+        except ValueError:
+            value = stream_point.value
+        series_id = f"{stream_point.system}#{stream_point.observation.rsplit('#', 1)[-1]}"
+        return self.time_series.append(series_id, stream_point.timestamp, value, object_id=stream_point.system)
+
+    def _add_process_event(self, partial: PartialLog, event_data: ProcessEventData) -> None:
+        """Add a process event, its resource and its stream points to a partial log."""
+        # Create object for the resource
+        resource = self._create_object(event_data.org_resource)
+        if resource is not None:
+            partial.objects.append(resource.object_id, resource.object_type, resource.object_class,
+                                   resource.attributes)
+
+        # Create process event
+        process_event = self._create_process_event(event_data)
+        partial.events.append_event(process_event)
+
+        # Create event-object relationship
+        partial.relationships.append("event_object", process_event.event_id, event_data.org_resource, "related")
+
+        # Process stream points
+        for stream_point in event_data.data_stream:
+            if self.time_series is not None:
+                observation_id = self._store_observation(partial, stream_point)
+            else:
+                observation_id = self._append_observation(partial.events, stream_point)
+
+            # Create event-event relationship
+            partial.relationships.append("event_event", process_event.event_id, observation_id, "derived_from")
+
+    def parse_partial(self, process_events: Iterable[ProcessEventData], source: str = "") -> PartialLog:
+        """
+        Parse process events and their stream points into a columnar partial log.
+
+        :param process_events: The parsed process events, e.g. from :meth:`iter_process_events`.
+        :param source: Name of the source of the events.
+        :return: The partial log.
+        """
+        partial = PartialLog(source=source)
+        for event_data in process_events:
+            self._add_process_event(partial, event_data)
+        return self._compress(partial)
+
+    def _compress(self, partial: PartialLog) -> PartialLog:
+        """Compress the observations of a partial log per sensor, i.e. per system and observed property."""
+        if self.compressor is None:
+            return partial
+        return compress_observations(partial, self.compressor, SENSOR_ATTRIBUTES)
+
+    def add_process_events(self, model: COREMetamodel, process_events: Iterable[ProcessEventData]) -> COREMetamodel:
+        """
+        Add process events and their stream points to a model incrementally, one chunk at a time.
+
+        Stream points become observations that the process event is derived from. Events and relationships are
+        collected in batches, so no pydantic model is built per observation.
+
+        :param model: The model to extend.
+        :param process_events: The parsed process events, e.g. from :meth:`iter_process_events`.
+        :return: The model.
+        """
+        partial = PartialLog()
+        count = 0
+        try:
+            for event_data in process_events:
+                self._add_process_event(partial, event_data)
+                count += 1
+                if count >= self.chunk_size:
+                    partial = self._compress(partial)
+                    model.append_batch(objects=partial.objects, events=partial.events,
+                                       relationships=partial.relationships)
+                    partial, count = PartialLog(), 0
+        finally:
+            # Also hand over the complete events collected before an error in the source
+            if count:
+                partial = self._compress(partial)
+                model.append_batch(objects=partial.objects, events=partial.events, relationships=partial.relationships)
+        return model
+
+    def parse_sensor_stream_log(self, process_events_raw: Iterable[Dict[str, Any]]) -> COREMetamodel:
         """Parse a SensorStream log and return an OCELWrapper object."""
-
-        for event_raw in process_events_raw:
-            # Parse the event data
-            event_data = self._parse_process_event(event_raw)
-
-            # Create object for the resource
-            self._create_object(event_data.org_resource)
-
-            # Create process event
-            process_event = self._create_process_event(event_data)
-            self.process_events.append(process_event)
-
-            # Create event-object relationship
-            self.event_object_relationships.append(EventObjectRelationship(
-                event_id=process_event.event_id,
-                object_id=event_data.org_resource
-            ))
-
-            # Process stream points
-            for stream_point in event_data.data_stream:
-                observation = self._create_observation(stream_point)
-                self.observations.append(observation)
-
-                # Create event-event relationship
-                self.event_event_relationships.append(EventEventRelationship(
-                    event_id=process_event.event_id,
-                    derived_from_event_id=observation.event_id,
-                    qualifier="derived_from"
-                ))
-
-        return COREMetamodel(
-            objects=self.objects,
-            process_events=self.process_events,
-            observations=self.observations,
-            event_object_relationships=self.event_object_relationships,
-            event_event_relationships=self.event_event_relationships
+        return self.add_process_events(
+            COREMetamodel(),
+            (self._parse_process_event(event_raw) for event_raw in process_events_raw)
         )
 
 
-def parse_event_logs(folder_path: str) -> COREMetamodel:
-    """Parse all event logs in a folder and return an OCELWrapper."""
-    event_log_paths = get_file_paths(folder_path)
-    all_process_events: List[Dict[str, Any]] = []
+def parse_event_logs(folder_path: str, time_series: Optional[TimeSeriesStore] = None) -> COREMetamodel:
+    """
+    Parse all event logs in a folder and return an OCELWrapper.
 
-    for file_path in event_log_paths:
-        try:
-            with open(file_path, 'r') as file:
-                xml_dict = xmltodict.parse(file.read())
+    The logs are streamed event by event into one model. If a log is malformed, the events before the error are
+    kept and the rest of the log is skipped.
 
-            events = xml_dict["log"]["trace"]["event"]
-            if isinstance(events, dict):
-                events = [events]
-            all_process_events.extend(events)
+    :param folder_path: Folder of the event logs.
+    :param time_series: If given, the stream points are kept in this store and only expanded into observation
+        events when the OCEL is built.
+    """
+    parser = SensorStreamParser(time_series=time_series)
+    model = COREMetamodel(time_series=time_series)
 
-        except xml.parsers.expat.ExpatError as e:
+    for file_path in get_file_paths(folder_path):
+        try:
+            parser.add_process_events(model, parser.iter_process_events(file_path))
+        except ET.ParseError as e:
             print(f"ERROR in file {file_path}:")
             print(e)
             continue
 
-    parser = SensorStreamParser()
-    return parser.parse_sensor_stream_log(all_process_events)
+    return model
+
+
+def parse_partial(file_path: str, compressor: Optional[SensorCompressor] = None) -> PartialLog:
+    """
+    Parse one event log into a partial log. Runs in the worker processes of :func:`parse_event_logs_parallel`.
+
+    If the log is malformed, the events before the error are kept.
+    """
+    parser = SensorStreamParser(compressor=compressor)
+    partial = PartialLog(source=file_path)
+    try:
+        for event_data in parser.iter_process_events(file_path):
+            parser._add_process_event(partial, event_data)
+    except ET.ParseError as e:
+        print(f"ERROR in file {file_path}:")
+        print(e)
+    return parser._compress(partial)
+
+
+def parse_event_logs_parallel(
+        folder_path: str,
+        workers: Optional[int] = None,
+        chunk_size: int = 1,
+        order_by_timestamp: bool = False,
+        compressor: Optional[SensorCompressor] = None
+) -> COREMetamodel:
+    """
+    Parse all event logs in a folder in worker processes and merge them into one OCELWrapper.
+
+    :param folder_path: Folder of the event logs.
+    :param workers: Number of worker processes, by default one per CPU.
+    :param chunk_size: Number of event logs parsed per worker task.
+    :param order_by_timestamp: Whether to merge the events of all logs ordered by timestamp.
+    :param compressor: If given, the observations of every log are compressed per sensor.
+    """
+    return ingest_parallel(
+        get_file_paths(folder_path),
+        functools.partial(parse_partial, compressor=compressor),
+        workers=workers,
+        chunk_size=chunk_size,
+        order_by_timestamp=order_by_timestamp
+    )
 
 
 if __name__ == "__main__":
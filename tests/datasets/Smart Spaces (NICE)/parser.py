@@ -1,3 +1,4 @@
+import logging
 import xml.etree.ElementTree as ET
 from uuid import uuid4
 
@@ -10,6 +11,8 @@ from src.types_defintion.event_definition import Event, ProcessEvent, Observatio
 from src.types_defintion.object_definition import Object, ObjectClassEnum
 from src.types_defintion.relationship_definitions import ObjectObjectRelationship, EventObjectRelationship, \
     EventEventRelationship
+from src.utils.instrumentation import Instrumentation
+from src.wrapper.object_registry import ObjectRegistry
 from src.wrapper.ocel_wrapper import COREMetamodel
 
 def get_object_class_for_object_type(o_type: Literal["location",  "date", "user"]) -> ObjectClassEnum:
@@ -25,7 +28,7 @@ class SensorStreamParser:
         """
         Initializes the SensorStreamParser class.
         """
-        self.objects: List[Object] = []
+        self.objects: ObjectRegistry = ObjectRegistry()
         self.iot_events: List[Event] = []
         self.process_events: List[Event] = []
         self.observations: List[Event] = []
@@ -60,7 +63,7 @@ class SensorStreamParser:
                 attributes= dp_dict
             )
 
-            self.objects.append(object_ref)
+            self.objects.upsert(object_ref)
             ob_prop: dict | None = obj.get("ObservableProperty", None)
 
             if ob_prop:
@@ -78,7 +81,7 @@ class SensorStreamParser:
                     "metadata": sensor.get("metadata", {}),
                 },
             )
-            self.objects.append(object_ref)
+            self.objects.upsert(object_ref)
 
             sensor_id: str = sensor["@ID"]
 
@@ -209,7 +212,7 @@ class SensorStreamParser:
                 self.event_object_relationships.append(e2o_ref)
 
         return COREMetamodel(
-            objects=self.objects,
+            objects=self.objects.values(),
             iot_events=self.iot_events,
             process_events=self.process_events,
             observations=self.observations,
@@ -222,17 +225,21 @@ class SensorStreamParser:
 if __name__ == "__main__":
     sample_xml_path = "smart spaces nice log.xml"
 
+    logging.basicConfig(level=logging.INFO)
+    instrumentation = Instrumentation()
+
     # Load xml as string
-    with open(sample_xml_path, 'r') as file:
-        xml_string = file.read()
-    print("After reading the file")
+    with instrumentation.span("read_file"):
+        with open(sample_xml_path, 'r') as file:
+            xml_string = file.read()
     # Parse xml string to dict
-    xml_dict = xmltodict.parse(xml_string)
+    with instrumentation.span("parse_xml"):
+        xml_dict = xmltodict.parse(xml_string)
 
     # Parse xml dict to OCELWrapper
     parser = SensorStreamParser()
-    ocel_wrapper = parser.parse_sensor_stream_log(xml_dict)
-    print("After parsing the xml")
+    with instrumentation.span("parse_sensor_stream_log"):
+        ocel_wrapper = parser.parse_sensor_stream_log(xml_dict)
 
     ocel_pointer: pm4py.OCEL = ocel_wrapper.get_ocel()
     ocel_wrapper.save_ocel("v1_output.jsonocel")
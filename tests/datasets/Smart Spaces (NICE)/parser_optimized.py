@@ -1,18 +1,14 @@
-import xml.etree.ElementTree as ET
+import logging
 from uuid import uuid4
-import threading
-from queue import Queue
-from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pm4py
-import yaml
-from typing import Union, Dict, List, Any, Literal
+from typing import Dict, List, Any, Literal, Optional, Callable, Tuple
 import xmltodict
 
-from src.types_defintion.event_definition import Event, ProcessEvent, Observation, IotEvent
-from src.types_defintion.object_definition import Object, ObjectClassEnum
-from src.types_defintion.relationship_definitions import ObjectObjectRelationship, EventObjectRelationship, \
-    EventEventRelationship
+from src.types_defintion.object_definition import ObjectClassEnum
+from src.utils.instrumentation import Instrumentation, NULL_INSTRUMENTATION
 from src.wrapper.ocel_wrapper import COREMetamodel
+from src.wrapper.parallel_ingestion import PartialLog, concatenate_partials
 
 
 def get_object_class_for_object_type(o_type: Literal["location", "date", "user"]) -> ObjectClassEnum:
@@ -24,202 +20,175 @@ def get_object_class_for_object_type(o_type: Literal["location", "date", "user"]
         return ObjectClassEnum.RESOURCE
 
 
-class SensorStreamParser:
-    def __init__(self) -> None:
-        """
-        Initializes the SensorStreamParser class.
-        """
-        self.objects: List[Object] = []
-        self.iot_events: List[Event] = []
-        self.process_events: List[Event] = []
-        self.observations: List[Event] = []
-        self.object_object_relationships: List[ObjectObjectRelationship] = []
-        self.event_object_relationships: List[EventObjectRelationship] = []
-        self.event_event_relationships: List[EventEventRelationship] = []
-        # Add locks for thread safety
-        self.objects_lock = threading.Lock()
-        self.iot_events_lock = threading.Lock()
-        self.process_events_lock = threading.Lock()
-        self.observations_lock = threading.Lock()
-        self.object_object_relationships_lock = threading.Lock()
-        self.event_object_relationships_lock = threading.Lock()
-        self.event_event_relationships_lock = threading.Lock()
-
-    def process_objects(self, object_list: List[dict]) -> None:
-        """Process objects in a separate thread"""
-        print("Processing objects started")
-        for obj in object_list:
-            dp: dict | list = obj.get("DigitalProperty", {})
-            dp_dict = dp if isinstance(dp, dict) else {str(i): n for i, n in enumerate(dp)}
-
-            object_ref: Object = Object(
-                object_id=obj["@ID"],
-                object_type=obj["@objectType"],
-                object_class=get_object_class_for_object_type(obj["@objectType"]),
-                attributes=dp_dict
-            )
+def _add_event_object_relationships(partial: PartialLog, event: dict) -> None:
+    """Relate an event to the objects listed in its EventObjectRelationship elements."""
+    e_o_relationship: List[Dict[str, str]] = event.get("EventObjectRelationship", [])
+    for rel in e_o_relationship:
+        partial.relationships.append("event_object", event["@ID"], rel["@objectID"], "related")
 
-            with self.objects_lock:
-                self.objects.append(object_ref)
-        print("Processing objects completed")
-
-    def process_sensors(self, sensors: List[dict]) -> None:
-        """Process sensors in a separate thread"""
-        print("Processing sensors started")
-        for sensor in sensors:
-            object_ref: Object = Object(
-                object_id=sensor["@ID"],
-                object_type="Sensor",
-                object_class=ObjectClassEnum.SENSOR,
-                attributes={
-                    "location": sensor.get("@location", None),
-                    "metadata": sensor.get("metadata", {}),
-                },
-            )
 
-            with self.objects_lock:
-                self.objects.append(object_ref)
-
-            sensor_id: str = sensor["@ID"]
-
-            if "@location" in sensor:
-                object_id: str = sensor["@location"]
-                o2o_ref: ObjectObjectRelationship = ObjectObjectRelationship(
-                    object_id=sensor_id,
-                    related_object_id=object_id,
-                    qualifier="located_at",
-                )
-                with self.object_object_relationships_lock:
-                    self.object_object_relationships.append(o2o_ref)
-        print("Processing sensors completed")
-
-    def process_iot_events(self, iot_events: List[dict]) -> None:
-        print("Processing IoT events started")
-        """Process IoT events in a separate thread"""
-        for event in iot_events:
-            iot_event_ref: Event = IotEvent(
-                event_id=event["@ID"],
-                event_type=f"FeatureOfInterest",
-                timestamp=event["@timestamp"],
-                attributes={
-                    "feature_of_interest": event.get("FeatureOfInterest", None),
-                }
-            )
+def parse_objects(object_list: List[dict]) -> PartialLog:
+    """Parse a shard of FeatureOfInterest elements."""
+    partial = PartialLog()
+    for obj in object_list:
+        dp: dict | list = obj.get("DigitalProperty", {})
+        dp_dict = dp if isinstance(dp, dict) else {str(i): n for i, n in enumerate(dp)}
 
-            with self.iot_events_lock:
-                self.iot_events.append(iot_event_ref)
-
-            e_o_relationship: List[Dict[str, str]] = event.get("EventObjectRelationship", [])
-            for rel in e_o_relationship:
-                e2o_ref: EventObjectRelationship = EventObjectRelationship(
-                    event_id=event["@ID"],
-                    object_id=rel["@objectID"],
-                )
-                with self.event_object_relationships_lock:
-                    self.event_object_relationships.append(e2o_ref)
-
-            if "Observation" in event:
-                observation: dict = event["Observation"]
-                observation_ref: Event = Observation(
-                    event_id=str(uuid4()),
-                    event_type=f"Observation+{str(uuid4())[:8]}",
-                    timestamp=event["@timestamp"],
-                    attributes={
-                        "value": observation.get("@value", None),
-                        "sensor": observation.get("@sensor", None),
-                    }
-                )
-
-                with self.observations_lock:
-                    self.observations.append(observation_ref)
-
-                e2e_ref: EventEventRelationship = EventEventRelationship(
-                    event_id=iot_event_ref.event_id,
-                    derived_from_event_id=observation_ref.event_id,
-                    qualifier="observe_by",
-                )
-                with self.event_event_relationships_lock:
-                    self.event_event_relationships.append(e2e_ref)
-
-                if observation.get("@sensor", None):
-                    e2o_ref: EventObjectRelationship = EventObjectRelationship(
-                        event_id=iot_event_ref.event_id,
-                        object_id=observation["@sensor"],
-                        qualifier="observe_by",
-                    )
-                    with self.event_object_relationships_lock:
-                        self.event_object_relationships.append(e2o_ref)
-        print("Processing IoT events completed")
-
-    def process_process_events(self, process_events: List[dict]) -> None:
-        """Process process events in a separate thread"""
-        print("Processing process events started")
-        for event in process_events:
-            process_event_ref: Event = ProcessEvent(
-                event_id=event["@ID"],
-                event_type=f"ProcessEvent+{str(uuid4())[:8]}",
-                timestamp=event["@timestamp"],
-                activity=event["@label"],
-                attributes={
-                    "method": event.get("Method", {}),
-                    "analytics": event.get("Analytics", {}),
-                    "value": event.get("@value", None),
-                },
-            )
+        partial.objects.append(
+            obj["@ID"],
+            obj["@objectType"],
+            get_object_class_for_object_type(obj["@objectType"]),
+            dp_dict
+        )
+    return partial
+
+
+def parse_sensors(sensors: List[dict]) -> PartialLog:
+    """Parse a shard of Sensor elements."""
+    partial = PartialLog()
+    for sensor in sensors:
+        partial.objects.append(
+            sensor["@ID"],
+            "Sensor",
+            ObjectClassEnum.SENSOR,
+            {
+                "location": sensor.get("@location", None),
+                "metadata": sensor.get("metadata", {}),
+            }
+        )
 
-            with self.process_events_lock:
-                self.process_events.append(process_event_ref)
-
-            e_o_relationship: List[Dict[str, str]] = event.get("EventObjectRelationship", [])
-            for rel in e_o_relationship:
-                e2o_ref: EventObjectRelationship = EventObjectRelationship(
-                    event_id=event["@ID"],
-                    object_id=rel["@objectID"],
-                )
-                with self.event_object_relationships_lock:
-                    self.event_object_relationships.append(e2o_ref)
-
-            if "Analytics" in event:
-                analytics: List[str] = event["Analytics"]["AnalysesEvent"]
-                for id_ref in analytics:
-                    with self.event_event_relationships_lock:
-                        self.event_event_relationships.append(
-                            EventEventRelationship(
-                                event_id=process_event_ref.event_id,
-                                derived_from_event_id=id_ref,
-                                qualifier="analyzed_by",
-                            )
-                        )
-        print("Processing process events completed")
-
-    def process_context_events(self, context_events: List[dict]) -> None:
-        """Process context events in a separate thread"""
-        print("Processing context events started")
-        for event in context_events:
-            event_id: str = event["@ID"]
-            event_type: str = f"ContextEvent+{str(uuid4())[:8]}"
-            event_timestamp: str = event["@timestamp"]
-
-            context_event_ref: Event = Observation(
-                event_id=event_id,
-                event_type=event_type,
-                timestamp=event_timestamp,
-                attributes={
-                    "value": event.get("@value", None),
+        if "@location" in sensor:
+            partial.relationships.append("object_object", sensor["@ID"], sensor["@location"], "located_at")
+    return partial
+
+
+def parse_iot_events(iot_events: List[dict]) -> PartialLog:
+    """Parse a shard of IoTEvent elements and their observations."""
+    partial = PartialLog()
+    for event in iot_events:
+        partial.events.append(
+            event["@ID"],
+            "iot_event",
+            "FeatureOfInterest",
+            event["@timestamp"],
+            {"feature_of_interest": event.get("FeatureOfInterest", None)}
+        )
+        _add_event_object_relationships(partial, event)
+
+        if "Observation" in event:
+            observation: dict = event["Observation"]
+            observation_id = str(uuid4())
+            partial.events.append(
+                observation_id,
+                "observation",
+                f"Observation+{str(uuid4())[:8]}",
+                event["@timestamp"],
+                {
+                    "value": observation.get("@value", None),
+                    "sensor": observation.get("@sensor", None),
                 }
             )
-            with self.observations_lock:
-                self.observations.append(context_event_ref)
-
-            e_o_relationship: List[Dict[str, str]] = event.get("EventObjectRelationship", [])
-            for rel in e_o_relationship:
-                e2o_ref: EventObjectRelationship = EventObjectRelationship(
-                    event_id=event_id,
-                    object_id=rel["@objectID"],
-                )
-                with self.event_object_relationships_lock:
-                    self.event_object_relationships.append(e2o_ref)
-        print("Processing context events completed")
+            partial.relationships.append("event_event", event["@ID"], observation_id, "observe_by")
+
+            if observation.get("@sensor", None):
+                partial.relationships.append("event_object", event["@ID"], observation["@sensor"], "observe_by")
+    return partial
+
+
+def parse_process_events(process_events: List[dict]) -> PartialLog:
+    """Parse a shard of ProcessEvent elements."""
+    partial = PartialLog()
+    for event in process_events:
+        partial.events.append(
+            event["@ID"],
+            "process_event",
+            f"ProcessEvent+{str(uuid4())[:8]}",
+            event["@timestamp"],
+            {
+                "method": event.get("Method", {}),
+                "analytics": event.get("Analytics", {}),
+                "value": event.get("@value", None),
+            },
+            activity=event["@label"]
+        )
+        _add_event_object_relationships(partial, event)
+
+        if "Analytics" in event:
+            analytics: List[str] = event["Analytics"]["AnalysesEvent"]
+            for id_ref in analytics:
+                partial.relationships.append("event_event", event["@ID"], id_ref, "analyzed_by")
+    return partial
+
+
+def parse_context_events(context_events: List[dict]) -> PartialLog:
+    """Parse a shard of ContextEvent elements."""
+    partial = PartialLog()
+    for event in context_events:
+        partial.events.append(
+            event["@ID"],
+            "observation",
+            f"ContextEvent+{str(uuid4())[:8]}",
+            event["@timestamp"],
+            {"value": event.get("@value", None)}
+        )
+        _add_event_object_relationships(partial, event)
+    return partial
+
+
+CATEGORY_PARSERS: Dict[str, Callable[[List[dict]], PartialLog]] = {
+    "objects": parse_objects,
+    "sensors": parse_sensors,
+    "iot_events": parse_iot_events,
+    "process_events": parse_process_events,
+    "context_events": parse_context_events,
+}
+
+
+def _parse_shard(shard: Tuple[str, List[dict]]) -> PartialLog:
+    """Parse one shard of a category. Runs in a worker."""
+    category, elements = shard
+    return CATEGORY_PARSERS[category](elements)
+
+
+class SensorStreamParser:
+    def __init__(
+            self,
+            instrumentation: Optional[Instrumentation] = None,
+            workers: Optional[int] = None,
+            shard_size: int = 5_000,
+            executor: Literal["process", "thread"] = "process"
+    ) -> None:
+        """
+        Initializes the SensorStreamParser class.
+
+        Every category of the log is split into shards of ``shard_size`` elements that are parsed in parallel.
+        Each worker fills its own batches, which are concatenated once at the end, so no locking is needed.
+
+        :param instrumentation: Recorder of the parsing phases, passed on to the COREMetamodel.
+        :param workers: Number of workers, by default one per CPU. 1 parses in this process.
+        :param shard_size: Number of elements parsed per worker task.
+        :param executor: Whether the workers are processes, which run in parallel, or threads, which share the GIL.
+        """
+        self.instrumentation: Instrumentation = instrumentation if instrumentation is not None \
+            else NULL_INSTRUMENTATION
+        self.workers: Optional[int] = workers
+        self.shard_size: int = shard_size
+        self.executor: Literal["process", "thread"] = executor
+
+    def _shards(self, event_log: dict) -> List[Tuple[str, List[dict]]]:
+        """Split every category of the log into shards."""
+        categories: Dict[str, List[dict]] = {
+            "objects": event_log["ObjectsList"]["FeatureOfInterest"],
+            "sensors": event_log["DataSourcesList"]["Sensor"],
+            "iot_events": event_log["EventsList"]["IoTEvent"],
+            "process_events": event_log["EventsList"]["ProcessEvent"],
+            "context_events": event_log["EventsList"]["ContextEvent"],
+        }
+        return [
+            (category, elements[start:start + self.shard_size])
+            for category, elements in categories.items()
+            for start in range(0, len(elements), self.shard_size)
+        ]
 
     def parse_sensor_stream_log(self, sensorstream_log: dict) -> COREMetamodel:
         """
@@ -228,67 +197,44 @@ class SensorStreamParser:
         :param sensorstream_log: List of SensorStream events as dictionaries.
         :return: OCELWrapper object containing the parsed data.
         """
-        event_log: dict = sensorstream_log["EventLog"]
-
-        # Get all the data that needs to be processed
-        object_list: list[dict] = event_log["ObjectsList"]["FeatureOfInterest"]
-        sensors: list[dict] = event_log["DataSourcesList"]["Sensor"]
-        iot_events = event_log["EventsList"]["IoTEvent"]
-        process_events = event_log["EventsList"]["ProcessEvent"]
-        context_events = event_log["EventsList"]["ContextEvent"]
-
-        # Create a ThreadPoolExecutor to manage the threads
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            # Submit all tasks to the executor
-            futures = [
-                executor.submit(self.process_objects, object_list),
-                executor.submit(self.process_sensors, sensors),
-                executor.submit(self.process_iot_events, iot_events),
-                executor.submit(self.process_process_events, process_events),
-                executor.submit(self.process_context_events, context_events)
-            ]
-
-            # Wait for all tasks to complete
-            wait(futures)
-
-        # print stats
-        print("Objects:", len(self.objects))
-        print("Iot Events:", len(self.iot_events))
-        print("Process Events:", len(self.process_events))
-        print("Observations:", len(self.observations))
-        print("Object Object Relationships:", len(self.object_object_relationships))
-        print("Event Object Relationships:", len(self.event_object_relationships))
-        print("Event Event Relationships:", len(self.event_event_relationships))
-
-        return COREMetamodel(
-            objects=self.objects,
-            iot_events=self.iot_events,
-            process_events=self.process_events,
-            observations=self.observations,
-            object_object_relationships=self.object_object_relationships,
-            event_object_relationships=self.event_object_relationships,
-            event_event_relationships=self.event_event_relationships,
-        )
+        shards = self._shards(sensorstream_log["EventLog"])
+
+        with self.instrumentation.span("parse_shards", rows=sum(len(elements) for _, elements in shards)):
+            if self.workers == 1:
+                partials = [_parse_shard(shard) for shard in shards]
+            else:
+                executor_class = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+                with executor_class(max_workers=self.workers) as executor:
+                    partials = list(executor.map(_parse_shard, shards))
+
+        with self.instrumentation.span("concatenate", rows=len(partials)):
+            partial = concatenate_partials(partials)
+
+        model = COREMetamodel(instrumentation=self.instrumentation)
+        return model.append_batch(objects=partial.objects, events=partial.events, relationships=partial.relationships)
 
 
 if __name__ == "__main__":
     sample_xml_path = "smart spaces nice log.xml"
 
+    logging.basicConfig(level=logging.INFO)
+    instrumentation = Instrumentation()
+
     # Load xml as string
-    with open(sample_xml_path, 'r') as file:
-        xml_string = file.read()
-    print("After reading the file")
+    with instrumentation.span("read_file"):
+        with open(sample_xml_path, 'r') as file:
+            xml_string = file.read()
 
     # Parse xml string to dict
-    xml_dict = xmltodict.parse(xml_string)
+    with instrumentation.span("parse_xml"):
+        xml_dict = xmltodict.parse(xml_string)
 
     # Parse xml dict to OCELWrapper
-    parser = SensorStreamParser()
+    parser = SensorStreamParser(instrumentation)
     ocel_wrapper = parser.parse_sensor_stream_log(xml_dict)
-    print("After parsing the xml")
 
     ocel_pointer: pm4py.OCEL = ocel_wrapper.get_ocel()
     ocel_wrapper.save_ocel("v1_output.jsonocel")
     print(ocel_pointer.get_summary())
     discovered_df = pm4py.discover_oc_petri_net(ocel_pointer)
-    pm4py.view_ocpn(discovered_df)
\ No newline at end of file
+    pm4py.view_ocpn(discovered_df)
@@ -1,55 +1,40 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from pprint import pprint
 
 import pm4py
-import yaml
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Union, Iterable, Iterator, Optional, Set
 
+from src.readers.yaml_reader import iter_yaml_documents, iter_yaml_files
+from src.types_defintion.object_definition import Object, ObjectClassEnum
+from src.wrapper.object_registry import ObjectRegistry
+from src.wrapper.observation_grouping import ObservationGrouper
 from src.wrapper.ocel_wrapper import COREMetamodel
+from src.wrapper.parallel_ingestion import PartialLog
 
 import json
 from typing import List, Dict, Any
 
 
-def group_by_observation_id(dicts: List[Dict[str, any]]) -> List[List[Dict[str, any]]]:
-    """
-    Groups a list of dictionaries by their 'observation_id' field.
-
-    :param dicts: A list of dictionaries, each containing an 'observation_id' field.
-    :return: A list of lists, where each sublist contains dictionaries with the same 'observation_id'.
-    """
-    groups = {}
-    for d in dicts:
-        obs_id = d.get('observation_id')
-        if obs_id in groups:
-            groups[obs_id].append(d)
-        else:
-            groups[obs_id] = [d]
-
-    return list(groups.values())
-
-
 class SensorStreamParser:
-    def __init__(self) -> None:
+    def __init__(self, observation_window: Optional[timedelta] = None) -> None:
         """
         Initializes the SensorStreamParser class.
+
+        :param observation_window: If given, observations with the same id are only grouped into one IoT event
+            when they fall into the same time window of this length.
         """
-        self.objects = []
-        self.iot_events = []
-        self.process_events = []
-        self.iot_devices = []
-        self.observations = []
-        self.information_systems = []
-        self.object_object_relationships = []
-        self.event_object_relationships = []
-        self.event_event_relationships = []
-        self.event_data_source_relationships = []
-
-    def parse_sensor_stream_log(self, sensorstream_log: List[Dict[str, Any]]) -> COREMetamodel:
+        self.partial: PartialLog = PartialLog()
+        self.iot_devices: ObjectRegistry = ObjectRegistry()
+        self.process_event_ids: Set[str] = set()
+        self.observations: ObservationGrouper = ObservationGrouper(self.partial, window=observation_window)
+
+    def parse_sensor_stream_log(self, sensorstream_log: Iterable[Dict[str, Any]]) -> COREMetamodel:
         """
         Parses a SensorStream log and returns an OCELWrapper object.
 
-        :param sensorstream_log: List of SensorStream events as dictionaries.
+        Observations are grouped into IoT events while the documents are parsed, so the log is read only once.
+
+        :param sensorstream_log: SensorStream documents as dictionaries, e.g. streamed by :func:`load_yaml`.
         :return: OCELWrapper object containing the parsed data.
         """
         for event in sensorstream_log:
@@ -62,65 +47,24 @@ class SensorStreamParser:
                     data_stream: List[Dict] = event["stream:datastream"]
                     self._parse_sensor_stream_data(data_stream, process_event_id)
 
-        # link observations with the same id to one iot event
-        self.link_observation_to_iot_event()
-
-        # link iot event to objects
-        self.link_iot_events_to_objects()
-
-        return COREMetamodel(
-            objects=self.objects,
-            iot_events=self.iot_events,
-            process_events=self.process_events,
-            iot_devices=self.iot_devices,
-            observations=self.observations,
-            information_systems=self.information_systems,
-            object_object_relationships=self.object_object_relationships,
-            event_object_relationships=self.event_object_relationships,
-            event_event_relationships=self.event_event_relationships,
-            event_data_source_relationships=self.event_data_source_relationships
+        return COREMetamodel().append_batch(
+            objects=self.partial.objects,
+            events=self.partial.events,
+            relationships=self.partial.relationships
         )
 
-    def link_observation_to_iot_event(self, process_event_id: str | None = None) -> None:
-        """
-        Link observations with the same id to one iot event
-        """
-
-        groups = group_by_observation_id(self.observations)
-        for observations in groups:
-            iot_event_id: str = f"iot_event_{observations[0]['observation_id']}"
-            self.iot_events.append({
-                "event_id": iot_event_id,
-                "timestamp": observations[0]["timestamp"],
-                "event_type": observations[0]['observation_id'],
-            })
-
-            for i, observation in enumerate(observations):
-                observation_id = observation["observation_id"] + f"_{i}"
-                observation["observation_id"] = observation_id
-
-                self.event_event_relationships.append({
-                    "event_id": iot_event_id,
-                    "derived_from_event_id": observation_id
-                })
-
-            if process_event_id:
-                self.event_event_relationships.append({
-                    "event_id": process_event_id,
-                    "derived_from_event_id": iot_event_id
-                })
-
     def _parse_process_event(self, process_event: Dict[str, Any]) -> str:
         # Create Process events
-        # only add the event if it is not already in the list
-        if not any(x["event_id"] == process_event["id:id"] for x in self.process_events):
-            self.process_events.append({
-                "event_id": process_event["id:id"],
-                "timestamp": datetime.now(),
-                "activity": {
-                    "activity_type": process_event["concept:name"]
-                }
-            })
+        # only add the event if it is not already in the log
+        if process_event["id:id"] not in self.process_event_ids:
+            self.process_event_ids.add(process_event["id:id"])
+            self.partial.events.append(
+                process_event["id:id"],
+                "process_event",
+                process_event["concept:name"],
+                datetime.now(),
+                activity=process_event["concept:name"]
+            )
         return process_event["id:id"]
 
     def _parse_sensor_stream_data(self, sensorstream_events: List[Dict[str, Any]],
@@ -129,6 +73,7 @@ class SensorStreamParser:
         Parses a SensorStream event and adds the corresponding IoT data and relationships to the parser's internal state.
 
         :param sensorstream_events: A dictionary representing a SensorStream event from the XES log.
+        :param process_event_id: Id of the process event the data stream was recorded for.
         """
 
         points: List[Dict[str, Any]] = [x["stream:point"] for x in sensorstream_events if "stream:point" in x]
@@ -136,70 +81,48 @@ class SensorStreamParser:
         iot_device_id = [x["stream:name"] for x in sensorstream_events if "stream:name" in x][0]
         iot_source = [x["stream:source"] for x in sensorstream_events if "stream:source" in x][0]
 
-        # Add IoT device to the local list or find the existing object
+        # Add IoT device to the registry unless it is already stored
         iot_device_id_with_prefix: str = "iot_device_" + iot_device_id
-        iot_device = next((dev for dev in self.iot_devices if dev["data_source_id"] == iot_device_id_with_prefix), None)
-
-        if iot_device is None:
-            # If not already stored, add a new IoT device
-            iot_device = {
-                "data_source_id": iot_device_id_with_prefix,
-                "attributes": iot_source  # Add all relevant attributes here
-            }
-            self.iot_devices.append(iot_device)
 
-        # Process the sensor points and create observations
+        if iot_device_id_with_prefix not in self.iot_devices:
+            device = Object(
+                object_id=iot_device_id_with_prefix,
+                object_type="iot_device",
+                object_class=ObjectClassEnum.SENSOR,
+                attributes={"source": iot_source}  # Add all relevant attributes here
+            )
+            self.iot_devices.upsert(device)
+            self.partial.objects.append(device.object_id, device.object_type, device.object_class,
+                                        device.attributes)
+
+        # Process the sensor points and group their observations into IoT events
         for point in points:
             if type(point) is not dict:
                 print(type(point))
                 continue
             id_ = point.get("stream:id", "unknown_id")
-            observation = {
-                "observation_id": "obs_" + id_,
-                "iot_device_link": iot_device_id_with_prefix,  # Link to the sensor object
-                "timestamp": point.get("stream:timestamp", ""),
-                "attributes": {}
-            }
-            # Add all attributes to the observation
-            for key in point.keys():
-                if key not in observation and key not in observation["attributes"]:
-                    observation["attributes"][key] = point[key]
-
-            self.observations.append(observation)
-
-            # Create event-object relationships (link IoT events to their data source)
-            self.event_data_source_relationships.append({
-                "event_id": observation["observation_id"],
-                "data_source_id": iot_device_id_with_prefix  # Link to the sensor object
-            })
-
-    def link_iot_events_to_objects(self):
-        """
-        Link iot events to objects
-        """
-        for i, iot_event in enumerate(self.iot_events):
-            iot_event_id = iot_event["event_id"]
-            self.event_object_relationships.append({
-                "event_id": iot_event_id,
-                "object_id":  self.iot_devices[0]["data_source_id"] if i%2==0 else self.iot_devices[1]["data_source_id"] # Todo: This is for testing only and should be replaced with a proper mapping
-            })
+            self.observations.add(
+                "obs_" + id_,
+                iot_device_id_with_prefix,  # Link to the sensor object
+                point.get("stream:timestamp", ""),
+                dict(point),  # Add all attributes to the observation
+                process_event_id=process_event_id
+            )
 
 
-def load_yaml(yaml_file: str) -> List[Any]:
+def load_yaml(yaml_file: str) -> Iterator[Any]:
     """
-    Loads a YAML file, returning all documents as a list.
+    Streams the documents of a YAML file one at a time.
 
     :param yaml_file: The path to the YAML file.
-    :return: A list containing the loaded YAML documents.
+    :return: An iterator over the loaded YAML documents.
     """
-    with open(yaml_file, 'r') as file:
-        return list(yaml.safe_load_all(file))
+    return iter_yaml_documents(yaml_file)
 
 
 if __name__ == "__main__":
-    scheme_1 = load_yaml("file.yaml")
-    scheme_2 = load_yaml("file_2.yaml")
-    full_scheme = scheme_1 + scheme_2
+    # The files are loaded in worker processes and their documents streamed into the parser in file order
+    full_scheme = iter_yaml_files(["file.yaml", "file_2.yaml"])
     parser = SensorStreamParser()
     res: COREMetamodel = parser.parse_sensor_stream_log(full_scheme)
     ocel_pointer: pm4py.OCEL = res.get_ocel()